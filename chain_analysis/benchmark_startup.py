@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+客户端启动耗时基准测试
+
+比较获取全部工具列表的耗时：
+- eager: 原来的方式，MultiServerMCPClient.get_tools() 启动全部服务器获取工具列表
+- lazy-cold: LazyMCPClient，工具结构缓存为空，启动全部服务器获取工具列表并写入缓存
+- lazy-warm: LazyMCPClient，从磁盘缓存读取工具结构，不启动任何服务器
+另外测量缓存命中后第一次调用工具的耗时（包含启动该服务器）和之后复用会话的调用耗时。
+
+测试使用临时缓存目录，不影响客户端实际使用的缓存。
+
+用法:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeat 5 --servers terminal,weather
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import lazy_mcp
+from lazy_mcp import LazyMCPClient
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp_client import MCP_SERVERS
+
+# 用于测量首次调用的工具：只读、无副作用
+PROBE_TOOL = ("terminal", "get_current_directory")
+
+
+async def measure(label: str, repeat: int, run: Callable) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cleanup = await run()
+        timings.append(time.perf_counter() - start)
+        # 关闭服务器的耗时不计入启动耗时
+        if cleanup is not None:
+            await cleanup()
+    print(f"  {label:<12} 平均 {statistics.mean(timings) * 1000:9.1f}ms   最快 {min(timings) * 1000:9.1f}ms")
+    return timings
+
+
+async def run(servers: Dict[str, Dict], repeat: int) -> None:
+    cache_dir = tempfile.mkdtemp(prefix="mcp_schema_bench_")
+    lazy_mcp.SCHEMA_CACHE_CONFIG['dir'] = cache_dir
+    try:
+        await run_benchmarks(servers, repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+async def run_benchmarks(servers: Dict[str, Dict], repeat: int) -> None:
+    print(f"📊 客户端启动耗时基准测试 ({len(servers)} 个服务器: {', '.join(servers)}，每项 {repeat} 次)")
+    print("=" * 64)
+
+    async def eager():
+        await MultiServerMCPClient(servers).get_tools()
+
+    async def lazy_cold():
+        for name in os.listdir(lazy_mcp.SCHEMA_CACHE_CONFIG['dir']):
+            os.remove(os.path.join(lazy_mcp.SCHEMA_CACHE_CONFIG['dir'], name))
+        client = LazyMCPClient(servers)
+        try:
+            await client.get_tools()
+        except BaseException:
+            await client.aclose()
+            raise
+        return client.aclose
+
+    async def lazy_warm():
+        await LazyMCPClient(servers).get_tools()
+
+    eager_times = await measure("eager", repeat, eager)
+    await measure("lazy-cold", repeat, lazy_cold)
+    warm_times = await measure("lazy-warm", repeat, lazy_warm)
+    print(f"🚀 缓存命中时启动快 {statistics.mean(eager_times) / statistics.mean(warm_times):.0f} 倍")
+
+    server_name, tool_name = PROBE_TOOL
+    if server_name in servers:
+        client = LazyMCPClient(servers)
+        try:
+            tool = {tool.name: tool for tool in await client.get_tools(server_name=server_name)}[tool_name]
+            start = time.perf_counter()
+            await tool.ainvoke({})
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            await tool.ainvoke({})
+            second = time.perf_counter() - start
+        finally:
+            await client.aclose()
+        print(f"\n⏱️ 首次调用 {server_name}.{tool_name}（含启动服务器）: {first * 1000:.1f}ms，"
+              f"复用会话再次调用: {second * 1000:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="客户端启动耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测试的重复次数")
+    parser.add_argument("--servers", default="", help="只测试指定的服务器，逗号分隔，默认全部")
+    args = parser.parse_args()
+    names = [name.strip() for name in args.servers.split(",") if name.strip()] or list(MCP_SERVERS)
+    unknown = [name for name in names if name not in MCP_SERVERS]
+    if unknown:
+        raise SystemExit(f"❌ 未知的服务器: {', '.join(unknown)}，可选值: {', '.join(MCP_SERVERS)}")
+    asyncio.run(run({name: MCP_SERVERS[name] for name in names}, max(1, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+工具调用路由基准测试
+
+在带标签的问题集上评估本项目的路由规则（tool_router.py）的准确率、本地判断覆盖率和单次判断耗时。
+问题集与 tool_router.EXEMPLARS 中的示例不重复，避免相似度分类器直接命中训练示例。
+默认不请求大模型；指定 --llm 时对本地置信度不足的问题调用与 mcp_client.py 相同的大模型判断，
+统计回退后的整体准确率和大模型判断耗时（使用 mcp_client.py 中配置的模型）。
+评估逻辑位于 mcp_client_common/router_benchmark.py，本脚本只定义本项目的问题集。
+
+用法:
+    python benchmark_tool_router.py
+    python benchmark_tool_router.py --threshold 0.5 --show-errors
+    python benchmark_tool_router.py --llm
+"""
+
+from typing import List, Tuple
+
+# tool_router 会把仓库根目录加入 sys.path，需要先于 mcp_client_common 导入
+import tool_router
+from mcp_client_common import router_benchmark
+
+# 带标签的问题集: (问题, 是否需要工具)
+LABELED_QUERIES: List[Tuple[str, bool]] = [
+    ("执行一下 pwd", True),
+    ("ls", True),
+    ("帮我跑一下 python --version 命令", True),
+    ("看一下现在有哪些进程在运行", True),
+    ("我现在在哪个目录", True),
+    ("内存占用多少了", True),
+    ("列出桌面上的文件", True),
+    ("git status", True),
+    ("扫描一下本机已安装的软件", True),
+    ("根据我装的app分析我是做什么工作的", True),
+    ("生成我的职业画像", True),
+    ("打开 www.baidu.com", True),
+    ("帮我在浏览器里打开github", True),
+    ("用百度搜一下今天的新闻", True),
+    ("打开京东和淘宝两个网站", True),
+    ("帮我搜一下python异步编程", True),
+    ("访问 https://docs.python.org", True),
+    ("广州现在多少度", True),
+    ("成都后天下雪吗", True),
+    ("看看纽约的天气", True),
+    ("明天出门要带伞吗，查下北京天气", True),
+    ("哈喽", False),
+    ("晚上好", False),
+    ("你是谁", False),
+    ("什么是区块链", False),
+    ("深度学习和机器学习的区别", False),
+    ("解释一下量子计算", False),
+    ("怎么学习数据结构", False),
+    ("写一篇关于友谊的短文", False),
+    ("编一个睡前故事", False),
+    ("12*8是多少", False),
+    ("推荐几部好看的电影", False),
+    ("转行做产品经理有什么建议", False),
+    ("为什么会下雨", False),
+    ("把这句话翻译一下：good morning", False),
+    ("如何准备技术面试", False),
+    ("给我讲讲相对论", False),
+]
+
+
+def load_llm_judge():
+    from mcp_client import judge_with_llm
+    return judge_with_llm
+
+
+if __name__ == "__main__":
+    router_benchmark.main(LABELED_QUERIES, tool_router, load_llm_judge)
@@ -0,0 +1,234 @@
+"""
+MCP服务器延迟启动与工具结构缓存
+
+MultiServerMCPClient.get_tools() 会在第一个问题之前依次启动全部 stdio 服务器以获取工具列表，
+其中 application_analysis_server.py 在导入时就加载 langchain_openai 并创建大模型客户端，启动很慢。
+本模块提供与 get_tools(server_name=...) 兼容的 LazyMCPClient：
+- 工具结构（名称、描述、参数）缓存在磁盘上，缓存键为服务器脚本文件内容和启动参数的哈希，
+  脚本修改后自动重新获取；缓存命中时启动客户端不需要启动任何服务器
+- 服务器在其工具第一次被调用时才启动，之后一直复用同一个会话，直到客户端关闭
+- 同一服务器的并发调用共享会话，启动过程只执行一次
+
+缓存参数可通过环境变量配置：MCP_SCHEMA_CACHE_DIR（缓存目录）、MCP_SCHEMA_CACHE（设为false时不使用缓存）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from mcp import ClientSession
+from mcp.types import Tool as MCPTool
+
+# 工具结构缓存配置 - 从环境变量获取
+SCHEMA_CACHE_CONFIG = {
+    'dir': os.getenv('MCP_SCHEMA_CACHE_DIR', os.path.join(os.path.expanduser("~"), ".cache", "mcp_tool_schemas")),
+    'enabled': os.getenv('MCP_SCHEMA_CACHE', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+
+def server_fingerprint(connection: Dict[str, Any]) -> str:
+    """
+    计算服务器的缓存键：启动命令、参数以及参数中脚本文件的内容
+
+    只对存在的本地文件计算内容哈希，修改服务器脚本后缓存键随之变化。
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({key: connection.get(key) for key in ('transport', 'command', 'args', 'url')},
+                             sort_keys=True, default=str).encode("utf-8"))
+    cwd = connection.get('cwd') or os.getcwd()
+    for arg in connection.get('args') or []:
+        path = os.path.join(cwd, arg)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _cache_path(server_name: str, fingerprint: str) -> str:
+    return os.path.join(SCHEMA_CACHE_CONFIG['dir'], f"{server_name}-{fingerprint}.json")
+
+
+def read_cached_schemas(server_name: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+    """读取缓存的工具结构，不存在或无法解析时返回None"""
+    try:
+        with open(_cache_path(server_name, fingerprint), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached_schemas(server_name: str, fingerprint: str, schemas: List[Dict[str, Any]]) -> None:
+    """写入工具结构缓存，并删除该服务器旧的缓存文件；写入失败只影响下次启动速度"""
+    directory = SCHEMA_CACHE_CONFIG['dir']
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = _cache_path(server_name, fingerprint)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(schemas, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        for name in os.listdir(directory):
+            if name.startswith(f"{server_name}-") and name.endswith(".json") and name != os.path.basename(path):
+                os.remove(os.path.join(directory, name))
+    except OSError as e:
+        print(f"⚠️ 工具结构缓存写入失败: {e}", file=sys.stderr)
+
+
+async def list_all_tools(session: ClientSession) -> List[MCPTool]:
+    """获取服务器的全部工具，处理分页"""
+    tools: List[MCPTool] = []
+    cursor = None
+    while True:
+        result = await session.list_tools(cursor=cursor)
+        tools.extend(result.tools)
+        cursor = getattr(result, 'nextCursor', None)
+        if not cursor:
+            return tools
+
+
+class LazyServer:
+    """一个MCP服务器：首次调用时在后台任务中启动并保持会话"""
+
+    def __init__(self, name: str, connection: Dict[str, Any]):
+        self.name = name
+        self.connection = connection
+        self.started_at: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self._session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        self._tools: Dict[str, BaseTool] = {}
+
+    async def _run(self) -> None:
+        """持有会话的后台任务：会话的进入和退出必须在同一个任务中"""
+        try:
+            async with create_session(self.connection) as session:
+                await session.initialize()
+                self._session = session
+                self.startup_seconds = time.perf_counter() - self.started_at
+                self._ready.set_result(session)
+                await self._closing.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 启动失败时通知等待的调用；运行中退出时下次调用会重新启动
+            if not self._ready.done():
+                self._ready.set_exception(e)
+        finally:
+            self._session = None
+            self._tools.clear()
+
+    async def session(self) -> ClientSession:
+        """返回会话，服务器未启动或已退出时启动"""
+        async with self._lock:
+            if self._task is None or self._task.done():
+                loop = asyncio.get_running_loop()
+                self.started_at = time.perf_counter()
+                self._ready = loop.create_future()
+                self._closing = asyncio.Event()
+                self._task = loop.create_task(self._run(), name=f"mcp-server-{self.name}")
+            ready = self._ready
+        return await ready
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+    async def list_tools(self) -> List[MCPTool]:
+        return await list_all_tools(await self.session())
+
+    async def call(self, mcp_tool: MCPTool, arguments: Dict[str, Any]) -> Any:
+        """通过已启动的会话调用工具，工具对象按会话缓存"""
+        session = await self.session()
+        tool = self._tools.get(mcp_tool.name)
+        if tool is None:
+            tool = convert_mcp_tool_to_langchain_tool(session, mcp_tool, server_name=self.name)
+            self._tools[mcp_tool.name] = tool
+        return await tool.ainvoke(arguments)
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._closing.set()
+            try:
+                await self._task
+            except BaseException:
+                pass
+
+
+class LazyMCPClient:
+    """
+    延迟启动服务器的MCP客户端
+
+    Args:
+        connections: 与 MultiServerMCPClient 相同的服务器配置
+    """
+
+    def __init__(self, connections: Dict[str, Dict[str, Any]]):
+        self.connections = connections
+        self.servers = {name: LazyServer(name, connection) for name, connection in connections.items()}
+        # 每个服务器的工具结构来源: cache（磁盘缓存）或 server（启动服务器获取）
+        self.schema_sources: Dict[str, str] = {}
+
+    async def _load_schemas(self, server_name: str) -> List[MCPTool]:
+        server = self.servers[server_name]
+        fingerprint = server_fingerprint(server.connection)
+        if SCHEMA_CACHE_CONFIG['enabled']:
+            cached = read_cached_schemas(server_name, fingerprint)
+            if cached is not None:
+                try:
+                    tools = [MCPTool.model_validate(schema) for schema in cached]
+                    self.schema_sources[server_name] = "cache"
+                    return tools
+                except ValueError:
+                    pass
+        # 缓存未命中时启动服务器获取工具列表，之后的调用复用该会话
+        tools = await server.list_tools()
+        self.schema_sources[server_name] = "server"
+        if SCHEMA_CACHE_CONFIG['enabled']:
+            write_cached_schemas(server_name, fingerprint,
+                                 [tool.model_dump(mode="json", exclude_none=True) for tool in tools])
+        return tools
+
+    def _lazy_tool(self, server: LazyServer, mcp_tool: MCPTool) -> BaseTool:
+        """按缓存的工具结构创建工具，调用时才启动服务器"""
+
+        async def call(**kwargs: Any) -> Any:
+            return await server.call(mcp_tool, kwargs)
+
+        return StructuredTool.from_function(
+            coroutine=call,
+            name=mcp_tool.name,
+            description=mcp_tool.description or "",
+            args_schema=mcp_tool.inputSchema,
+            metadata={"server": server.name},
+        )
+
+    async def get_tools(self, *, server_name: Optional[str] = None) -> List[BaseTool]:
+        """获取工具列表，未指定服务器时返回全部服务器的工具"""
+        names = [server_name] if server_name else list(self.servers)
+        tools: List[BaseTool] = []
+        for name, schemas in zip(names, await asyncio.gather(*(self._load_schemas(name) for name in names))):
+            tools.extend(self._lazy_tool(self.servers[name], schema) for schema in schemas)
+        return tools
+
+    def status(self) -> str:
+        """各服务器的工具结构来源和启动状态"""
+        lines = []
+        for name, server in self.servers.items():
+            source = {"cache": "缓存", "server": "服务器"}.get(self.schema_sources.get(name, ""), "未加载")
+            state = f"已启动 ({server.startup_seconds:.2f}s)" if server.running else "未启动"
+            lines.append(f"  • {name}: 工具结构来自{source}，{state}")
+        return "\n".join(lines)
+
+    async def aclose(self) -> None:
+        """关闭所有已启动的服务器"""
+        await asyncio.gather(*(server.close() for server in self.servers.values()))
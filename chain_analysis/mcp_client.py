@@ -1,12 +1,18 @@
 import asyncio
+import os
 import sys
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from pydantic import SecretStr
+from tool_router import create_router, format_decision
+
+# 并行执行和对话记忆与 langchain-mcp-mysql 共用，位于仓库根目录的 mcp_client_common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mcp_client_common.parallel_tools import ParallelToolExecutor, load_tools_by_server, format_timeline  # noqa: E402
+from mcp_client_common.token_memory import TokenBudgetMemory, format_memory_stats  # noqa: E402
+from lazy_mcp import LazyMCPClient  # noqa: E402
 
 # 初始化 ChatOpenAI 大模型客户端 
 # llm = ChatOpenAI(
@@ -29,6 +35,30 @@ llm = ChatOpenAI(
 #     temperature=0.3
 # )
 
+# MCP服务器配置 - 完整服务器配置
+MCP_SERVERS = {
+    "terminal": {
+        "command": "python",
+        "args": ["./mcp_servers/terminal_server.py"],
+        "transport": "stdio",
+    },
+    "app_analysis": {
+        "command": "python",
+        "args": ["./mcp_servers/application_analysis_server.py"],
+        "transport": "stdio",
+    },
+    "browser": {
+        "command": "python",
+        "args": ["./mcp_servers/browser_control_server.py"],
+        "transport": "stdio",
+    },
+    "weather": {
+        "command": "python",
+        "args": ["./mcp_servers/weather_server.py"],
+        "transport": "stdio",
+    }
+}
+
 # 创建优化的提示词
 def create_smart_prompt():
     """创建智能提示词，引导AI合理使用工具"""
@@ -45,6 +75,7 @@ def create_smart_prompt():
 2. 对于一般性对话、概念解释、建议咨询等，直接回答
 3. 优先选择最合适的工具来完成任务
 4. 如果不确定是否需要工具，优先选择直接回答
+5. 多个相互独立的操作（如同时查询天气和执行命令）请在同一步中同时发起工具调用，客户端会并行执行
 
 请保持自然、友好的对话风格，准确理解用户真实意图，明智地选择是否使用工具。"""
 
@@ -55,6 +86,34 @@ def create_smart_prompt():
     
     return prompt
 
+# 本地置信度不足时使用的大模型判断
+async def judge_with_llm(user_input: str) -> bool:
+    """请求大模型判断问题是否需要调用工具"""
+    judge_prompt = f"""
+    用户问题: {user_input}
+    
+    请判断这个问题是否需要调用工具来完成任务。
+    
+    需要调用工具的情况(回答YES)：
+    - 执行系统命令、文件操作、程序运行
+    - 职业分析、应用程序分析、了解职业匹配度
+    - 网页控制、信息采集、打开浏览器
+    - 天气查询、气象信息、天气预报
+    - 其他需要实际执行操作的任务
+    
+    不需要工具的情况(回答NO)：
+    - 一般性对话、问候、闲聊
+    - 概念解释、知识问答
+    - 建议咨询、意见交流
+    - 创意写作、故事创作
+    - 简单数学计算
+    
+    只回答YES或NO，不要其他内容。
+    """
+
+    judge_response = await llm.ainvoke([HumanMessage(content=judge_prompt)])
+    return "YES" in str(judge_response.content).upper()
+
 # 简化的结果输出函数
 def print_result(agent_response):
     """输出代理响应结果"""
@@ -77,48 +136,33 @@ async def main():
     client = None
     
     try:
-        # 初始化MCP客户端 - 完整服务器配置  
-        client = MultiServerMCPClient({  # type: ignore
-            "terminal": {
-                "command": "python",
-                "args": ["./mcp_servers/terminal_server.py"],
-                "transport": "stdio",
-            },
-            "app_analysis": {
-                "command": "python",
-                "args": ["./mcp_servers/application_analysis_server.py"],
-                "transport": "stdio",
-            },
-            "browser": {
-                "command": "python",
-                "args": ["./mcp_servers/browser_control_server.py"],
-                "transport": "stdio",
-            },
-            "weather": {
-                "command": "python",
-                "args": ["./mcp_servers/weather_server.py"],
-                "transport": "stdio",
-            }
-        })
-
-        tools = await client.get_tools()
+        # 初始化MCP客户端 - 工具结构优先读取磁盘缓存，服务器在其工具首次被调用时才启动
+        client = LazyMCPClient(MCP_SERVERS)
+
+        # 按服务器加载工具，并加上按服务器的并发上限、调用超时和时间线记录
+        tool_executor = ParallelToolExecutor()
+        tools = tool_executor.wrap(await load_tools_by_server(client, list(client.connections)))
         
         # 创建带有智能提示词的代理
+        # version="v1": 同一条AI消息中的全部工具调用由一个工具节点通过 asyncio.gather 并发执行
         smart_prompt = create_smart_prompt()
-        agent = create_react_agent(llm, tools, prompt=smart_prompt)
+        agent = create_react_agent(llm, tools, prompt=smart_prompt, version="v1")
 
-        # 使用窗口记忆 - 保留最近10轮对话，无需transformers包
-        memory = ConversationBufferWindowMemory(
-            k=10,                    # 保留最近10轮对话  
-            return_messages=True     # 返回消息对象
-        )
+        # 按token预算限制的记忆 - 保存整轮对话（含工具调用和结果），超出预算时先省略较早的大块工具输出
+        memory = TokenBudgetMemory()
 
         print("✨ 全功能智能助手已启动!")
         print("🔧 完整工具: 系统命令 | 职业分析 | 浏览器控制 | 天气查询")
         print("🧠 AI会智能判断何时需要调用工具")
         print("💬 支持流式对话，体验更自然")
+        print("🗂️ MCP服务器:")
+        print(client.status())
         print("输入 'exit' 退出\n")
 
+        # 工具调用路由器：本地关键词与相似度判断，只有置信度不足时才请求大模型
+        router = create_router(judge_with_llm)
+        need_tools = False
+
         # 对话循环
         while True:
             user_input = input("💬 问题: ").strip()
@@ -131,48 +175,27 @@ async def main():
                 continue
             
             # 获取历史消息并添加当前用户输入
-            messages = memory.chat_memory.messages.copy()
-            messages.append(HumanMessage(content=user_input))
-            
-            # 先用LLM判断是否需要工具
-            print("🤔 分析问题中...")
-            
-            # 创建判断提示
-            judge_prompt = f"""
-            用户问题: {user_input}
-            
-            请判断这个问题是否需要调用工具来完成任务。
-            
-            需要调用工具的情况(回答YES)：
-            - 执行系统命令、文件操作、程序运行
-            - 职业分析、应用程序分析、了解职业匹配度
-            - 网页控制、信息采集、打开浏览器
-            - 天气查询、气象信息、天气预报
-            - 其他需要实际执行操作的任务
-            
-            不需要工具的情况(回答NO)：
-            - 一般性对话、问候、闲聊
-            - 概念解释、知识问答
-            - 建议咨询、意见交流
-            - 创意写作、故事创作
-            - 简单数学计算
-            
-            只回答YES或NO，不要其他内容。
-            """
+            user_message = HumanMessage(content=user_input)
+            messages = memory.messages
+            messages.append(user_message)
             
-            judge_response = await llm.ainvoke([HumanMessage(content=judge_prompt)])
-            need_tools = "YES" in str(judge_response.content).upper()
+            # 先判断是否需要工具：本地路由器判断，置信度不足时才请求大模型
+            decision = await router.route(user_input, previous_used_tools=need_tools)
+            print(f"🧭 {format_decision(decision)}")
+            need_tools = decision.need_tools
             
             if need_tools:
                 print("🔧 检测到需要工具调用，启动增强模式...")
                 ai_response = ""
                 tool_used = False
+                turn_messages = [user_message]
                 
                 # 使用agent处理工具调用
                 async for chunk in agent.astream({"messages": messages}):
                     for node_name, node_output in chunk.items():
                         if node_name == "agent":
                             messages_in_chunk = node_output.get("messages", [])
+                            turn_messages.extend(messages_in_chunk)
                             for msg in messages_in_chunk:
                                 if msg.type == "ai":
                                     if hasattr(msg, "tool_calls") and msg.tool_calls:
@@ -185,6 +208,7 @@ async def main():
                         
                         elif node_name == "tools":
                             messages_in_chunk = node_output.get("messages", [])
+                            turn_messages.extend(messages_in_chunk)
                             for msg in messages_in_chunk:
                                 if msg.type == "tool":
                                     print(f"✅ 工具 '{msg.name}' 执行完成")
@@ -201,6 +225,9 @@ async def main():
                                                 print(f"❌ 错误: {stderr}")
                                     except:
                                         print(f"📄 原始结果: {msg.content}")
+                            timeline = format_timeline(tool_executor.trace.pop_step())
+                            if timeline:
+                                print(timeline)
                 
                 if ai_response:
                     print(f"\n🎯 最终回答: {ai_response}")
@@ -218,20 +245,22 @@ async def main():
                         ai_response += content_str
                 
                 print()  # 换行
+                turn_messages = [user_message, AIMessage(content=ai_response)]
             
-            # 保存对话到记忆
+            # 保存本轮对话到记忆，记忆按token预算压缩历史
             if ai_response:
-                memory.save_context(
-                    {"input": user_input},
-                    {"output": str(ai_response)}
-                )
-                print("✓ 对话已保存到记忆")
+                memory.add_turn(turn_messages)
+                print(f"✓ 对话已保存，{format_memory_stats(memory.stats())}")
             else:
                 print("⚠️ 未获取到AI回复")
 
     except Exception as e:
         print(f"❌ 初始化失败: {e}")
         sys.exit(1)
+    finally:
+        # 关闭对话期间启动的服务器
+        if client is not None:
+            await client.aclose()
 
 if __name__ == "__main__":
     try:
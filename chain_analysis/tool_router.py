@@ -0,0 +1,98 @@
+"""
+工具调用路由规则
+
+chain_analysis 客户端的工具调用路由规则：终端命令、应用分析、浏览器、天气以及问候、概念问答等。
+分类器和路由器的实现位于仓库根目录的 mcp_client_common/tool_router.py，本模块只定义本项目的规则表，
+新增工具后在 KEYWORD_RULES 和 EXEMPLARS 中补充规则和示例即可。
+"""
+
+import os
+import sys
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mcp_client_common.tool_router import ToolRouter, build_router, format_decision  # noqa: E402,F401
+
+# 正则规则: (模式, 是否需要工具, 权重)
+KEYWORD_RULES: List[Tuple[str, bool, float]] = [
+    # 终端命令与文件操作
+    (r"(执行|运行|跑一下|跑个)(一下)?.{0,20}(命令|脚本|程序|指令|代码)", True, 0.9),
+    (r"^\s*(ls|pwd|cd|cat|echo|df|du|ps|top|whoami|uname|python3?|pip|git|mkdir|find|grep)(\s|$)", True, 0.9),
+    (r"(当前|所在|工作|哪个)(目录|路径|文件夹)", True, 0.8),
+    (r"(列出|查看|看看|看一下|显示).{0,10}(文件|目录|文件夹|进程|磁盘|内存|端口)", True, 0.8),
+    (r"(磁盘|内存|cpu|CPU)(空间|占用|使用率|用了多少)", True, 0.7),
+    (r"(可以|能)执行(哪些|什么)命令", True, 0.8),
+    # 应用与职业分析
+    (r"(分析|扫描|统计|看看|检查)(一下)?.{0,8}(我的|电脑|本机|安装|已安装)?.{0,6}(应用|软件|程序|app)", True, 0.8),
+    (r"(我|我的).{0,8}(职业|工作|岗位).{0,8}(分析|画像|匹配|推断|判断|适合)", True, 0.8),
+    (r"(职业|用户)画像", True, 0.7),
+    # 浏览器
+    (r"(打开|访问|浏览|进入|跳转到).{0,20}(网页|网站|网址|浏览器|页面|链接|标签页)", True, 0.9),
+    (r"(打开|访问)\s*(https?://|www\.)|(https?://|www\.)\S+", True, 0.8),
+    (r"(用|在)(google|谷歌|百度|bing|必应).{0,6}(搜索|搜一下|查)", True, 0.9),
+    (r"(搜索一下|搜一下|帮我搜)", True, 0.7),
+    (r"(打开|访问)(百度|谷歌|google|github|知乎|淘宝|京东|b站|bilibili|youtube)", True, 0.9),
+    # 天气
+    (r"(天气|气温|温度|下雨|下雪|降雨|刮风|空气质量|天气预报|几度|多少度)", True, 0.8),
+    # 一般对话和知识问答
+    (r"^\s*(你好|您好|嗨|哈喽|hi|hello|hey|早上好|晚上好|谢谢|多谢|感谢|再见|拜拜|好的|ok)\W*$", False, 1.0),
+    (r"(你是谁|你能做什么|你会什么|介绍一下你自己)", False, 0.9),
+    (r"(写一首|写一篇|写个故事|讲个笑话|编一个|创作|翻译一下)", False, 0.9),
+    (r"(是什么|什么是|什么叫|啥是|含义|定义|概念|原理|区别|差异|优缺点|好处|坏处|对比)", False, 0.8),
+    (r"(为什么|为何|怎么理解|如何理解|解释一下|讲一下|讲讲|介绍一下|科普)", False, 0.7),
+    (r"(如何|怎么|怎样|应该).{0,12}(学习|提高|准备|选择|规划|写|理解|使用)", False, 0.6),
+    (r"(建议|推荐|意见|经验|心得|注意事项)", False, 0.4),
+    (r"^\s*[\d\s+\-*/().=×÷]+(等于多少|是多少|=)?\s*[?？]?\s*$", False, 0.9),
+    (r"(等于多少|算一下|计算一下)", False, 0.6),
+]
+
+# 上一轮使用了工具时，这些简短的追问沿用工具模式
+FOLLOW_UP_PATTERN = r"^\s*(继续|再来|再执行|再打开|再查|接着|然后呢|还有呢|换成|改成|那|同样|刚才|上面|明天呢|后天呢)"
+
+# 相似度分类器的带标签示例: (问题, 是否需要工具)
+EXEMPLARS: List[Tuple[str, bool]] = [
+    ("帮我执行 ls -la 命令", True),
+    ("运行一下这个python脚本", True),
+    ("看看当前目录下有哪些文件", True),
+    ("查看磁盘使用情况", True),
+    ("显示当前的工作目录", True),
+    ("有哪些命令可以安全执行", True),
+    ("分析一下我电脑上安装的应用", True),
+    ("根据我安装的软件推断我的职业", True),
+    ("给我做一个用户画像", True),
+    ("我适合什么职业，分析一下我的应用", True),
+    ("打开百度", True),
+    ("用浏览器打开 https://github.com", True),
+    ("在谷歌上搜索 langchain 教程", True),
+    ("同时打开知乎和B站", True),
+    ("用浏览器打开本地的report.html文件", True),
+    ("检查一下有哪些浏览器可用", True),
+    ("北京今天天气怎么样", True),
+    ("上海明天会下雨吗", True),
+    ("查一下深圳的气温", True),
+    ("杭州这周的天气预报", True),
+    ("你好", False),
+    ("谢谢你", False),
+    ("你能做什么", False),
+    ("什么是人工智能", False),
+    ("解释一下什么是机器学习", False),
+    ("Python和Java有什么区别", False),
+    ("如何提高编程能力", False),
+    ("给我写一首关于春天的诗", False),
+    ("讲个笑话", False),
+    ("3加5等于多少", False),
+    ("推荐几本好书", False),
+    ("程序员的职业发展有什么建议", False),
+    ("为什么天空是蓝色的", False),
+    ("帮我写一个故事", False),
+    ("面试时应该怎么介绍自己", False),
+    ("学习英语有什么好方法", False),
+]
+
+
+def create_router(llm_judge: Optional[Callable[[str], Awaitable[bool]]] = None,
+                  mode: Optional[str] = None, threshold: Optional[float] = None) -> ToolRouter:
+    """按本项目的规则和示例创建路由器，未指定的参数使用环境变量配置"""
+    return build_router(KEYWORD_RULES, EXEMPLARS, FOLLOW_UP_PATTERN, llm_judge=llm_judge,
+                        mode=mode, threshold=threshold)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+工具结果输出格式基准测试
+
+比较 text、json-compact、columnar、csv 四种输出格式在示例表上的负载字节数和估算token数。
+默认使用内置的示例员工表，无需连接数据库；指定 --database 和 --table 时读取真实表数据。
+
+用法:
+    python benchmark_result_formats.py
+    python benchmark_result_formats.py --rows 500
+    python benchmark_result_formats.py --database company --table employees --rows 100
+"""
+
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers"))
+
+from result_format import (OUTPUT_FORMATS, encode_rows, render_query_text,  # noqa: E402
+                           render_columns_text, render_indexes_text)
+
+# 匹配CJK字符，中文通常每个字符约1个token
+CJK_PATTERN = re.compile(r'[㐀-鿿豈-﫿\U00020000-\U0002ffff]')
+
+
+def load_token_counter() -> Tuple[str, Callable[[str], int]]:
+    """优先使用 tiktoken 精确计数，未安装时使用字符启发式估算"""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return "tiktoken/cl100k_base", lambda text: len(encoding.encode(text))
+    except Exception:
+        def estimate(text: str) -> int:
+            cjk = len(CJK_PATTERN.findall(text))
+            other = len(text) - cjk
+            # 非中文字符约4个字符1个token，emoji等符号按1个token计
+            return cjk + (other + 3) // 4
+        return "启发式估算(CJK=1, 其他字符/4)", estimate
+
+
+def sample_employees(row_count: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """生成示例员工表数据"""
+    rng = random.Random(42)
+    departments = ["技术部", "市场部", "销售部", "财务部", "人力资源部"]
+    surnames = "张王李赵刘陈杨黄周吴"
+    given_names = "伟芳娜敏静丽强磊军洋"
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+
+    columns = ["id", "name", "age", "department", "email", "salary", "created_at"]
+    rows = []
+    for i in range(1, row_count + 1):
+        rows.append({
+            "id": i,
+            "name": rng.choice(surnames) + rng.choice(given_names),
+            "age": rng.randint(22, 60),
+            "department": rng.choice(departments),
+            "email": f"user{i}@example.com",
+            "salary": f"{rng.randint(5000, 50000)}.00",
+            "created_at": base + datetime.timedelta(minutes=rng.randint(0, 500000)),
+        })
+    return columns, rows
+
+
+def sample_describe() -> Tuple[List[str], List[Tuple]]:
+    """示例员工表的 DESCRIBE 结果"""
+    columns = ["Field", "Type", "Null", "Key", "Default", "Extra"]
+    rows = [
+        ("id", "int", "NO", "PRI", None, "auto_increment"),
+        ("name", "varchar(100)", "NO", "", None, ""),
+        ("age", "int", "YES", "", None, ""),
+        ("department", "varchar(50)", "NO", "MUL", "技术部", ""),
+        ("email", "varchar(255)", "YES", "UNI", None, ""),
+        ("salary", "decimal(10,2)", "YES", "", None, ""),
+        ("created_at", "timestamp", "NO", "", "CURRENT_TIMESTAMP", "DEFAULT_GENERATED"),
+    ]
+    return columns, rows
+
+
+def sample_indexes() -> Tuple[List[str], List[Tuple]]:
+    """示例员工表的 SHOW INDEX 结果"""
+    columns = ["Table", "Non_unique", "Key_name", "Seq_in_index", "Column_name", "Collation",
+               "Cardinality", "Sub_part", "Packed", "Null", "Index_type", "Comment",
+               "Index_comment", "Visible", "Expression"]
+    rows = [
+        ("employees", 0, "PRIMARY", 1, "id", "A", 1000, None, None, "", "BTREE", "", "", "YES", None),
+        ("employees", 0, "uk_email", 1, "email", "A", 1000, None, None, "YES", "BTREE", "", "", "YES", None),
+        ("employees", 1, "idx_department", 1, "department", "A", 5, None, None, "", "BTREE", "", "", "YES", None),
+        ("employees", 1, "idx_dept_age", 1, "department", "A", 5, None, None, "", "BTREE", "", "", "YES", None),
+        ("employees", 1, "idx_dept_age", 2, "age", "A", 190, None, None, "YES", "BTREE", "", "", "YES", None),
+    ]
+    return columns, rows
+
+
+def load_live_table(database: str, table: str, row_count: int):
+    """从真实数据库读取表数据、表结构和索引"""
+    import pymysql
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    connection = pymysql.connect(
+        host=os.getenv('MYSQL_HOST', '127.0.0.1'),
+        port=int(os.getenv('MYSQL_PORT', '3306')),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', '123456'),
+        database=database,
+        charset='utf8mb4',
+    )
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(f"SELECT * FROM `{table}` LIMIT %s", (row_count,))
+            rows = cursor.fetchall()
+            query = ([desc[0] for desc in cursor.description], rows)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DESCRIBE `{table}`")
+            describe = ([desc[0] for desc in cursor.description], cursor.fetchall())
+            cursor.execute(f"SHOW INDEX FROM `{table}`")
+            indexes = ([desc[0] for desc in cursor.description], cursor.fetchall())
+    finally:
+        connection.close()
+    return query, describe, indexes
+
+
+def encode_all(kind: str, database: str, table: str, columns: Sequence[str], rows: Sequence) -> Dict[str, str]:
+    """按所有输出格式编码同一份结果"""
+    if kind == "query_data":
+        text = render_query_text(table, list(rows))
+        tuples = [[row[col] for col in columns] for row in rows]
+    elif kind == "describe_table":
+        text = render_columns_text(database, table, rows)
+        tuples = rows
+    else:
+        text = render_indexes_text(database, table, rows)
+        tuples = rows
+
+    payloads = {"text": text}
+    for output_format in OUTPUT_FORMATS:
+        if output_format != "text":
+            payloads[output_format] = encode_rows(columns, tuples, output_format)
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较MCP工具结果输出格式的负载大小")
+    parser.add_argument("--rows", type=int, default=100, help="query_data 的行数，默认100")
+    parser.add_argument("--database", help="真实数据库名称（可选）")
+    parser.add_argument("--table", help="真实表名称（可选）")
+    args = parser.parse_args()
+
+    if args.database and args.table:
+        database, table = args.database, args.table
+        query, describe, indexes = load_live_table(database, table, args.rows)
+    else:
+        database, table = "company", "employees"
+        query, describe, indexes = sample_employees(args.rows), sample_describe(), sample_indexes()
+
+    counter_name, count_tokens = load_token_counter()
+    print(f"🚀 输出格式基准测试: {database}.{table}")
+    print(f"🔢 token计数方式: {counter_name}")
+
+    for kind, (columns, rows) in (("query_data", query), ("describe_table", describe),
+                                  ("show_table_indexes", indexes)):
+        payloads = encode_all(kind, database, table, columns, rows)
+        text_bytes = len(payloads["text"].encode("utf-8"))
+        text_tokens = count_tokens(payloads["text"])
+
+        print(f"\n📊 {kind} ({len(rows)} 行)")
+        print("=" * 64)
+        print(f"{'格式':<14} {'字节数':>10} {'token数':>10} {'字节占比':>10} {'token占比':>10}")
+        print("-" * 64)
+        for output_format, payload in payloads.items():
+            size = len(payload.encode("utf-8"))
+            tokens = count_tokens(payload)
+            print(f"{output_format:<14} {size:>10} {tokens:>10} "
+                  f"{size / text_bytes:>10.1%} {tokens / text_tokens:>10.1%}")
+        print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+工具调用路由基准测试
+
+在带标签的问题集上评估本项目的路由规则（tool_router.py）的准确率、本地判断覆盖率和单次判断耗时。
+问题集与 tool_router.EXEMPLARS 中的示例不重复，避免相似度分类器直接命中训练示例。
+默认不请求大模型；指定 --llm 时对本地置信度不足的问题调用与 mcp_client.py 相同的大模型判断，
+统计回退后的整体准确率和大模型判断耗时（需要配置 .env 中的模型参数）。
+评估逻辑位于 mcp_client_common/router_benchmark.py，本脚本只定义本项目的问题集。
+
+用法:
+    python benchmark_tool_router.py
+    python benchmark_tool_router.py --threshold 0.5 --show-errors
+    python benchmark_tool_router.py --llm
+"""
+
+from typing import List, Tuple
+
+# tool_router 会把仓库根目录加入 sys.path，需要先于 mcp_client_common 导入
+import tool_router
+from mcp_client_common import router_benchmark
+
+# 带标签的问题集: (问题, 是否需要工具)
+LABELED_QUERIES: List[Tuple[str, bool]] = [
+    ("新建一个叫school的数据库", True),
+    ("在school库中创建学生表，包含学号、姓名、班级", True),
+    ("列出所有的数据库", True),
+    ("school数据库有几张表", True),
+    ("students表有哪些字段", True),
+    ("看看products表都建了哪些索引", True),
+    ("往students表里添加一个学生：李四，18岁，三班", True),
+    ("把王五的班级改为二班", True),
+    ("删掉students表里所有毕业的学生", True),
+    ("查一下三班有多少学生", True),
+    ("查询工资最高的10个员工", True),
+    ("显示orders表最近的20条记录", True),
+    ("给我看看employees的建表语句", True),
+    ("评估一下我的订单表设计", True),
+    ("审计一下company库的所有表", True),
+    ("把employees表的数据备份成文件", True),
+    ("导入 users.ndjson 到 users 表", True),
+    ("SELECT * FROM orders WHERE status = 'paid'", True),
+    ("show tables", True),
+    ("describe employees", True),
+    ("帮我看看这条查询 select * from users where age > 30 的执行计划", True),
+    ("orders表上有没有冗余索引", True),
+    ("统计一下各个城市的订单金额", True),
+    ("给products表的name字段加索引", True),
+    ("把users表的phone字段长度改成32", True),
+    ("logs表现在有多大", True),
+    ("company库里的员工表数据量有多少", True),
+    ("找一下邮箱为空的用户", True),
+    ("表设计分析一下customers", True),
+    ("批量插入三条订单数据", True),
+    ("嗨", False),
+    ("早上好", False),
+    ("多谢", False),
+    ("主键和唯一索引有什么不同", False),
+    ("什么叫覆盖索引", False),
+    ("讲一下B+树索引的原理", False),
+    ("MySQL为什么推荐使用InnoDB", False),
+    ("乐观锁和悲观锁的区别", False),
+    ("如何优化慢查询", False),
+    ("怎么设计电商系统的订单表", False),
+    ("group by 的语法是怎样的", False),
+    ("有没有数据库设计的注意事项", False),
+    ("解释一下MVCC", False),
+    ("redo log和binlog有什么区别", False),
+    ("字段用datetime还是timestamp好", False),
+    ("联合索引的最左前缀原则是什么", False),
+    ("你是谁", False),
+    ("写一个查询每个部门平均工资的SQL示例", False),
+    ("数据库连接池有什么好处", False),
+    ("一般一张表建多少个索引比较合适", False),
+    ("死锁是怎么产生的", False),
+    ("帮我写一首关于数据库的诗", False),
+]
+
+
+def load_llm_judge():
+    from mcp_client import judge_with_llm
+    return judge_with_llm
+
+
+if __name__ == "__main__":
+    router_benchmark.main(LABELED_QUERIES, tool_router, load_llm_judge)
@@ -2,17 +2,24 @@ import asyncio
 import sys
 import os
 from dotenv import load_dotenv
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.prebuilt import create_react_agent
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from pydantic import SecretStr
-
-# 加载环境变量
+
+# 加载环境变量，需要在导入本地模块之前完成，路由、并行执行、对话记忆和连接配置在导入时读取
 load_dotenv()
 
+from langchain_mcp_adapters.client import MultiServerMCPClient  # noqa: E402
+from langgraph.prebuilt import create_react_agent  # noqa: E402
+from langchain_openai import ChatOpenAI  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder  # noqa: E402
+from pydantic import SecretStr  # noqa: E402
+from tool_router import create_router, format_decision  # noqa: E402
+
+# 并行执行和对话记忆与 chain_analysis 共用，位于仓库根目录的 mcp_client_common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mcp_client_common.parallel_tools import ParallelToolExecutor, load_tools_by_server, format_timeline  # noqa: E402
+from mcp_client_common.token_memory import TokenBudgetMemory, format_memory_stats  # noqa: E402
+from mcp_connections import server_connections  # noqa: E402
+
 # 初始化 ChatOpenAI 大模型客户端
 llm = ChatOpenAI(
     model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),  # 从环境变量获取模型名称
@@ -39,17 +46,44 @@ def create_smart_prompt():
 - describe_table: 查看表的详细结构（字段名、类型、约束、默认值等）
 - show_table_indexes: 显示表的索引信息
 - show_create_table: 显示创建表的完整SQL语句
+- query_data、describe_table、show_table_indexes 支持 output_format 参数（text | json-compact | columnar | csv），
+  只需读取数据而无需展示给用户时优先使用 columnar，可显著减少结果长度
 
 📝 数据操作：
 - insert_data: 向表中插入数据
+- bulk_insert_data: 批量插入多行数据（JSON数组或NDJSON，分批多行INSERT，单事务，支持 ignore/upsert 模式）
 - update_data: 更新表中的数据
 - delete_data: 删除表中的数据
-- query_data: 查询表中的数据
+- execute_batch: 在一个事务中按顺序执行多个插入/更新/删除（支持保存点和 dry_run 试运行），
+  一次修改涉及多张表或多条语句时使用，全部成功才提交，任一失败全部回滚
+- query_data: 查询表中的数据（相同查询的结果会短暂缓存，需要读取其他客户端刚写入的数据时传 use_cache=false）
+- query_data、update_data、delete_data 支持 filters 结构化条件（如 [{"column": "age", "op": ">", "value": 18}]）
+  或 where_condition 模板加 where_params 参数（如 "age > %s" 和 [18]），值由数据库绑定，优先于直接拼接条件值
+- query_data_page: 按主键分页查询大表（支持字段投影，返回 next_page_token 用于获取下一页）
+- export_table: 将整张表或查询结果导出为本地 CSV / NDJSON / Parquet 文件，只返回文件路径、行数和大小
+  （用户需要导出、备份或获取大量数据时使用，不要用 query_data 逐页读取）
+- import_file: 将本地 CSV / NDJSON 文件导入表中（mode 可选 insert / ignore / upsert），导入前自动校验字段和类型
+  （用户需要从文件导入大量数据时使用，不要逐行调用 insert_data）
+- explain_query: 分析SQL执行计划，识别全表扫描、文件排序、临时表并推荐候选索引
+  （条件不确定的大范围更新、删除前先用它检查；被拦截的操作确认无误后可传 force=true 执行）
+- plan_schema_change: 规划 ALTER TABLE，判断能否 INSTANT / INPLACE 执行、是否重建表或阻塞写入，并估算耗时
+- apply_schema_change: 执行 ALTER TABLE，大表上需要重建的变更自动使用按复制延迟限流的影子表复制
+  （修改已有表的结构前先用 plan_schema_change 规划并告知用户，确认后再执行）
 
 🎯 表设计分析（新功能！）：
 - analyze_table_design: 全面分析表设计，提供专业评判和优化建议
 - get_table_structure_info: 获取表的完整结构信息（字段、索引、状态等）
 - check_table_performance_issues: 检查表的性能问题并提供优化建议
+- analyze_database_design: 一次性分析整个数据库所有表的设计，输出按严重程度排序的汇总报告
+- analyze_tables_parallel: 并发分析多个表（支持 "users, order_*" 这样的列表或通配符），带总时限
+- detect_redundant_indexes: 检测重复、左前缀冗余和未使用的索引，估算删除收益并生成 DROP INDEX 语句
+- analyze_column_selectivity: 采样统计字段的不同值数量、NULL比例和高频值，按选择性给出索引建议
+  （analyze_table_design 传 sample_data=true 时也会基于采样结果给出索引建议）
+- analyze_query_workload: 分析实际查询负载（performance_schema 语句摘要或 slow_log_path 指定的慢查询日志），
+  找出最耗时的查询并基于真实的过滤条件推荐索引（用户问"哪些查询慢"、"该加什么索引"时优先使用；
+  analyze_table_design 传 use_workload=true 时也会结合实际负载）
+- table_stats: 查看表的估算行数、数据大小、索引大小和平均行长度，不扫描表
+  （了解表有多大时使用，不要通过 COUNT(*) 查询；需要精确行数时传 exact=true，按主键区间并行计数）
 
 🎯 智能操作流程（必须遵循）：
 
@@ -92,11 +126,13 @@ def create_smart_prompt():
 3. 执行操作前，确保完全理解用户需求和表结构
 4. 如果操作失败，分析错误原因并提供具体的修正建议
 5. 始终提供清晰的操作步骤说明
+6. 多个相互独立的操作（如查看多张表的结构）请在同一步中同时发起工具调用，客户端会并行执行
 
 🔍 表设计分析使用场景：
 - 当用户询问表设计是否合理时，使用 analyze_table_design
 - 当用户需要表的完整信息时，使用 get_table_structure_info
 - 当用户关心表性能时，使用 check_table_performance_issues
+- 当用户需要审计整个数据库或多个表时，使用 analyze_database_design，不要逐表调用 analyze_table_design
 - 表设计分析会检查命名规范、数据类型、索引设计等多个维度
 
 请保持专业、友好的对话风格，帮助用户高效、安全地管理MySQL数据库。"""
@@ -108,6 +144,36 @@ def create_smart_prompt():
     
     return prompt
 
+# 本地置信度不足时使用的大模型判断
+async def judge_with_llm(user_input: str) -> bool:
+    """请求大模型判断问题是否需要调用工具"""
+    judge_prompt = f"""
+    用户问题: {user_input}
+    
+    请判断这个问题是否需要调用工具来完成任务。
+    
+    需要调用工具的情况(回答YES)：
+    - 创建MySQL数据库或表
+    - 插入、更新、删除数据库中的数据
+    - 查询数据库中的数据
+    - 查看数据库列表或表列表
+    - 查看表结构、字段信息、索引信息
+    - 显示建表语句
+    - 其他需要实际操作MySQL数据库的任务
+    
+    不需要工具的情况(回答NO)：
+    - 一般性对话、问候、闲聊
+    - MySQL概念解释、知识问答
+    - SQL语法咨询、建议交流
+    - 数据库设计建议
+    - 简单的理论性问题
+    
+    只回答YES或NO，不要其他内容。
+    """
+
+    judge_response = await llm.ainvoke([HumanMessage(content=judge_prompt)])
+    return "YES" in str(judge_response.content).upper()
+
 # 简化的结果输出函数
 def print_result(agent_response):
     """输出代理响应结果"""
@@ -131,34 +197,25 @@ async def main():
     
     try:
         # 初始化MCP客户端 - MySQL数据库控制服务器和表设计分析服务器
-        client = MultiServerMCPClient({  # type: ignore
-            "mysql": {
-                "command": "python3",
-                "args": ["./mcp_servers/mysql_server.py"],
-                "transport": "stdio",
-            },
-            "table_analyzer": {
-                "command": "python3",
-                "args": ["./mcp_servers/table_design_analyzer.py"],
-                "transport": "stdio",
-            }
-        })
-
-        tools = await client.get_tools()
+        # 守护进程运行时连接守护进程，否则启动stdio子进程
+        connections, connection_mode = server_connections(["mysql", "table_analyzer"])
+        client = MultiServerMCPClient(connections)  # type: ignore
+
+        # 按服务器加载工具，并加上按服务器的并发上限、调用超时和时间线记录
+        tool_executor = ParallelToolExecutor()
+        tools = tool_executor.wrap(await load_tools_by_server(client, list(client.connections)))
         
         # 创建带有智能提示词的代理
+        # version="v1": 同一条AI消息中的全部工具调用由一个工具节点通过 asyncio.gather 并发执行
         smart_prompt = create_smart_prompt()
-        agent = create_react_agent(llm, tools, prompt=smart_prompt)
+        agent = create_react_agent(llm, tools, prompt=smart_prompt, version="v1")
 
-        # 使用窗口记忆 - 从环境变量获取窗口大小，无需transformers包
-        memory_window_size = int(os.getenv("MEMORY_WINDOW_SIZE", "10"))
-        memory = ConversationBufferWindowMemory(
-            k=memory_window_size,    # 保留最近N轮对话
-            return_messages=True     # 返回消息对象
-        )
+        # 按token预算限制的记忆 - 保存整轮对话（含工具调用和结果），超出预算时先省略较早的大块工具输出
+        memory = TokenBudgetMemory()
 
         print("✨ MySQL数据库管理助手已启动!")
         print("🗄️ 数据库连接: 127.0.0.1:3306 (root)")
+        print(f"🔌 MCP服务器: {connection_mode}")
         print("🔧 核心功能: 创建数据库 | 创建表 | 数据增删改查 | 查看数据库/表")
         print("🔍 表结构功能: 查看表结构 | 显示索引信息 | 查看建表语句")
         print("🎯 表设计分析: 设计评判 | 性能分析 | 优化建议 (新功能!)")
@@ -167,6 +224,10 @@ async def main():
         print("💬 支持流式对话，体验更自然")
         print("输入 'exit' 退出\n")
 
+        # 工具调用路由器：本地关键词与相似度判断，只有置信度不足时才请求大模型
+        router = create_router(judge_with_llm)
+        need_tools = False
+
         # 对话循环
         while True:
             user_input = input("💬 问题: ").strip()
@@ -179,50 +240,27 @@ async def main():
                 continue
             
             # 获取历史消息并添加当前用户输入
-            messages = memory.chat_memory.messages.copy()
-            messages.append(HumanMessage(content=user_input))
-            
-            # 先用LLM判断是否需要工具
-            print("🤔 分析问题中...")
-            
-            # 创建判断提示
-            judge_prompt = f"""
-            用户问题: {user_input}
-            
-            请判断这个问题是否需要调用工具来完成任务。
-            
-            需要调用工具的情况(回答YES)：
-            - 创建MySQL数据库或表
-            - 插入、更新、删除数据库中的数据
-            - 查询数据库中的数据
-            - 查看数据库列表或表列表
-            - 查看表结构、字段信息、索引信息
-            - 显示建表语句
-            - 其他需要实际操作MySQL数据库的任务
-            
-            不需要工具的情况(回答NO)：
-            - 一般性对话、问候、闲聊
-            - MySQL概念解释、知识问答
-            - SQL语法咨询、建议交流
-            - 数据库设计建议
-            - 简单的理论性问题
-            
-            只回答YES或NO，不要其他内容。
-            """
+            user_message = HumanMessage(content=user_input)
+            messages = memory.messages
+            messages.append(user_message)
             
-            judge_response = await llm.ainvoke([HumanMessage(content=judge_prompt)])
-            need_tools = "YES" in str(judge_response.content).upper()
+            # 先判断是否需要工具：本地路由器判断，置信度不足时才请求大模型
+            decision = await router.route(user_input, previous_used_tools=need_tools)
+            print(f"🧭 {format_decision(decision)}")
+            need_tools = decision.need_tools
             
             if need_tools:
                 print("🔧 检测到需要工具调用，启动增强模式...")
                 ai_response = ""
                 tool_used = False
+                turn_messages = [user_message]
                 
                 # 使用agent处理工具调用
                 async for chunk in agent.astream({"messages": messages}):
                     for node_name, node_output in chunk.items():
                         if node_name == "agent":
                             messages_in_chunk = node_output.get("messages", [])
+                            turn_messages.extend(messages_in_chunk)
                             for msg in messages_in_chunk:
                                 if msg.type == "ai":
                                     if hasattr(msg, "tool_calls") and msg.tool_calls:
@@ -235,6 +273,7 @@ async def main():
                         
                         elif node_name == "tools":
                             messages_in_chunk = node_output.get("messages", [])
+                            turn_messages.extend(messages_in_chunk)
                             for msg in messages_in_chunk:
                                 if msg.type == "tool":
                                     print(f"✅ 工具 '{msg.name}' 执行完成")
@@ -251,6 +290,9 @@ async def main():
                                                 print(f"❌ 错误: {stderr}")
                                     except:
                                         print(f"📄 原始结果: {msg.content}")
+                            timeline = format_timeline(tool_executor.trace.pop_step())
+                            if timeline:
+                                print(timeline)
                 
                 if ai_response:
                     print(f"\n🎯 最终回答: {ai_response}")
@@ -268,14 +310,12 @@ async def main():
                         ai_response += content_str
                 
                 print()  # 换行
+                turn_messages = [user_message, AIMessage(content=ai_response)]
             
-            # 保存对话到记忆
+            # 保存本轮对话到记忆，记忆按token预算压缩历史
             if ai_response:
-                memory.save_context(
-                    {"input": user_input},
-                    {"output": str(ai_response)}
-                )
-                print("✓ 对话已保存到记忆")
+                memory.add_turn(turn_messages)
+                print(f"✓ 对话已保存，{format_memory_stats(memory.stats())}")
             else:
                 print("⚠️ 未获取到AI回复")
 
@@ -0,0 +1,104 @@
+"""
+MCP服务器连接配置
+
+守护进程（mcp_servers/mcp_daemon.py）运行时通过 streamable-HTTP 连接，复用其中已导入的服务器、
+连接池和缓存；未运行时回退为每个客户端各自启动 stdio 子进程。
+
+连接方式可通过环境变量配置：MCP_DAEMON（auto: 检测守护进程是否运行，默认；on: 必须使用守护进程；
+off: 始终使用stdio），守护进程地址与 mcp_daemon.py 相同：MCP_DAEMON_HOST、MCP_DAEMON_PORT、MCP_DAEMON_SOCKET
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 守护进程连接配置 - 从环境变量获取
+DAEMON_CONFIG = {
+    'mode': os.getenv('MCP_DAEMON', 'auto').lower(),
+    'host': os.getenv('MCP_DAEMON_HOST', '127.0.0.1'),
+    'port': int(os.getenv('MCP_DAEMON_PORT', '8765')),
+    'socket': os.getenv('MCP_DAEMON_SOCKET', ''),
+}
+
+# 以 stdio 子进程方式启动的服务器
+STDIO_SERVERS: Dict[str, Dict[str, Any]] = {
+    "mysql": {
+        "command": "python3",
+        "args": ["./mcp_servers/mysql_server.py"],
+        "transport": "stdio",
+    },
+    "table_analyzer": {
+        "command": "python3",
+        "args": ["./mcp_servers/table_design_analyzer.py"],
+        "transport": "stdio",
+    },
+}
+
+
+def daemon_url() -> str:
+    """守护进程的HTTP地址；使用Unix套接字时主机名只用于Host请求头"""
+    host = 'localhost' if DAEMON_CONFIG['socket'] else DAEMON_CONFIG['host']
+    if ':' in host:
+        host = f"[{host}]"
+    return f"http://{host}:{DAEMON_CONFIG['port']}"
+
+
+def unix_socket_client_factory(path: str):
+    """创建通过Unix套接字连接的httpx客户端工厂，参数与MCP默认的客户端工厂一致"""
+
+    def factory(headers: Optional[Dict[str, str]] = None, timeout: Optional[httpx.Timeout] = None,
+                auth: Optional[httpx.Auth] = None) -> httpx.AsyncClient:
+        kwargs: Dict[str, Any] = {"transport": httpx.AsyncHTTPTransport(uds=path)}
+        if headers is not None:
+            kwargs["headers"] = headers
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        if auth is not None:
+            kwargs["auth"] = auth
+        return httpx.AsyncClient(**kwargs)
+
+    return factory
+
+
+def probe_daemon(timeout: float = 0.5) -> Optional[Dict[str, Any]]:
+    """检测守护进程是否运行，返回其状态；未运行时返回None"""
+    transport = httpx.HTTPTransport(uds=DAEMON_CONFIG['socket']) if DAEMON_CONFIG['socket'] else None
+    try:
+        with httpx.Client(transport=transport, timeout=timeout) as client:
+            response = client.get(f"{daemon_url()}/health")
+            response.raise_for_status()
+            return response.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def server_connections(names: Optional[List[str]] = None) -> Tuple[Dict[str, Dict[str, Any]], str]:
+    """
+    生成 MultiServerMCPClient 的服务器配置
+
+    Args:
+        names: 需要的服务器名称，默认全部
+
+    Returns:
+        (服务器配置, 连接方式说明)
+    """
+    names = names or list(STDIO_SERVERS)
+    if DAEMON_CONFIG['mode'] != 'off':
+        health = probe_daemon()
+        if health is not None:
+            connections = {}
+            for name in names:
+                connection: Dict[str, Any] = {"transport": "streamable_http", "url": f"{daemon_url()}/{name}/mcp"}
+                if DAEMON_CONFIG['socket']:
+                    connection["httpx_client_factory"] = unix_socket_client_factory(DAEMON_CONFIG['socket'])
+                connections[name] = connection
+            address = DAEMON_CONFIG['socket'] or daemon_url()
+            return connections, f"守护进程 {address} (pid {health['pid']}, 已运行 {health['uptime']:.0f} 秒)"
+        if DAEMON_CONFIG['mode'] == 'on':
+            raise RuntimeError("MCP_DAEMON=on 但守护进程未运行，请先执行: python mcp_servers/mcp_daemon.py serve")
+    return {name: dict(STDIO_SERVERS[name]) for name in names}, "stdio子进程"
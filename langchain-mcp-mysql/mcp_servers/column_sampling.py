@@ -0,0 +1,200 @@
+"""
+字段数据分布采样
+
+索引建议只看字段名无法判断索引是否有效：状态、性别这类字段即使以 _id 结尾，区分度也很低。
+本模块通过有界采样估算每个字段的数据分布，供索引建议按选择性排序：
+- 小表（行数不超过采样行数）直接全量读取，结果精确
+- 大表按主键范围采样：在主键取值区间内随机选取若干起点，每个起点沿主键索引读取一小段，
+  总读取行数固定，与表大小无关，在十亿行的表上同样只需几次索引范围扫描
+- 没有可用的整数主键时退化为读取前N行，并在结果中标明可能存在偏差
+
+采样结果包括：估算不同值数量（Haas-Stokes Duj1 估计量）、NULL比例、最高频值及其占比。
+采样行数可通过环境变量 MYSQL_SAMPLE_ROWS 配置。
+
+本模块只依赖标准库和 pymysql，便于单独测试。
+"""
+
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 采样默认配置 - 从环境变量获取
+SAMPLE_CONFIG = {
+    'sample_rows': int(os.getenv('MYSQL_SAMPLE_ROWS', '10000')),
+    # 主键范围采样的分段数，分段越多越不容易受数据聚集影响，但查询次数越多
+    'chunks': int(os.getenv('MYSQL_SAMPLE_CHUNKS', '10')),
+}
+
+# 不参与采样的字段类型：大字段读取代价高，也不适合直接建立索引
+_UNSAMPLED_TYPES = ('text', 'blob', 'json', 'geometry', 'point', 'linestring', 'polygon')
+
+# 可用于主键范围采样的整数类型
+_INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint')
+
+
+def _base_type(column_type: str) -> str:
+    """提取字段的基础类型，如 'varchar(100)' -> 'varchar'"""
+    match = re.match(r'[a-z]+', column_type.lower())
+    return match.group(0) if match else column_type.lower()
+
+
+def is_sampleable(column_type: str) -> bool:
+    """字段类型是否适合采样"""
+    base_type = _base_type(column_type)
+    return not any(base_type.endswith(unsampled) for unsampled in _UNSAMPLED_TYPES)
+
+
+def is_integer_type(column_type: str) -> bool:
+    """字段是否为整数类型"""
+    return _base_type(column_type) in _INTEGER_TYPES
+
+
+def sample_table(connection: pymysql.Connection, table_name: str, columns: Sequence[str],
+                 total_rows: int, pk_column: Optional[str] = None,
+                 sample_rows: Optional[int] = None, chunks: Optional[int] = None,
+                 rng: Optional[random.Random] = None) -> Tuple[List[tuple], str]:
+    """
+    对表进行有界采样
+
+    Args:
+        connection: 数据库连接
+        table_name: 表名称
+        columns: 需要采样的字段
+        total_rows: 表的估算总行数
+        pk_column: 整数主键（或联合主键的第一个字段），为None时退化为读取前N行
+        sample_rows: 采样行数，默认使用 MYSQL_SAMPLE_ROWS
+        chunks: 主键范围采样的分段数
+
+    Returns:
+        Tuple[List[tuple], str]: (采样行, 采样方式 full / pk-range / first-n)
+    """
+    sample_rows = sample_rows or SAMPLE_CONFIG['sample_rows']
+    chunks = max(1, chunks or SAMPLE_CONFIG['chunks'])
+    rng = rng or random.Random()
+    column_sql = ", ".join(f"`{col}`" for col in columns)
+
+    with connection.cursor() as cursor:
+        if total_rows <= sample_rows:
+            # 多读一行用于判断统计信息是否低估了表的大小
+            cursor.execute(f"SELECT {column_sql} FROM `{table_name}` LIMIT %s", (sample_rows + 1,))
+            rows = list(cursor.fetchall())
+            if len(rows) <= sample_rows:
+                return rows, 'full'
+            if pk_column is None:
+                return rows[:sample_rows], 'first-n'
+        elif pk_column is None:
+            cursor.execute(f"SELECT {column_sql} FROM `{table_name}` LIMIT %s", (sample_rows,))
+            return list(cursor.fetchall()), 'first-n'
+
+        cursor.execute(f"SELECT MIN(`{pk_column}`), MAX(`{pk_column}`) FROM `{table_name}`")
+        low, high = cursor.fetchone()
+        if low is None:
+            return [], 'full'
+
+        # 起点排序后依次读取，跳过与上一段重叠的部分，避免同一行被重复计入
+        chunk_rows = max(1, sample_rows // chunks)
+        starts = sorted(rng.randint(int(low), int(high)) for _ in range(chunks))
+        rows = []
+        next_start = None
+        for start in starts:
+            if next_start is not None and start < next_start:
+                start = next_start
+            cursor.execute(
+                f"SELECT `{pk_column}`, {column_sql} FROM `{table_name}` "
+                f"WHERE `{pk_column}` >= %s ORDER BY `{pk_column}` LIMIT %s",
+                (start, chunk_rows)
+            )
+            chunk = cursor.fetchall()
+            if not chunk:
+                continue
+            rows.extend(row[1:] for row in chunk)
+            next_start = int(chunk[-1][0]) + 1
+    return rows, 'pk-range'
+
+
+def estimate_distinct(counts: Counter, sample_size: int, total_rows: int) -> int:
+    """
+    根据采样中各值的出现次数估算整表的不同值数量
+
+    使用 Haas-Stokes 的 Duj1 估计量: D = n·d / (n - f1 + f1·n/N)，
+    其中 n 为采样行数，d 为采样中的不同值数，f1 为只出现一次的值的数量，N 为总行数。
+    """
+    distinct = len(counts)
+    if sample_size == 0 or distinct == 0:
+        return 0
+    if sample_size >= total_rows:
+        return distinct
+    singletons = sum(1 for count in counts.values() if count == 1)
+    denominator = sample_size - singletons + singletons * sample_size / total_rows
+    estimate = sample_size * distinct / denominator if denominator > 0 else distinct
+    return int(round(min(max(estimate, distinct), total_rows)))
+
+
+def column_statistics(columns: Sequence[str], rows: Sequence[Sequence[Any]], total_rows: int,
+                      top_k: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    根据采样行计算每个字段的分布统计
+
+    Returns:
+        Dict[str, Dict]: 字段名 -> {'distinct', 'distinct_ratio', 'null_fraction', 'top_values', 'sample_size'}
+        distinct_ratio 为不同值数量占非NULL行数的比例，越接近1选择性越好；
+        top_values 为 [(值, 占采样行比例)]
+    """
+    sample_size = len(rows)
+    total_rows = max(total_rows, sample_size)
+    stats = {}
+    for position, column in enumerate(columns):
+        counts = Counter(row[position] for row in rows)
+        nulls = counts.pop(None, 0)
+        non_null = sample_size - nulls
+        null_fraction = nulls / sample_size if sample_size else 0.0
+        non_null_total = max(1, int(round(total_rows * (1 - null_fraction))))
+        distinct = estimate_distinct(counts, non_null, non_null_total)
+        stats[column] = {
+            'distinct': distinct,
+            'distinct_ratio': distinct / non_null_total if non_null else 0.0,
+            'null_fraction': null_fraction,
+            'top_values': [(value, count / sample_size) for value, count in counts.most_common(top_k)],
+            'sample_size': sample_size,
+        }
+    return stats
+
+
+def selectivity_level(stat: Dict[str, Any]) -> str:
+    """按区分度和数据倾斜程度划分选择性等级: high / medium / low"""
+    top_fraction = stat['top_values'][0][1] if stat['top_values'] else 0.0
+    if stat['distinct_ratio'] >= 0.1 and top_fraction < 0.1:
+        return 'high'
+    if stat['distinct_ratio'] >= 0.01 or (stat['distinct'] >= 100 and top_fraction < 0.3):
+        return 'medium'
+    return 'low'
+
+
+def _format_value(value: Any, limit: int = 16) -> str:
+    """将字段值格式化为简短文本"""
+    if isinstance(value, bytes):
+        value = value.hex()
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def format_column_stats(stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    """将字段分布统计格式化为对齐的文本行，按区分度从高到低排序"""
+    lines = [f"{'字段名':<20} {'估算不同值':>12} {'区分度':>8} {'NULL比例':>9}  最高频值(占比)"]
+    lines.append("-" * 90)
+    for column, stat in sorted(stats.items(), key=lambda item: -item[1]['distinct_ratio']):
+        # 只出现一次的值不具代表性，不作为高频值展示
+        top_values = ", ".join(f"{_format_value(value)}({fraction:.0%})"
+                               for value, fraction in stat['top_values'][:3]
+                               if fraction * stat['sample_size'] > 1)
+        lines.append(f"{column:<20} {stat['distinct']:>12} {stat['distinct_ratio']:>8.2%} "
+                     f"{stat['null_fraction']:>9.1%}  {top_values or '-'}")
+    return lines
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+MCP服务器常驻守护进程
+
+客户端以 stdio 方式连接时，每次运行 mcp_client.py 或 test_table_analyzer.py 都会重新启动服务器子进程，
+重复支付解释器、pydantic、FastMCP、pymysql 的导入开销，连接池和各类缓存也随子进程退出而丢失。
+守护进程在一个进程中同时托管 mysql_server.py 和 table_design_analyzer.py，通过 streamable-HTTP 提供服务：
+- 两个服务器分别挂载在 /mysql/mcp 和 /table_analyzer/mcp，多个客户端可同时连接
+- 进程内共享连接池、异步执行引擎、表结构缓存、查询结果缓存
+- 只监听本机地址或 Unix 套接字；GET /health 返回进程、连接池和缓存状态
+- 收到 SIGHUP 时平滑重载：启动继承监听套接字的新进程（重新加载代码和 .env），新进程就绪后
+  当前进程停止接受新连接，等待进行中的请求完成后退出；新进程启动失败时当前进程继续服务
+- 收到 SIGTERM/SIGINT 时等待进行中的请求完成后退出
+
+守护进程参数可通过环境变量配置：MCP_DAEMON_HOST、MCP_DAEMON_PORT、MCP_DAEMON_SOCKET（设置后监听该Unix套接字）、
+MCP_DAEMON_DRAIN_TIMEOUT（等待进行中请求的秒数）、MCP_DAEMON_RELOAD_TIMEOUT（等待新进程就绪的秒数）、
+MCP_DAEMON_PID_FILE
+
+用法:
+    python mcp_servers/mcp_daemon.py serve
+    python mcp_servers/mcp_daemon.py status
+    python mcp_servers/mcp_daemon.py reload
+    python mcp_servers/mcp_daemon.py stop
+"""
+
+import argparse
+import asyncio
+import importlib
+import ipaddress
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+import httpx
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+# 加载 .env 之前的环境变量；重载时新进程从这里开始重新读取 .env，否则继承的旧值会覆盖修改后的 .env
+BASE_ENVIRON = dict(os.environ)
+
+# 加载环境变量，需要在导入本地模块之前完成，各模块在导入时读取配置
+load_dotenv()
+
+from mysql_async import get_async_engine  # noqa: E402
+from mysql_pool import get_pool_manager, format_pool_stats  # noqa: E402
+from result_cache import result_cache, format_result_cache_stats  # noqa: E402
+from schema_cache import schema_cache, format_schema_cache_stats  # noqa: E402
+
+logger = logging.getLogger("mcp_daemon")
+# 管理命令访问 /health 时不输出每个HTTP请求的日志
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# 守护进程配置 - 从环境变量获取
+DAEMON_CONFIG = {
+    'host': os.getenv('MCP_DAEMON_HOST', '127.0.0.1'),
+    'port': int(os.getenv('MCP_DAEMON_PORT', '8765')),
+    'socket': os.getenv('MCP_DAEMON_SOCKET', ''),
+    'drain_timeout': float(os.getenv('MCP_DAEMON_DRAIN_TIMEOUT', '30')),
+    'reload_timeout': float(os.getenv('MCP_DAEMON_RELOAD_TIMEOUT', '60')),
+    'pid_file': os.getenv('MCP_DAEMON_PID_FILE', os.path.join(tempfile.gettempdir(), 'mcp_mysql_daemon.pid')),
+}
+
+# 托管的服务器：挂载名（与客户端配置中的服务器名一致） -> 模块名
+# 只在 serve 时导入，status/reload/stop 等管理命令不加载服务器代码
+HOSTED_SERVERS = {
+    'mysql': 'mysql_server',
+    'table_analyzer': 'table_design_analyzer',
+}
+
+
+def base_url(config: Dict[str, Any]) -> str:
+    """守护进程的HTTP地址；使用Unix套接字时主机名只用于Host请求头"""
+    host = 'localhost' if config['socket'] else config['host']
+    if ':' in host:
+        host = f"[{host}]"
+    return f"http://{host}:{config['port']}"
+
+
+def http_client(config: Dict[str, Any], timeout: float = 2.0) -> httpx.Client:
+    """访问守护进程管理接口的HTTP客户端"""
+    transport = httpx.HTTPTransport(uds=config['socket']) if config['socket'] else None
+    return httpx.Client(base_url=base_url(config), transport=transport, timeout=timeout)
+
+
+def fetch_health(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """获取守护进程状态，未运行时返回None"""
+    try:
+        with http_client(config) as client:
+            response = client.get("/health")
+            response.raise_for_status()
+            return response.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def create_listener(config: Dict[str, Any]) -> socket.socket:
+    """创建监听套接字；守护进程没有认证，只允许监听本机地址"""
+    path = config['socket']
+    if path:
+        if os.path.exists(path):
+            if fetch_health(config) is not None:
+                raise RuntimeError(f"守护进程已在 {path} 上运行")
+            # 上次异常退出遗留的套接字文件
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        os.chmod(path, 0o600)
+    else:
+        host = config['host']
+        if host != 'localhost' and not ipaddress.ip_address(host).is_loopback:
+            raise RuntimeError(f"MCP_DAEMON_HOST={host} 不是本机地址，守护进程没有认证，只能监听 127.0.0.1、::1 或 localhost")
+        sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, config['port']))
+    sock.listen(128)
+    return sock
+
+
+def wait_ready(fd: int, timeout: float) -> bool:
+    """等待新进程通过管道报告就绪；新进程退出时管道关闭，读到空数据"""
+    readable, _, _ = select.select([fd], [], [], timeout)
+    return bool(readable) and os.read(fd, 1) == b"1"
+
+
+class MCPDaemon:
+    """
+    在一个进程中托管多个FastMCP服务器
+
+    Args:
+        listener: 已绑定并监听的套接字，重载时由新进程继承
+        generation: 重载次数，首次启动为0
+        ready_fd: 重载时用于向旧进程报告就绪的管道
+    """
+
+    def __init__(self, listener: socket.socket, generation: int = 0, ready_fd: Optional[int] = None):
+        self.listener = listener
+        self.generation = generation
+        self.ready_fd = ready_fd
+        self.started_at = time.time()
+        self.reloading = False
+        # 最近一次失败的重载: {'at': 时间戳, 'error': 原因}
+        self.reload_failure: Optional[Dict[str, Any]] = None
+        self.server: Optional[uvicorn.Server] = None
+        self.modules: Dict[str, ModuleType] = {
+            name: importlib.import_module(module) for name, module in HOSTED_SERVERS.items()}
+
+    def build_app(self) -> Starlette:
+        routes = [Route("/health", self.health)]
+        for name, module in self.modules.items():
+            # 无状态模式：请求不绑定会话，重载前后的进程都能处理任意请求
+            module.mcp.settings.stateless_http = True
+            routes.append(Mount(f"/{name}", app=module.mcp.streamable_http_app()))
+        return Starlette(routes=routes, lifespan=self.lifespan)
+
+    @asynccontextmanager
+    async def lifespan(self, app: Starlette):
+        # 挂载的子应用不会运行各自的lifespan，会话管理器在这里统一启动
+        async with AsyncExitStack() as stack:
+            for module in self.modules.values():
+                await stack.enter_async_context(module.mcp.session_manager.run())
+            yield
+        self.release_resources()
+
+    def health_info(self) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'generation': self.generation,
+            'started_at': self.started_at,
+            'uptime': time.time() - self.started_at,
+            'reload_failure': self.reload_failure,
+            'servers': {name: f"/{name}/mcp" for name in self.modules},
+            'pool': get_pool_manager(self.modules['mysql'].MYSQL_CONFIG).stats(),
+            'schema_cache': schema_cache.stats(),
+            'result_cache': result_cache.stats(),
+        }
+
+    async def health(self, request: Request) -> JSONResponse:
+        return JSONResponse(self.health_info())
+
+    def release_resources(self) -> None:
+        """关闭连接池和线程池；停止时同时删除PID文件和Unix套接字，重载时它们已属于新进程"""
+        for module in self.modules.values():
+            get_pool_manager(module.MYSQL_CONFIG).close_all()
+            get_async_engine(module.MYSQL_CONFIG).shutdown()
+        if self.reloading:
+            return
+        try:
+            with open(DAEMON_CONFIG['pid_file'], "r", encoding="utf-8") as f:
+                owned = f.read().strip() == str(os.getpid())
+            if owned:
+                os.remove(DAEMON_CONFIG['pid_file'])
+        except OSError:
+            pass
+        if DAEMON_CONFIG['socket']:
+            try:
+                os.unlink(DAEMON_CONFIG['socket'])
+            except OSError:
+                pass
+
+    async def _announce_ready(self) -> None:
+        while not self.server.started:
+            await asyncio.sleep(0.05)
+        with open(DAEMON_CONFIG['pid_file'], "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        if self.ready_fd is not None:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+            self.ready_fd = None
+        address = DAEMON_CONFIG['socket'] or base_url(DAEMON_CONFIG)
+        logger.info(f"🚀 MCP守护进程已启动 (pid {os.getpid()}, 第 {self.generation} 次重载)，监听 {address}，"
+                    f"服务器: {', '.join(f'/{name}/mcp' for name in HOSTED_SERVERS)}")
+
+    async def reload(self) -> None:
+        """启动继承监听套接字的新进程，新进程就绪后当前进程停止接受新连接并退出"""
+        if self.reloading:
+            logger.warning("⚠️ 正在重载，忽略重复的重载信号")
+            return
+        self.reloading = True
+        listen_fd = self.listener.fileno()
+        read_fd, write_fd = os.pipe()
+        try:
+            child = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "serve",
+                 "--listen-fd", str(listen_fd), "--ready-fd", str(write_fd),
+                 "--generation", str(self.generation + 1)],
+                pass_fds=(listen_fd, write_fd), stdin=subprocess.DEVNULL, env=BASE_ENVIRON,
+            )
+        except OSError as e:
+            os.close(read_fd)
+            self._reload_failed(f"无法启动新进程: {e}")
+            return
+        finally:
+            os.close(write_fd)
+
+        logger.info(f"🔄 正在重载: 新进程 pid {child.pid} 启动中...")
+        loop = asyncio.get_running_loop()
+        try:
+            ready = await loop.run_in_executor(None, wait_ready, read_fd, DAEMON_CONFIG['reload_timeout'])
+        finally:
+            os.close(read_fd)
+        if not ready:
+            try:
+                # 管道关闭说明新进程已退出，等待取得退出码
+                returncode = await loop.run_in_executor(None, child.wait, 1)
+                self._reload_failed(f"新进程启动失败 (退出码 {returncode})")
+            except subprocess.TimeoutExpired:
+                child.kill()
+                self._reload_failed(f"新进程未能在 {DAEMON_CONFIG['reload_timeout']:g} 秒内就绪")
+            return
+        logger.info(f"✅ 新进程 pid {child.pid} 已就绪，当前进程停止接受新连接，"
+                    f"最多等待 {DAEMON_CONFIG['drain_timeout']:g} 秒完成进行中的请求")
+        self.server.should_exit = True
+
+    def _reload_failed(self, error: str) -> None:
+        self.reloading = False
+        self.reload_failure = {'at': time.time(), 'error': error}
+        logger.error(f"❌ 重载失败: {error}，继续由当前进程 (pid {os.getpid()}) 提供服务")
+
+    async def serve(self) -> None:
+        config = uvicorn.Config(
+            self.build_app(),
+            lifespan="on",
+            log_level="info",
+            timeout_graceful_shutdown=DAEMON_CONFIG['drain_timeout'],
+        )
+        self.server = uvicorn.Server(config)
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(self.reload()))
+        announcer = loop.create_task(self._announce_ready())
+        try:
+            await self.server.serve(sockets=[self.listener])
+        finally:
+            announcer.cancel()
+
+
+def format_health(health: Dict[str, Any]) -> str:
+    """将守护进程状态格式化为可读文本"""
+    lines = [
+        f"✅ MCP守护进程运行中 (pid {health['pid']}, 第 {health['generation']} 次重载, "
+        f"已运行 {health['uptime']:.0f} 秒)",
+        f"🔌 地址: {DAEMON_CONFIG['socket'] or base_url(DAEMON_CONFIG)}",
+        f"📋 服务器: {', '.join(health['servers'].values())}",
+        format_pool_stats(health['pool']),
+        format_schema_cache_stats(health['schema_cache']),
+        format_result_cache_stats(health['result_cache']),
+    ]
+    return "\n".join(lines)
+
+
+def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def command_serve(args: argparse.Namespace) -> None:
+    if args.listen_fd is not None:
+        listener = socket.socket(fileno=args.listen_fd)
+    else:
+        try:
+            listener = create_listener(DAEMON_CONFIG)
+        except (OSError, RuntimeError, ValueError) as e:
+            raise SystemExit(f"❌ 无法启动守护进程: {e}")
+    daemon = MCPDaemon(listener, generation=args.generation, ready_fd=args.ready_fd)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def command_status(args: argparse.Namespace) -> None:
+    health = fetch_health(DAEMON_CONFIG)
+    if health is None:
+        raise SystemExit("❌ MCP守护进程未运行")
+    print(json.dumps(health, ensure_ascii=False, indent=2) if args.json else format_health(health))
+
+
+def command_reload(args: argparse.Namespace) -> None:
+    health = fetch_health(DAEMON_CONFIG)
+    if health is None:
+        raise SystemExit("❌ MCP守护进程未运行")
+    requested_at = time.time()
+    os.kill(health['pid'], signal.SIGHUP)
+    print(f"🔄 已通知 pid {health['pid']} 重载，等待新进程就绪...")
+    result: Dict[str, Any] = {}
+
+    def finished() -> bool:
+        current = fetch_health(DAEMON_CONFIG)
+        if current is None:
+            return False
+        failure = current.get('reload_failure')
+        if current['generation'] > health['generation'] or (failure and failure['at'] >= requested_at):
+            result.update(current)
+            return True
+        return False
+
+    if not wait_for(finished, DAEMON_CONFIG['reload_timeout'] + 5):
+        raise SystemExit("❌ 重载未完成，请查看守护进程日志")
+    if result['generation'] <= health['generation']:
+        raise SystemExit(f"❌ 重载失败: {result['reload_failure']['error']}，"
+                         f"守护进程继续使用原进程 (pid {result['pid']})，请查看守护进程日志")
+    print(f"✅ 重载完成，新进程 pid {result['pid']}")
+
+
+def command_stop(args: argparse.Namespace) -> None:
+    health = fetch_health(DAEMON_CONFIG)
+    if health is None:
+        raise SystemExit("❌ MCP守护进程未运行")
+    os.kill(health['pid'], signal.SIGTERM)
+    print(f"⏹️ 已通知 pid {health['pid']} 停止，等待进行中的请求完成...")
+    if not wait_for(lambda: fetch_health(DAEMON_CONFIG) is None, DAEMON_CONFIG['drain_timeout'] + 5):
+        raise SystemExit("❌ 守护进程未在预期时间内退出")
+    print("✅ 守护进程已停止")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MCP服务器常驻守护进程")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="在前台运行守护进程")
+    # 以下参数仅在重载时由旧进程传给新进程
+    serve.add_argument("--listen-fd", type=int, default=None, help=argparse.SUPPRESS)
+    serve.add_argument("--ready-fd", type=int, default=None, help=argparse.SUPPRESS)
+    serve.add_argument("--generation", type=int, default=0, help=argparse.SUPPRESS)
+    serve.set_defaults(handler=command_serve)
+    status = subparsers.add_parser("status", help="查看守护进程、连接池和缓存状态")
+    status.add_argument("--json", action="store_true", help="输出JSON")
+    status.set_defaults(handler=command_status)
+    subparsers.add_parser("reload", help="平滑重载（重新加载代码和 .env）").set_defaults(handler=command_reload)
+    subparsers.add_parser("stop", help="等待进行中的请求完成后停止").set_defaults(handler=command_stop)
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
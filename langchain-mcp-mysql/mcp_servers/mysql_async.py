@@ -0,0 +1,219 @@
+"""
+MySQL异步执行引擎
+
+FastMCP 在同一个事件循环中处理所有工具请求，同步的 pymysql 调用会阻塞事件循环，
+一个慢查询就会拖住同一服务器上的其他并发请求。本模块将阻塞的工具函数放到有界线程池中执行，
+使并发的工具调用可以重叠执行，并提供：
+- 每次调用的超时控制
+- 请求被取消或超时时，通过独立连接执行 KILL QUERY 终止服务端正在执行的查询
+
+引擎参数均可通过环境变量配置：
+MYSQL_ENGINE（thread: 线程池执行，默认；sync: 在事件循环中直接执行）、
+MYSQL_ASYNC_WORKERS、MYSQL_QUERY_TIMEOUT（秒，0表示不限制）
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, Set
+
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 异步引擎默认配置 - 从环境变量获取
+ENGINE_CONFIG = {
+    'engine': os.getenv('MYSQL_ENGINE', 'thread'),
+    'workers': int(os.getenv('MYSQL_ASYNC_WORKERS', '8')),
+    'timeout': float(os.getenv('MYSQL_QUERY_TIMEOUT', '30')),
+}
+
+
+class QueryTimeoutError(Exception):
+    """工具调用执行超时"""
+
+
+class QueryCancelledError(Exception):
+    """工具调用已被取消，不再执行新的查询"""
+
+
+class _CallState:
+    """一次工具调用的状态：正在使用的连接线程ID以及是否已取消"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread_ids: Set[int] = set()
+        self.cancelled = False
+
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar('mysql_current_call', default=None)
+
+
+@contextmanager
+def track_query(connection: pymysql.Connection):
+    """
+    登记当前工具调用正在使用的连接，以便超时或取消时终止其服务端查询
+
+    在引擎之外调用时（例如直接执行工具函数）不做任何处理。
+    """
+    state = _current_call.get()
+    if state is None:
+        yield connection
+        return
+
+    thread_id = connection.thread_id()
+    with state.lock:
+        if state.cancelled:
+            raise QueryCancelledError("工具调用已取消")
+        state.thread_ids.add(thread_id)
+    try:
+        yield connection
+    finally:
+        # 与 _kill_queries 共用锁：KILL 进行中时等待其完成，连接才会归还到连接池
+        with state.lock:
+            state.thread_ids.discard(thread_id)
+
+
+def check_cancelled() -> None:
+    """
+    在长时间运行的循环中检查当前工具调用是否已超时或被取消
+
+    KILL QUERY 只能终止正在执行的查询，循环在两次查询之间（如限流等待时）需要主动检查。
+
+    Raises:
+        QueryCancelledError: 调用已取消
+    """
+    state = _current_call.get()
+    if state is not None and state.cancelled:
+        raise QueryCancelledError("工具调用已取消")
+
+
+def _kill_queries(config: Dict[str, Any], state: _CallState, thread_ids: Set[int]) -> None:
+    """
+    通过独立连接对指定的连接线程执行 KILL QUERY
+
+    建立连接期间查询可能已经结束、连接已归还连接池并被其他调用借走，因此每次 KILL 前在 state.lock 下
+    确认线程ID仍登记在本次调用中，并在持有锁时执行 KILL，期间 track_query 无法注销该连接。
+    """
+    kill_config = {k: v for k, v in config.items() if k != 'database'}
+    try:
+        connection = pymysql.connect(**kill_config)
+        try:
+            with connection.cursor() as cursor:
+                for thread_id in thread_ids:
+                    with state.lock:
+                        if thread_id not in state.thread_ids:
+                            continue
+                        cursor.execute("KILL QUERY %s", (thread_id,))
+                    logger.warning(f"已终止MySQL查询，连接线程ID: {thread_id}")
+        finally:
+            connection.close()
+    except Exception as e:
+        logger.error(f"终止MySQL查询失败: {e}")
+
+
+class AsyncMySQLEngine:
+    """将阻塞的MySQL工具函数转换为可并发、可超时、可取消的协程"""
+
+    def __init__(self, config: Dict[str, Any], engine: str = 'thread',
+                 workers: int = 8, timeout: float = 30.0):
+        self.config = config.copy()
+        self.engine = engine
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if engine == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                                thread_name_prefix='mysql-worker')
+        elif engine != 'sync':
+            raise ValueError(f"不支持的MYSQL_ENGINE: {engine}，可选值: thread, sync")
+
+    def _cancel(self, state: _CallState) -> None:
+        """标记调用已取消，并在后台线程中终止其正在执行的查询"""
+        with state.lock:
+            state.cancelled = True
+            thread_ids = set(state.thread_ids)
+        if thread_ids:
+            # 不占用工作线程池，避免所有工作线程都被慢查询占满时无法终止
+            threading.Thread(target=_kill_queries, args=(self.config, state, thread_ids),
+                             name='mysql-killer', daemon=True).start()
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        在线程池中执行阻塞函数
+
+        Args:
+            func: 阻塞的函数
+            timeout: 超时时间（秒），默认使用引擎配置，0表示不限制
+
+        Raises:
+            QueryTimeoutError: 执行超时，服务端查询已被终止
+        """
+        if self._executor is None:
+            return func(*args, **kwargs)
+
+        timeout = self.timeout if timeout is None else timeout
+        state = _CallState()
+        context = contextvars.copy_context()
+        context.run(_current_call.set, state)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor,
+                                      functools.partial(context.run, func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self._cancel(state)
+            raise QueryTimeoutError(f"执行超过 {timeout:g} 秒") from None
+        except asyncio.CancelledError:
+            self._cancel(state)
+            raise
+
+    def offload(self, timeout: Optional[float] = None) -> Callable:
+        """
+        装饰器：将同步工具函数转换为在线程池中执行的协程
+
+        保留原函数签名，FastMCP 可据此生成工具参数定义。超时时返回错误消息而不是抛出异常。
+        用法:
+            @mcp.tool()
+            @engine.offload()
+            def query_data(...) -> str: ...
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                try:
+                    return await self.run(func, *args, timeout=timeout, **kwargs)
+                except QueryTimeoutError as e:
+                    logger.error(f"工具 {func.__name__} 执行超时: {e}")
+                    return f"❌ 操作超时: {e}，已终止服务端查询，请缩小查询范围或添加索引后重试"
+            return wrapper
+        return decorator
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+_engines: Dict[tuple, AsyncMySQLEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_async_engine(config: Dict[str, Any]) -> AsyncMySQLEngine:
+    """获取进程级共享的异步执行引擎，同一MySQL实例的多个MCP服务器共用一个线程池"""
+    key = (config.get('host'), config.get('port'), config.get('user'))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = AsyncMySQLEngine(config, **ENGINE_CONFIG)
+            _engines[key] = engine
+    return engine
@@ -0,0 +1,366 @@
+"""
+MySQL连接池
+
+为MCP服务器提供按数据库划分的有界连接池，替代每次工具调用都重新 pymysql.connect 的方式。
+支持以下特性：
+- 取出连接时的健康检查（ping）
+- 空闲超时回收
+- 最大生命周期回收
+- 连接池大小、等待时间等指标统计
+
+连接池参数均可通过环境变量配置：
+MYSQL_POOL_SIZE、MYSQL_POOL_TIMEOUT、MYSQL_POOL_IDLE_TIMEOUT、
+MYSQL_POOL_MAX_LIFETIME、MYSQL_POOL_PING_INTERVAL
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, List
+
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 连接池默认配置 - 从环境变量获取
+POOL_CONFIG = {
+    'max_size': int(os.getenv('MYSQL_POOL_SIZE', '5')),
+    'timeout': float(os.getenv('MYSQL_POOL_TIMEOUT', '10')),
+    'idle_timeout': float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', '300')),
+    'max_lifetime': float(os.getenv('MYSQL_POOL_MAX_LIFETIME', '3600')),
+    'ping_interval': float(os.getenv('MYSQL_POOL_PING_INTERVAL', '10')),
+}
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class _PooledEntry:
+    """连接池中的一个连接及其时间戳"""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection: pymysql.Connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+def _close_quietly(connection: pymysql.Connection) -> None:
+    """关闭连接，忽略关闭过程中的异常"""
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    单个数据库的有界连接池
+
+    连接以LIFO顺序复用，使最近使用的"热"连接优先被取出，长期空闲的连接自然过期。
+    """
+
+    def __init__(self, config: Dict[str, Any], database: Optional[str] = None,
+                 max_size: int = 5, timeout: float = 10.0, idle_timeout: float = 300.0,
+                 max_lifetime: float = 3600.0, ping_interval: float = 10.0):
+        self.config = config.copy()
+        if database:
+            self.config['database'] = database
+        self.database = database
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'closed_idle': 0,
+            'closed_lifetime': 0,
+            'failed_health_checks': 0,
+            'discarded': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+    def _collect_expired_locked(self, now: float) -> List[pymysql.Connection]:
+        """在持有锁时移除空闲超时或超过生命周期的连接，返回需要关闭的连接"""
+        expired = []
+        kept = deque()
+        for entry in self._idle:
+            if now - entry.last_used > self.idle_timeout:
+                self._stats['closed_idle'] += 1
+                expired.append(entry.connection)
+            elif now - entry.created_at > self.max_lifetime:
+                self._stats['closed_lifetime'] += 1
+                expired.append(entry.connection)
+            else:
+                kept.append(entry)
+        if expired:
+            self._idle = kept
+            self._size -= len(expired)
+            self._cond.notify(len(expired))
+        return expired
+
+    def _open(self) -> _PooledEntry:
+        """建立新的物理连接"""
+        connection = pymysql.connect(**self.config)
+        with self._cond:
+            self._stats['created'] += 1
+        logger.info(f"连接池新建MySQL连接: {self.config['host']}:{self.config['port']} "
+                    f"(数据库: {self.database or '-'})")
+        return _PooledEntry(connection)
+
+    def _is_healthy(self, entry: _PooledEntry, now: float) -> bool:
+        """取出连接时的健康检查，空闲超过 ping_interval 才发送 ping"""
+        if now - entry.last_used < self.ping_interval:
+            return entry.connection.open
+        try:
+            entry.connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.warning(f"连接池健康检查失败，丢弃连接: {e}")
+            return False
+
+    def acquire(self) -> _PooledEntry:
+        """
+        从连接池取出一个连接，池满时最多等待 timeout 秒
+
+        Raises:
+            PoolTimeoutError: 等待超时
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        while True:
+            entry = None
+            expired = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("连接池已关闭")
+                    now = time.monotonic()
+                    expired.extend(self._collect_expired_locked(now))
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        # 预占一个名额，在锁外建立连接
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"等待MySQL连接超时({self.timeout}s)，连接池已满({self.max_size})"
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+
+            for connection in expired:
+                _close_quietly(connection)
+
+            if entry is None:
+                try:
+                    entry = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(entry, time.monotonic()):
+                _close_quietly(entry.connection)
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                    self._size -= 1
+                    self._cond.notify()
+                continue
+            else:
+                with self._cond:
+                    self._stats['reused'] += 1
+
+            wait_time = time.monotonic() - start
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['total_wait_time'] += wait_time
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+            return entry
+
+    def release(self, entry: _PooledEntry, discard: bool = False) -> None:
+        """归还连接，discard=True 或连接已断开时直接关闭"""
+        now = time.monotonic()
+        recycle = discard or self._closed or not entry.connection.open
+        if not recycle and now - entry.created_at > self.max_lifetime:
+            recycle = True
+            with self._cond:
+                self._stats['closed_lifetime'] += 1
+
+        if recycle:
+            _close_quietly(entry.connection)
+            with self._cond:
+                if discard:
+                    self._stats['discarded'] += 1
+                self._size -= 1
+                self._cond.notify()
+            return
+
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[pymysql.Connection]:
+        """
+        以上下文管理器的形式借用连接，退出时自动归还
+
+        发生连接层错误时丢弃连接；其他异常时回滚未提交的事务后归还。
+        """
+        entry = self.acquire()
+        discard = False
+        try:
+            yield entry.connection
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        except BaseException:
+            try:
+                entry.connection.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            if not discard:
+                try:
+                    # 恢复默认的自动提交模式，避免事务状态泄漏给下一个使用者
+                    if entry.connection.get_autocommit() != bool(self.config.get('autocommit', False)):
+                        entry.connection.autocommit(self.config.get('autocommit', False))
+                except Exception:
+                    discard = True
+            self.release(entry, discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回连接池指标快照"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+        checkouts = stats['checkouts']
+        stats['avg_wait_time'] = stats['total_wait_time'] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self) -> None:
+        """关闭连接池中的所有空闲连接，在用连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.connection)
+
+
+class PoolManager:
+    """按数据库名称管理多个连接池，供同一进程内的所有工具共享"""
+
+    def __init__(self, config: Dict[str, Any], **pool_options):
+        self.config = config.copy()
+        self.pool_options = {**POOL_CONFIG, **pool_options}
+        self._pools: Dict[Optional[str], ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, database: Optional[str] = None) -> ConnectionPool:
+        """获取（必要时创建）指定数据库的连接池"""
+        database = database or None
+        pool = self._pools.get(database)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(database)
+                if pool is None:
+                    pool = ConnectionPool(self.config, database, **self.pool_options)
+                    self._pools[database] = pool
+        return pool
+
+    def connection(self, database: Optional[str] = None):
+        """借用指定数据库的连接，用法: with manager.connection(db) as conn"""
+        return self.get_pool(database).connection()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """返回所有连接池的指标，键为数据库名称（无数据库时为空字符串）"""
+        with self._lock:
+            pools = list(self._pools.items())
+        return {database or '': pool.stats() for database, pool in pools}
+
+    def close_all(self) -> None:
+        """关闭所有连接池"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+_managers: Dict[tuple, PoolManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_pool_manager(config: Dict[str, Any]) -> PoolManager:
+    """
+    获取进程级共享的连接池管理器
+
+    相同主机、端口、用户的配置共享同一个管理器，使同一进程中的多个MCP服务器共用连接池。
+    """
+    key = (config.get('host'), config.get('port'), config.get('user'))
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = PoolManager(config)
+            _managers[key] = manager
+    return manager
+
+
+def format_pool_stats(stats: Dict[str, Dict[str, Any]]) -> str:
+    """将连接池指标格式化为可读文本"""
+    if not stats:
+        return "📊 连接池尚未创建任何连接"
+
+    lines = ["📊 MySQL连接池状态:"]
+    for database, pool_stats in stats.items():
+        lines.append(f"\n🗄️ 数据库: {database or '(未指定)'}")
+        lines.append(f"  • 连接数: {pool_stats['size']}/{pool_stats['max_size']} "
+                     f"(使用中 {pool_stats['in_use']}, 空闲 {pool_stats['idle']})")
+        lines.append(f"  • 借出次数: {pool_stats['checkouts']} "
+                     f"(复用 {pool_stats['reused']}, 新建 {pool_stats['created']})")
+        lines.append(f"  • 等待: {pool_stats['waits']} 次, 超时 {pool_stats['timeouts']} 次, "
+                     f"平均 {pool_stats['avg_wait_time'] * 1000:.2f}ms, "
+                     f"最长 {pool_stats['max_wait_time'] * 1000:.2f}ms")
+        lines.append(f"  • 回收: 空闲超时 {pool_stats['closed_idle']}, "
+                     f"生命周期 {pool_stats['closed_lifetime']}, "
+                     f"健康检查失败 {pool_stats['failed_health_checks']}, "
+                     f"异常丢弃 {pool_stats['discarded']}")
+    return "\n".join(lines)
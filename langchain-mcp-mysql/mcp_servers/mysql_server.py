@@ -5,17 +5,45 @@ MySQL数据库控制MCP服务器
 支持详细的错误提示和用户友好的错误处理。
 """
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+import asyncio
+import contextvars
 import logging
 import pymysql
+import base64
+import hashlib
 import json
 import os
-from typing import Optional, Union, Dict, Any
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Optional, Union, Dict, Any, List, Tuple, Callable
 from dotenv import load_dotenv
 
-# 加载环境变量
+# 加载环境变量，需要在导入本地模块之前完成，各模块在导入时读取配置
 load_dotenv()
 
+from mysql_async import get_async_engine, track_query, check_cancelled, QueryTimeoutError  # noqa: E402
+from mysql_pool import get_pool_manager, format_pool_stats  # noqa: E402
+from query_plan import (parse_explain_json, analyze_plan, is_full_scan_over, format_plan_tables,  # noqa: E402
+                        is_read_only_select, ACCESS_TYPES)
+from where_clause import build_where_clause  # noqa: E402
+from table_export import (EXPORT_CONFIG, check_export_format, resolve_export_path, stream_to_file,  # noqa: E402
+                          format_file_size)
+from table_import import (IMPORT_CONFIG, IMPORT_FORMATS, LOCAL_INFILE_DISABLED_ERRORS, LoadDataUnavailable,  # noqa: E402
+                          build_column_specs, detect_import_format, resolve_import_path, count_data_lines,
+                          detect_line_terminator, read_file_columns, check_column_mapping, validate_sample,
+                          iter_batches, build_load_data_sql)
+from result_cache import result_cache, make_key, format_result_cache_stats  # noqa: E402
+from schema_change import (SCHEMA_CHANGE_CONFIG, ServerVersion, ShadowCopyOptions, split_alter_clauses,  # noqa: E402
+                           classify_clause, summarize_plan, estimate_duration, estimate_shadow_duration,
+                           recommend_method, build_alter_sql, format_duration, run_shadow_copy,
+                           replica_connection)
+from schema_cache import schema_cache, table_version, database_version, format_schema_cache_stats  # noqa: E402
+from result_format import (check_output_format, encode_rows, render_query_text,  # noqa: E402
+                           render_columns_text, render_indexes_text)
+
 # 配置日志记录器
 logging.basicConfig(
     level=logging.INFO,
@@ -36,30 +64,77 @@ MYSQL_CONFIG = {
     'autocommit': True
 }
 
-def get_mysql_connection(database: Optional[str] = None) -> pymysql.Connection:
+# 查询计划分析配置 - 从环境变量获取
+EXPLAIN_CONFIG = {
+    # 超过该行数的全表扫描视为问题
+    'full_scan_rows': int(os.getenv('MYSQL_EXPLAIN_FULL_SCAN_ROWS', '10000')),
+    # 为true时，update_data/delete_data 执行前先EXPLAIN，拦截超过阈值的全表扫描
+    'guard': os.getenv('MYSQL_EXPLAIN_GUARD', 'false').lower() in ('1', 'true', 'yes'),
+}
+
+# 进程内共享的连接池管理器，按数据库名称划分连接池
+pool_manager = get_pool_manager(MYSQL_CONFIG)
+
+# 异步执行引擎：工具在有界线程池中执行，支持超时与取消时终止查询
+engine = get_async_engine(MYSQL_CONFIG)
+
+@contextmanager
+def get_mysql_connection(database: Optional[str] = None):
     """
-    获取MySQL数据库连接
-    
+    从连接池借用MySQL数据库连接
+
+    用法: with get_mysql_connection(database) as connection: ...
+    退出上下文时连接自动归还连接池，无需手动关闭。
+    借用期间连接会登记到当前工具调用，调用超时或取消时其正在执行的查询会被 KILL QUERY 终止。
+
     Args:
         database: 可选的数据库名称
         
     Returns:
-        pymysql.Connection: 数据库连接对象
+        上下文管理器，产出 pymysql.Connection 连接对象
         
     Raises:
-        Exception: 连接失败时抛出异常
+        Exception: 连接失败或等待连接超时时抛出异常
     """
-    config = MYSQL_CONFIG.copy()
-    if database:
-        config['database'] = database
-    
-    try:
-        connection = pymysql.connect(**config)
-        logger.info(f"成功连接到MySQL数据库: {config['host']}:{config['port']}")
-        return connection
-    except Exception as e:
-        logger.error(f"MySQL连接失败: {e}")
-        raise
+    with pool_manager.connection(database) as connection, track_query(connection):
+        yield connection
+
+def fetch_rows(connection: pymysql.Connection, sql: str, params: Any = None) -> Tuple[List[str], List[tuple]]:
+    """执行查询并返回字段名列表和全部行"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [desc[0] for desc in cursor.description], list(cursor.fetchall())
+
+def get_table_columns(database_name: str, table_name: str) -> Tuple[List[str], List[tuple]]:
+    """读取表的 DESCRIBE 结果（字段名列表, 行），结果在进程内缓存"""
+    return schema_cache.get(
+        (database_name, table_name, 'describe'),
+        lambda: get_mysql_connection(database_name),
+        lambda connection: fetch_rows(connection, f"DESCRIBE `{table_name}`"),
+        lambda connection: table_version(connection, database_name, table_name)
+    )
+
+def explain_statement(connection: pymysql.Connection, sql: str, params: Any = None):
+    """对语句执行 EXPLAIN FORMAT=JSON，返回 (表访问信息, 标志, 成本)"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+        row = cursor.fetchone()
+    return parse_explain_json(row[0])
+
+def check_full_scan_guard(connection: pymysql.Connection, sql: str, params: Any = None) -> Optional[str]:
+    """
+    写操作执行前的全表扫描拦截检查
+
+    Returns:
+        Optional[str]: 需要拦截时返回提示消息，否则返回None
+    """
+    tables, _, _ = explain_statement(connection, sql, params)
+    scan = is_full_scan_over(tables, EXPLAIN_CONFIG['full_scan_rows'])
+    if scan is None:
+        return None
+    return (f"⚠️ 操作已拦截: 该语句将对表 {scan['table']} 进行全表扫描，预计扫描 {scan['rows_examined']} 行 "
+            f"(阈值 {EXPLAIN_CONFIG['full_scan_rows']})。请使用带索引的WHERE条件，"
+            f"或使用 explain_query 分析后以 force=true 强制执行")
 
 def format_error_message(error: Exception, operation: str) -> str:
     """
@@ -97,6 +172,7 @@ def format_error_message(error: Exception, operation: str) -> str:
         return f"❌ {operation}失败: {error_msg}"
 
 @mcp.tool()
+@engine.offload()
 def create_database(database_name: str) -> str:
     """
     创建新的MySQL数据库
@@ -108,16 +184,13 @@ def create_database(database_name: str) -> str:
         str: 操作结果消息
     """
     try:
-        connection = get_mysql_connection()
-        cursor = connection.cursor()
-        
-        # 创建数据库
-        sql = f"CREATE DATABASE `{database_name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
-        cursor.execute(sql)
-        
-        cursor.close()
-        connection.close()
+        with get_mysql_connection() as connection, connection.cursor() as cursor:
+            # 创建数据库
+            sql = f"CREATE DATABASE `{database_name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+            cursor.execute(sql)
         
+        schema_cache.invalidate(database_name)
+        result_cache.invalidate(database_name)
         logger.info(f"成功创建数据库: {database_name}")
         return f"✅ 成功创建数据库: {database_name}"
         
@@ -126,6 +199,7 @@ def create_database(database_name: str) -> str:
         return format_error_message(e, "创建数据库")
 
 @mcp.tool()
+@engine.offload()
 def create_table(database_name: str, table_name: str, columns: str) -> str:
     """
     在指定数据库中创建新表
@@ -139,16 +213,13 @@ def create_table(database_name: str, table_name: str, columns: str) -> str:
         str: 操作结果消息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-        
-        # 创建表
-        sql = f"CREATE TABLE `{table_name}` ({columns})"
-        cursor.execute(sql)
-        
-        cursor.close()
-        connection.close()
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            # 创建表
+            sql = f"CREATE TABLE `{table_name}` ({columns})"
+            cursor.execute(sql)
         
+        schema_cache.invalidate(database_name, table_name)
+        result_cache.invalidate(database_name)
         logger.info(f"成功在数据库 {database_name} 中创建表: {table_name}")
         return f"✅ 成功在数据库 {database_name} 中创建表: {table_name}"
         
@@ -157,6 +228,7 @@ def create_table(database_name: str, table_name: str, columns: str) -> str:
         return format_error_message(e, "创建表")
 
 @mcp.tool()
+@engine.offload()
 def insert_data(database_name: str, table_name: str, data: Union[str, Dict[str, Any]]) -> str:
     """
     向表中插入数据
@@ -170,9 +242,6 @@ def insert_data(database_name: str, table_name: str, data: Union[str, Dict[str,
         str: 操作结果消息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-
         # 处理数据格式 - 支持字符串和字典两种格式
         if isinstance(data, str):
             try:
@@ -191,11 +260,10 @@ def insert_data(database_name: str, table_name: str, data: Union[str, Dict[str,
         values = list(data_dict.values())
         
         sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        cursor.execute(sql, values)
-        
-        affected_rows = cursor.rowcount
-        cursor.close()
-        connection.close()
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            affected_rows = cursor.rowcount
+        result_cache.invalidate(database_name, [table_name])
         
         logger.info(f"成功向表 {table_name} 插入 {affected_rows} 行数据")
         return f"✅ 成功向表 {table_name} 插入 {affected_rows} 行数据"
@@ -204,8 +272,170 @@ def insert_data(database_name: str, table_name: str, data: Union[str, Dict[str,
         logger.error(f"插入数据失败: {e}")
         return format_error_message(e, "插入数据")
 
+# 批量插入模式对应的INSERT关键字
+BULK_INSERT_MODES = ("insert", "ignore", "upsert")
+
+def parse_bulk_rows(rows: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    解析批量插入的数据，支持JSON数组和NDJSON（每行一个JSON对象）
+
+    Args:
+        rows: JSON数组字符串、NDJSON字符串或字典列表
+
+    Returns:
+        List[Dict[str, Any]]: 行数据列表
+
+    Raises:
+        ValueError: 数据格式错误
+    """
+    if isinstance(rows, list):
+        parsed = rows
+    elif isinstance(rows, str):
+        text = rows.strip()
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            # 按NDJSON逐行解析
+            parsed = []
+            for line_no, line in enumerate(text.splitlines(), 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    parsed.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"第 {line_no} 行不是有效的JSON: {e}")
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+    else:
+        raise ValueError("数据类型错误，请提供JSON数组、NDJSON字符串或字典列表")
+
+    if not isinstance(parsed, list):
+        raise ValueError("数据类型错误，请提供JSON数组或NDJSON格式的数据")
+    for i, row in enumerate(parsed, 1):
+        if not isinstance(row, dict) or not row:
+            raise ValueError(f"第 {i} 行数据必须是非空的JSON对象")
+    return parsed
+
+def build_bulk_insert_sql(table_name: str, columns: List[str], batch: List[Dict[str, Any]],
+                          mode: str = "insert", update_columns: Optional[List[str]] = None) -> Tuple[str, List[Any]]:
+    """
+    构建多行 INSERT ... VALUES (...),(...) 语句
+
+    行中缺少的字段使用 DEFAULT，由数据库填充默认值。
+
+    Args:
+        table_name: 表名称
+        columns: 所有行字段的并集，决定VALUES中的字段顺序
+        batch: 本批次的行数据
+        mode: insert | ignore（INSERT IGNORE）| upsert（ON DUPLICATE KEY UPDATE）
+        update_columns: upsert模式下需要更新的字段，默认更新所有字段
+
+    Returns:
+        Tuple[str, List[Any]]: SQL语句和参数列表
+    """
+    keyword = "INSERT IGNORE" if mode == "ignore" else "INSERT"
+    column_sql = ', '.join(f"`{col}`" for col in columns)
+
+    row_sqls = []
+    values = []
+    for row in batch:
+        placeholders = []
+        for col in columns:
+            if col in row:
+                placeholders.append('%s')
+                values.append(row[col])
+            else:
+                placeholders.append('DEFAULT')
+        row_sqls.append(f"({', '.join(placeholders)})")
+
+    sql = f"{keyword} INTO `{table_name}` ({column_sql}) VALUES {', '.join(row_sqls)}"
+    if mode == "upsert":
+        targets = update_columns or columns
+        sql += " ON DUPLICATE KEY UPDATE " + ', '.join(f"`{col}` = VALUES(`{col}`)" for col in targets)
+    return sql, values
+
+@mcp.tool()
+@engine.offload()
+def bulk_insert_data(database_name: str, table_name: str, rows: Union[str, List[Dict[str, Any]]],
+                     batch_size: int = 500, mode: str = "insert", update_columns: str = "") -> str:
+    """
+    向表中批量插入多行数据，所有批次在同一个事务中执行，任一批次失败则全部回滚
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        rows: 多行数据，可以是JSON数组、NDJSON字符串（每行一个JSON对象）或字典列表，
+              如: '[{"name": "张三", "age": 25}, {"name": "李四", "age": 30}]'
+        batch_size: 每条多行INSERT语句包含的行数，默认500
+        mode: 插入模式: insert（普通插入）、ignore（INSERT IGNORE，跳过重复行）、
+              upsert（ON DUPLICATE KEY UPDATE，重复时更新）
+        update_columns: upsert模式下需要更新的字段，逗号分隔，默认更新所有插入的字段
+
+    Returns:
+        str: 每批次行数、耗时以及总吞吐量
+    """
+    try:
+        if mode not in BULK_INSERT_MODES:
+            return f"❌ 批量插入失败: 不支持的插入模式 '{mode}'，可选值: {', '.join(BULK_INSERT_MODES)}"
+        if batch_size <= 0:
+            return "❌ 批量插入失败: batch_size 必须大于0"
+
+        try:
+            row_list = parse_bulk_rows(rows)
+        except ValueError as e:
+            logger.error(f"批量数据解析失败: {e}")
+            return f"❌ 批量插入失败: {e}"
+        if not row_list:
+            return "❌ 批量插入失败: 没有需要插入的数据"
+
+        # 以首次出现的顺序收集所有字段
+        columns = list(dict.fromkeys(col for row in row_list for col in row))
+        targets = [col.strip() for col in update_columns.split(',') if col.strip()] or None
+
+        batch_reports = []
+        total_affected = 0
+        start = time.perf_counter()
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            connection.begin()
+            try:
+                for offset in range(0, len(row_list), batch_size):
+                    batch = row_list[offset:offset + batch_size]
+                    sql, values = build_bulk_insert_sql(table_name, columns, batch, mode, targets)
+                    batch_start = time.perf_counter()
+                    cursor.execute(sql, values)
+                    batch_reports.append((len(batch), cursor.rowcount, time.perf_counter() - batch_start))
+                    total_affected += cursor.rowcount
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        elapsed = time.perf_counter() - start
+        result_cache.invalidate(database_name, [table_name])
+
+        throughput = len(row_list) / elapsed if elapsed > 0 else float(len(row_list))
+        result = [f"✅ 成功向表 {table_name} 批量写入 {len(row_list)} 行数据 (模式: {mode}, 影响行数: {total_affected})"]
+        result.append(f"📦 共 {len(batch_reports)} 个批次，每批最多 {batch_size} 行:")
+        for i, (row_count, affected, batch_time) in enumerate(batch_reports[:20], 1):
+            result.append(f"  • 批次 {i}: {row_count} 行, 影响 {affected} 行, 耗时 {batch_time * 1000:.1f}ms")
+        if len(batch_reports) > 20:
+            result.append(f"  • ... 其余 {len(batch_reports) - 20} 个批次已省略")
+        result.append(f"⏱️ 总耗时 {elapsed:.3f}s，吞吐量 {throughput:.0f} 行/秒")
+        if mode == "upsert":
+            result.append("💡 ON DUPLICATE KEY UPDATE 模式下，更新的行计为2个影响行")
+
+        logger.info(f"成功向表 {table_name} 批量写入 {len(row_list)} 行数据，耗时 {elapsed:.3f}s")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"批量插入数据失败: {e}")
+        return format_error_message(e, "批量插入数据")
+
 @mcp.tool()
-def update_data(database_name: str, table_name: str, set_data: Union[str, Dict[str, Any]], where_condition: str) -> str:
+@engine.offload()
+def update_data(database_name: str, table_name: str, set_data: Union[str, Dict[str, Any]], where_condition: str = "",
+                force: bool = False, filters: Union[str, List[Dict[str, Any]]] = "",
+                where_params: Union[str, List[Any]] = "") -> str:
     """
     更新表中的数据
 
@@ -213,15 +443,15 @@ def update_data(database_name: str, table_name: str, set_data: Union[str, Dict[s
         database_name: 数据库名称
         table_name: 表名称
         set_data: 要更新的数据，可以是JSON格式字符串或字典，如: '{"name": "李四", "age": 30}' 或 {"name": "李四", "age": 30}
-        where_condition: WHERE条件，如: "id = 1" 或 "name = '张三'"
+        where_condition: WHERE条件，如: "id = 1"；也可以是带 %s 占位符的模板，如: "id = %s"，值通过 where_params 传入
+        force: 开启全表扫描拦截时，是否强制执行大范围更新，默认false
+        filters: 结构化过滤条件（JSON数组），如: '[{"column": "id", "op": "=", "value": 1}]'，与 where_condition 同时提供时以 AND 连接
+        where_params: where_condition 中 %s 占位符对应的参数（JSON数组），如: '[1]'
 
     Returns:
         str: 操作结果消息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-
         # 处理数据格式 - 支持字符串和字典两种格式
         if isinstance(set_data, str):
             try:
@@ -234,16 +464,26 @@ def update_data(database_name: str, table_name: str, set_data: Union[str, Dict[s
         else:
             return f"❌ 更新数据失败: 数据类型错误，请提供JSON字符串或字典格式的数据"
         
-        # 构建UPDATE语句
+        try:
+            where_clause, where_values = build_where_clause(where_condition, where_params, filters)
+        except ValueError as e:
+            return f"❌ 更新数据失败: {e}"
+        if not where_clause:
+            return "❌ 更新数据失败: 请提供 where_condition 或 filters，不允许无条件更新整张表"
+
+        # 构建UPDATE语句，值和条件参数都通过占位符绑定
         set_clause = ', '.join([f"`{col}` = %s" for col in data_dict.keys()])
-        values = list(data_dict.values())
-        
-        sql = f"UPDATE `{table_name}` SET {set_clause} WHERE {where_condition}"
-        cursor.execute(sql, values)
+        values = list(data_dict.values()) + where_values
         
-        affected_rows = cursor.rowcount
-        cursor.close()
-        connection.close()
+        sql = f"UPDATE `{table_name}` SET {set_clause} WHERE {where_clause}"
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            if EXPLAIN_CONFIG['guard'] and not force:
+                blocked = check_full_scan_guard(connection, sql, values)
+                if blocked:
+                    return blocked
+            cursor.execute(sql, tuple(values))
+            affected_rows = cursor.rowcount
+        result_cache.invalidate(database_name, [table_name])
         
         logger.info(f"成功更新表 {table_name} 中的 {affected_rows} 行数据")
         return f"✅ 成功更新表 {table_name} 中的 {affected_rows} 行数据"
@@ -253,29 +493,41 @@ def update_data(database_name: str, table_name: str, set_data: Union[str, Dict[s
         return format_error_message(e, "更新数据")
 
 @mcp.tool()
-def delete_data(database_name: str, table_name: str, where_condition: str) -> str:
+@engine.offload()
+def delete_data(database_name: str, table_name: str, where_condition: str = "", force: bool = False,
+                filters: Union[str, List[Dict[str, Any]]] = "", where_params: Union[str, List[Any]] = "") -> str:
     """
     删除表中的数据
     
     Args:
         database_name: 数据库名称
         table_name: 表名称
-        where_condition: WHERE条件，如: "id = 1" 或 "name = '张三'"
+        where_condition: WHERE条件，如: "id = 1"；也可以是带 %s 占位符的模板，如: "id = %s"，值通过 where_params 传入
+        force: 开启全表扫描拦截时，是否强制执行大范围删除，默认false
+        filters: 结构化过滤条件（JSON数组），如: '[{"column": "status", "op": "in", "value": ["expired", "deleted"]}]'
+        where_params: where_condition 中 %s 占位符对应的参数（JSON数组）
         
     Returns:
         str: 操作结果消息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-        
+        try:
+            where_clause, values = build_where_clause(where_condition, where_params, filters)
+        except ValueError as e:
+            return f"❌ 删除数据失败: {e}"
+        if not where_clause:
+            return "❌ 删除数据失败: 请提供 where_condition 或 filters，不允许无条件删除整张表"
+
         # 构建DELETE语句
-        sql = f"DELETE FROM `{table_name}` WHERE {where_condition}"
-        cursor.execute(sql)
-        
-        affected_rows = cursor.rowcount
-        cursor.close()
-        connection.close()
+        sql = f"DELETE FROM `{table_name}` WHERE {where_clause}"
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            if EXPLAIN_CONFIG['guard'] and not force:
+                blocked = check_full_scan_guard(connection, sql, values)
+                if blocked:
+                    return blocked
+            cursor.execute(sql, tuple(values))
+            affected_rows = cursor.rowcount
+        result_cache.invalidate(database_name, [table_name])
         
         logger.info(f"成功从表 {table_name} 删除 {affected_rows} 行数据")
         return f"✅ 成功从表 {table_name} 删除 {affected_rows} 行数据"
@@ -284,68 +536,712 @@ def delete_data(database_name: str, table_name: str, where_condition: str) -> st
         logger.error(f"删除数据失败: {e}")
         return format_error_message(e, "删除数据")
 
+# 批量操作支持的操作类型
+BATCH_OPERATIONS = ("insert", "update", "delete", "sql", "savepoint", "rollback_to", "release")
+
+# 批量操作中 sql 类型允许的语句，DDL会隐式提交事务，不允许出现在批量操作中
+BATCH_SQL_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "SELECT")
+
+_SAVEPOINT_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,63}$')
+
+def parse_batch_operations(operations: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    解析并校验批量操作列表
+
+    Raises:
+        ValueError: 数据格式错误或操作不合法
+    """
+    if isinstance(operations, str):
+        try:
+            operations = json.loads(operations)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"操作列表不是有效的JSON: {e}")
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("操作列表必须是非空的JSON数组")
+
+    for i, op in enumerate(operations, 1):
+        if not isinstance(op, dict):
+            raise ValueError(f"第 {i} 个操作必须是JSON对象")
+        kind = op.get('op')
+        if kind not in BATCH_OPERATIONS:
+            raise ValueError(f"第 {i} 个操作类型 '{kind}' 不支持，可选值: {', '.join(BATCH_OPERATIONS)}")
+        for key in ('name', 'rollback_to_on_error'):
+            if key in op and not _SAVEPOINT_PATTERN.match(str(op[key])):
+                raise ValueError(f"第 {i} 个操作的保存点名称 '{op[key]}' 不合法")
+        if kind in ('savepoint', 'rollback_to', 'release') and 'name' not in op:
+            raise ValueError(f"第 {i} 个操作 ({kind}) 缺少保存点名称 name")
+        if kind in ('insert', 'update', 'delete') and not op.get('table'):
+            raise ValueError(f"第 {i} 个操作 ({kind}) 缺少表名 table")
+        if kind == 'insert' and (not isinstance(op.get('data'), dict) or not op['data']):
+            raise ValueError(f"第 {i} 个操作 (insert) 的 data 必须是非空的JSON对象")
+        if kind == 'update' and (not isinstance(op.get('set'), dict) or not op['set']):
+            raise ValueError(f"第 {i} 个操作 (update) 的 set 必须是非空的JSON对象")
+        if kind in ('update', 'delete'):
+            try:
+                where_clause, _ = build_where_clause(str(op.get('where') or ''), op.get('where_params') or '',
+                                                     op.get('filters') or '')
+            except ValueError as e:
+                raise ValueError(f"第 {i} 个操作 ({kind}) 的条件错误: {e}")
+            if not where_clause:
+                raise ValueError(f"第 {i} 个操作 ({kind}) 缺少 where 或 filters 条件")
+        if kind == 'sql':
+            statement = str(op.get('sql', '')).strip()
+            first_word = statement.split(None, 1)[0].upper() if statement else ""
+            if first_word not in BATCH_SQL_STATEMENTS:
+                raise ValueError(f"第 {i} 个操作 (sql) 只支持 {', '.join(BATCH_SQL_STATEMENTS)} 语句")
+    return operations
+
+def build_batch_statement(op: Dict[str, Any]) -> Tuple[str, List[Any], str]:
+    """
+    将批量操作转换为SQL语句
+
+    Returns:
+        Tuple[str, List[Any], str]: (SQL语句, 参数列表, 操作描述)
+    """
+    kind = op['op']
+    if kind in ('update', 'delete'):
+        # 与 update_data / delete_data 相同，条件中的 % 被转义，值通过占位符绑定
+        where_clause, where_values = build_where_clause(str(op.get('where') or ''), op.get('where_params') or '',
+                                                        op.get('filters') or '')
+    if kind == 'insert':
+        data = op['data']
+        columns = ', '.join(f"`{col}`" for col in data)
+        placeholders = ', '.join(['%s'] * len(data))
+        return (f"INSERT INTO `{op['table']}` ({columns}) VALUES ({placeholders})",
+                list(data.values()), f"INSERT {op['table']}")
+    if kind == 'update':
+        set_clause = ', '.join(f"`{col}` = %s" for col in op['set'])
+        return (f"UPDATE `{op['table']}` SET {set_clause} WHERE {where_clause}",
+                list(op['set'].values()) + where_values, f"UPDATE {op['table']}")
+    if kind == 'delete':
+        return f"DELETE FROM `{op['table']}` WHERE {where_clause}", where_values, f"DELETE {op['table']}"
+    if kind == 'savepoint':
+        return f"SAVEPOINT `{op['name']}`", [], f"SAVEPOINT {op['name']}"
+    if kind == 'rollback_to':
+        return f"ROLLBACK TO SAVEPOINT `{op['name']}`", [], f"ROLLBACK TO {op['name']}"
+    if kind == 'release':
+        return f"RELEASE SAVEPOINT `{op['name']}`", [], f"RELEASE {op['name']}"
+
+    statement = op['sql'].strip().rstrip(';')
+    summary = ' '.join(statement.split())
+    return statement, list(op.get('params') or []), summary if len(summary) <= 40 else summary[:39] + "…"
+
+def _format_batch_reports(reports: List[Tuple[int, str, str, Optional[int], float]]) -> List[str]:
+    """格式化批量操作中每个操作的结果"""
+    lines = ["📋 操作明细:"]
+    for index, description, status, affected, op_time in reports:
+        affected_text = f"影响 {affected} 行, " if affected is not None else ""
+        note = "，失败后已回滚到保存点" if status == "↩️" else ""
+        lines.append(f"  {status} {index}. {description}: {affected_text}耗时 {op_time * 1000:.1f}ms{note}")
+    return lines
+
+@mcp.tool()
+@engine.offload()
+def execute_batch(database_name: str, operations: Union[str, List[Dict[str, Any]]],
+                  dry_run: bool = False, force: bool = False) -> str:
+    """
+    在同一个连接、同一个事务中按顺序执行多个写操作，全部成功才提交，任一操作失败则全部回滚。
+    涉及多张表的一次逻辑修改应使用此工具，而不是多次调用 insert_data / update_data / delete_data
+
+    Args:
+        database_name: 数据库名称
+        operations: 操作列表（JSON数组），按顺序执行，支持的操作:
+            {"op": "insert", "table": "users", "data": {"name": "张三"}}
+            {"op": "update", "table": "users", "set": {"age": 30}, "where": "id = 1"}
+            {"op": "delete", "table": "users", "where": "id = 2"}
+            update / delete 也可以像 update_data 一样使用 "where": "id = %s" 加 "where_params": [2]，或 "filters"
+            {"op": "sql", "sql": "UPDATE t SET n = n + 1 WHERE id = %s", "params": [1]}
+            {"op": "savepoint", "name": "sp1"} / {"op": "rollback_to", "name": "sp1"} / {"op": "release", "name": "sp1"}
+            任一操作可指定 "rollback_to_on_error": "sp1"，失败时回滚到该保存点并继续执行后续操作
+        dry_run: 试运行，执行全部操作并报告影响行数和耗时，最后回滚，不修改任何数据
+        force: 开启全表扫描拦截时，是否强制执行大范围的更新和删除
+
+    Returns:
+        str: 每个操作的影响行数和耗时，以及事务结果
+    """
+    try:
+        try:
+            op_list = parse_batch_operations(operations)
+        except ValueError as e:
+            logger.error(f"批量操作解析失败: {e}")
+            return f"❌ 批量操作失败: {e}"
+
+        reports = []
+        savepoints = set()
+        start = time.perf_counter()
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            connection.begin()
+            try:
+                for i, op in enumerate(op_list, 1):
+                    sql, params, description = build_batch_statement(op)
+                    # sql 类型无参数时按原样执行；其他操作生成的语句中 % 已转义，总是绑定参数
+                    args = tuple(params) if params or op['op'] != 'sql' else None
+                    if EXPLAIN_CONFIG['guard'] and not force and op['op'] in ('update', 'delete', 'sql') \
+                            and sql.split(None, 1)[0].upper() in ('UPDATE', 'DELETE'):
+                        blocked = check_full_scan_guard(connection, sql, args)
+                        if blocked:
+                            connection.rollback()
+                            return f"{blocked}\n❌ 第 {i} 个操作 ({description}) 被拦截，事务已全部回滚"
+
+                    op_start = time.perf_counter()
+                    try:
+                        cursor.execute(sql, args)
+                    except pymysql.Error as e:
+                        fallback = op.get('rollback_to_on_error')
+                        if fallback not in savepoints:
+                            reports.append((i, description, "❌", None, time.perf_counter() - op_start))
+                            raise
+                        cursor.execute(f"ROLLBACK TO SAVEPOINT `{fallback}`")
+                        reports.append((i, description, "↩️", None, time.perf_counter() - op_start))
+                        logger.warning(f"批量操作第 {i} 个操作失败，已回滚到保存点 {fallback}: {e}")
+                        continue
+
+                    if op['op'] == 'savepoint':
+                        savepoints.add(op['name'])
+                    elif op['op'] == 'release':
+                        savepoints.discard(op['name'])
+                    affected = cursor.rowcount if op['op'] in ('insert', 'update', 'delete', 'sql') else None
+                    reports.append((i, description, "✅", affected, time.perf_counter() - op_start))
+
+                if dry_run:
+                    connection.rollback()
+                else:
+                    connection.commit()
+                    # sql 类型的操作无法确定涉及的表，失效整个数据库的查询结果
+                    if any(op['op'] == 'sql' for op in op_list):
+                        result_cache.invalidate(database_name)
+                    else:
+                        result_cache.invalidate(database_name, [op['table'] for op in op_list if 'table' in op])
+            except Exception as e:
+                connection.rollback()
+                failed = reports[-1] if reports else None
+                lines = [format_error_message(e, "批量操作")]
+                if failed:
+                    lines.append(f"❌ 第 {failed[0]} 个操作 ({failed[1]}) 出错，事务已全部回滚，没有数据被修改")
+                lines.extend(_format_batch_reports(reports))
+                logger.error(f"批量操作失败，已回滚: {e}")
+                return "\n".join(lines)
+        elapsed = time.perf_counter() - start
+
+        total_affected = sum(report[3] or 0 for report in reports)
+        if dry_run:
+            result = [f"🧪 试运行完成: {len(op_list)} 个操作全部可执行，预计影响 {total_affected} 行，事务已回滚，没有数据被修改"]
+        else:
+            result = [f"✅ 批量操作已提交: {len(op_list)} 个操作，共影响 {total_affected} 行"]
+        result.extend(_format_batch_reports(reports))
+        result.append(f"⏱️ 总耗时 {elapsed * 1000:.1f}ms" + ("" if dry_run else "（单个事务，一次提交）"))
+
+        logger.info(f"批量操作{'试运行' if dry_run else '已提交'}: {database_name}, {len(op_list)} 个操作")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"批量操作失败: {e}")
+        return format_error_message(e, "批量操作")
+
 @mcp.tool()
-def query_data(database_name: str, table_name: str, where_condition: str = "", limit: int = 10) -> str:
+@engine.offload()
+def query_data(database_name: str, table_name: str, where_condition: str = "", limit: int = 10,
+               output_format: str = "text", filters: Union[str, List[Dict[str, Any]]] = "",
+               where_params: Union[str, List[Any]] = "", use_cache: bool = True) -> str:
     """
     查询表中的数据
     
     Args:
         database_name: 数据库名称
         table_name: 表名称
-        where_condition: 可选的WHERE条件，如: "age > 18"
+        where_condition: 可选的WHERE条件，如: "age > 18"；也可以是带 %s 占位符的模板，如: "age > %s"
         limit: 限制返回的行数，默认10行
+        output_format: 输出格式: text（默认）、json-compact、columnar（字段名只输出一次，最省token）、csv
+        filters: 可选的结构化过滤条件（JSON数组），如: '[{"column": "age", "op": ">", "value": 18}]'，
+                 支持 = != > >= < <= like、not like、in、not in、between、is null、is not null
+        where_params: where_condition 中 %s 占位符对应的参数（JSON数组），如: '[18]'
+        use_cache: 是否使用查询结果缓存，默认true；需要读取刚被其他客户端修改的数据时传false
         
     Returns:
         str: 查询结果
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
-        
-        # 构建SELECT语句
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        try:
+            where_clause, values = build_where_clause(where_condition, where_params, filters)
+        except ValueError as e:
+            return f"❌ 查询数据失败: {e}"
+
+        # 构建SELECT语句，条件值和LIMIT都通过占位符绑定
         sql = f"SELECT * FROM `{table_name}`"
-        if where_condition:
-            sql += f" WHERE {where_condition}"
-        sql += f" LIMIT {limit}"
-        
-        cursor.execute(sql)
-        results = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        
-        if not results:
-            return f"📋 查询完成，表 {table_name} 中没有符合条件的数据"
+        if where_clause:
+            sql += f" WHERE {where_clause}"
+        sql += " LIMIT %s"
+        values.append(int(limit))
         
-        # 格式化结果
-        result_str = f"📋 查询结果 (共 {len(results)} 行):\n"
-        for i, row in enumerate(results, 1):
-            result_str += f"\n第 {i} 行: {json.dumps(row, ensure_ascii=False, indent=2)}"
+        def load():
+            with get_mysql_connection(database_name) as connection, \
+                    connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(sql, tuple(values))
+                rows = cursor.fetchall()
+                return ([desc[0] for desc in cursor.description], rows), len(rows)
+
+        # 相同的查询在缓存有效期内直接返回缓存结果，本服务器的写操作会使其失效
+        field_names, results = result_cache.get(make_key(database_name, sql, values), [table_name],
+                                                load, use_cache)
         
         logger.info(f"成功查询表 {table_name}，返回 {len(results)} 行数据")
-        return result_str
+        if output_format == "text":
+            return render_query_text(table_name, results)
+        return encode_rows(field_names, [[row[name] for name in field_names] for row in results], output_format)
         
     except Exception as e:
         logger.error(f"查询数据失败: {e}")
         return format_error_message(e, "查询数据")
 
+def get_primary_key_columns(cursor, database_name: str, table_name: str) -> List[str]:
+    """按索引顺序获取表的主键字段"""
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY' "
+        "ORDER BY SEQ_IN_INDEX",
+        (database_name, table_name)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def _page_fingerprint(database_name: str, table_name: str, columns: str, where_condition: str,
+                      filters: Union[str, List[Dict[str, Any]]] = "", where_params: Union[str, List[Any]] = "") -> str:
+    """查询条件指纹，防止分页令牌被用于不同的查询"""
+    extra = [value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+             for value in (filters, where_params)]
+    raw = "\x00".join([database_name, table_name, columns, where_condition] + extra)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+def encode_page_token(fingerprint: str, last_key: List[Any]) -> str:
+    """将最后一行的主键值编码为不透明的分页令牌"""
+    payload = json.dumps({"f": fingerprint, "k": last_key}, ensure_ascii=False,
+                         separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_page_token(token: str, fingerprint: str) -> List[Any]:
+    """
+    解码分页令牌，返回上一页最后一行的主键值
+
+    Raises:
+        ValueError: 令牌无效或与当前查询条件不匹配
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        last_key = payload['k']
+        token_fingerprint = payload['f']
+    except Exception:
+        raise ValueError("分页令牌无效")
+    if token_fingerprint != fingerprint:
+        raise ValueError("分页令牌与当前查询条件不匹配，请使用相同的表、字段和WHERE条件")
+    return last_key
+
+@mcp.tool()
+@engine.offload()
+def query_data_page(database_name: str, table_name: str, columns: str = "", where_condition: str = "",
+                    page_size: int = 100, page_token: str = "", filters: Union[str, List[Dict[str, Any]]] = "",
+                    where_params: Union[str, List[Any]] = "") -> str:
+    """
+    分页查询表中的数据，适合浏览大表。按主键进行键集分页（不使用OFFSET），
+    服务端游标逐行读取，结果以紧凑格式返回：字段名只输出一次，每行为一个JSON数组。
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        columns: 需要返回的字段，逗号分隔，如: "id, name, age"，默认返回所有字段
+        where_condition: 可选的WHERE条件，如: "age > 18"；也可以是带 %s 占位符的模板，如: "age > %s"
+        page_size: 每页行数，默认100，最大1000
+        page_token: 上一页返回的 next_page_token，首页留空
+        filters: 可选的结构化过滤条件（JSON数组），同 query_data
+        where_params: where_condition 中 %s 占位符对应的参数（JSON数组），如: '[18]'
+
+    Returns:
+        str: 当前页数据，以及用于获取下一页的 next_page_token
+    """
+    try:
+        page_size = max(1, min(page_size, 1000))
+        try:
+            where_clause, where_values = build_where_clause(where_condition, where_params, filters)
+        except ValueError as e:
+            return f"❌ 分页查询失败: {e}"
+        fingerprint = _page_fingerprint(database_name, table_name, columns, where_condition, filters, where_params)
+        try:
+            last_key = decode_page_token(page_token, fingerprint) if page_token else None
+        except ValueError as e:
+            return f"❌ 分页查询失败: {e}"
+
+        with get_mysql_connection(database_name) as connection:
+            with connection.cursor() as cursor:
+                pk_columns = get_primary_key_columns(cursor, database_name, table_name)
+            if not pk_columns:
+                return f"❌ 分页查询失败: 表 {table_name} 没有主键，无法进行键集分页，请使用 query_data"
+
+            # 字段投影，确保包含主键以生成分页令牌
+            selected = [col.strip().strip('`') for col in columns.split(',') if col.strip()]
+            if selected:
+                selected += [pk for pk in pk_columns if pk not in selected]
+                select_sql = ', '.join(f"`{col}`" for col in selected)
+            else:
+                select_sql = '*'
+
+            # 条件中的 % 已转义，值通过占位符绑定
+            conditions = [f"({where_clause})"] if where_clause else []
+            params: List[Any] = list(where_values)
+            if last_key is not None:
+                if len(last_key) != len(pk_columns):
+                    return "❌ 分页查询失败: 分页令牌与表主键不匹配"
+                pk_sql = ', '.join(f"`{pk}`" for pk in pk_columns)
+                conditions.append(f"({pk_sql}) > ({', '.join(['%s'] * len(pk_columns))})")
+                params.extend(last_key)
+
+            sql = f"SELECT {select_sql} FROM `{table_name}`"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " ORDER BY " + ', '.join(f"`{pk}`" for pk in pk_columns)
+            # 多取一行用于判断是否还有下一页
+            sql += f" LIMIT {page_size + 1}"
+
+            # 使用服务端游标逐行读取，不在客户端缓冲整个结果集
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(sql, tuple(params))
+                field_names = [desc[0] for desc in cursor.description]
+                pk_positions = [field_names.index(pk) for pk in pk_columns]
+
+                lines = []
+                last_row = None
+                has_more = False
+                for row in cursor:
+                    if len(lines) == page_size:
+                        has_more = True
+                        break
+                    lines.append(json.dumps(list(row), ensure_ascii=False,
+                                            separators=(',', ':'), default=str))
+                    last_row = row
+
+        if not lines:
+            return f"📋 查询完成，表 {table_name} 中没有更多符合条件的数据"
+
+        result = [f"📋 分页查询结果 (本页 {len(lines)} 行):"]
+        result.append("columns: " + json.dumps(field_names, ensure_ascii=False, separators=(',', ':')))
+        result.extend(lines)
+        if has_more:
+            next_token = encode_page_token(fingerprint, [last_row[i] for i in pk_positions])
+            result.append(f"next_page_token: {next_token}")
+        else:
+            result.append("✅ 已是最后一页")
+
+        logger.info(f"成功分页查询表 {table_name}，返回 {len(lines)} 行数据")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"分页查询数据失败: {e}")
+        return format_error_message(e, "分页查询数据")
+
+@mcp.tool()
+@engine.offload(timeout=EXPORT_CONFIG['timeout'])
+def export_table(database_name: str, table_name: str = "", file_path: str = "", export_format: str = "csv",
+                 columns: str = "", where_condition: str = "", filters: Union[str, List[Dict[str, Any]]] = "",
+                 where_params: Union[str, List[Any]] = "", query: str = "") -> str:
+    """
+    将整张表或查询结果流式导出到本地文件（CSV / NDJSON / Parquet），只返回文件路径、行数和文件大小，
+    数据不会出现在对话中。需要导出或备份大量数据时使用，而不是用 query_data 逐页读取
+
+    Args:
+        database_name: 数据库名称
+        table_name: 要导出的表名称（与 query 二选一）
+        file_path: 导出文件路径，相对路径基于服务器配置的导出目录，不能位于导出目录之外，默认 "表名_时间戳.扩展名"
+        export_format: 导出格式: csv（默认）、ndjson、parquet（需要安装 pyarrow）
+        columns: 需要导出的字段，逗号分隔，默认导出所有字段
+        where_condition: 可选的WHERE条件，支持 %s 占位符
+        filters: 可选的结构化过滤条件（JSON数组），同 query_data
+        where_params: where_condition 或 query 中 %s 占位符对应的参数（JSON数组）
+        query: 自定义 SELECT 查询，提供时忽略 table_name、columns 和过滤条件
+
+    Returns:
+        str: 导出文件路径、行数和文件大小
+    """
+    try:
+        format_error = check_export_format(export_format)
+        if format_error:
+            return format_error
+
+        statement = query.strip().rstrip(';').strip()
+        if statement:
+            if not is_read_only_select(statement):
+                return "❌ 导出数据失败: query 只支持只读的 SELECT 查询（含 WITH ... SELECT，不支持 INTO 和多条语句）"
+            try:
+                params = build_where_clause("", where_params)[1]
+            except ValueError as e:
+                return f"❌ 导出数据失败: {e}"
+            if params:
+                sql = statement
+            else:
+                sql = statement.replace('%', '%%')
+            source = "query"
+        elif table_name:
+            try:
+                where_clause, params = build_where_clause(where_condition, where_params, filters)
+            except ValueError as e:
+                return f"❌ 导出数据失败: {e}"
+            selected = [col.strip().strip('`') for col in columns.split(',') if col.strip()]
+            select_sql = ', '.join(f"`{col}`" for col in selected) if selected else '*'
+            sql = f"SELECT {select_sql} FROM `{table_name}`"
+            if where_clause:
+                sql += f" WHERE {where_clause}"
+            source = table_name
+        else:
+            return "❌ 导出数据失败: 请提供 table_name 或 query"
+
+        default_name = f"{source}_{time.strftime('%Y%m%d_%H%M%S')}"
+        try:
+            path = resolve_export_path(file_path, default_name, export_format)
+        except ValueError as e:
+            return f"❌ 导出数据失败: {e}"
+
+        start = time.perf_counter()
+        with get_mysql_connection(database_name) as connection:
+            # 使用服务端游标逐批读取，不在客户端缓冲整个结果集
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(sql, tuple(params))
+                row_count, file_size = stream_to_file(cursor, path, export_format)
+        elapsed = time.perf_counter() - start
+
+        logger.info(f"成功导出 {row_count} 行数据到 {path}，耗时 {elapsed:.2f}s")
+        return "\n".join([
+            f"✅ 导出完成: {path}",
+            f"  • 格式: {export_format}",
+            f"  • 行数: {row_count}",
+            f"  • 文件大小: {format_file_size(file_size)} ({file_size} 字节)",
+            f"  • 耗时: {elapsed:.2f}s",
+        ])
+
+    except Exception as e:
+        logger.error(f"导出数据失败: {e}")
+        return format_error_message(e, "导出数据")
+
+def _insert_batch(database_name: str, table_name: str, batch: List[Dict[str, Any]],
+                  mode: str) -> Tuple[int, int, float]:
+    """在独立的连接上以一条多行INSERT写入一个批次（自动提交），返回 (行数, 影响行数, 耗时)"""
+    # 各行的字段可能不同（NDJSON、省略的默认值），取本批次字段的并集，缺少的字段使用DEFAULT
+    columns = list(dict.fromkeys(col for row in batch for col in row))
+    sql, values = build_bulk_insert_sql(table_name, columns, batch, mode)
+    start = time.perf_counter()
+    with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        return len(batch), cursor.rowcount, time.perf_counter() - start
+
+def _load_data_infile(database_name: str, table_name: str, path: str, file_columns: List[str],
+                      specs: Dict[str, Any], mode: str) -> int:
+    """
+    通过 LOAD DATA LOCAL INFILE 导入CSV文件，返回写入行数
+
+    连接池中的连接未开启 local_infile，这里使用独立连接。
+
+    Raises:
+        LoadDataUnavailable: 服务器或客户端不允许加载本地文件
+    """
+    connection = pymysql.connect(**MYSQL_CONFIG, database=database_name, local_infile=True)
+    try:
+        with track_query(connection), connection.cursor() as cursor:
+            cursor.execute("SELECT @@GLOBAL.local_infile")
+            if not int(cursor.fetchone()[0] or 0):
+                raise LoadDataUnavailable("服务器未开启 local_infile")
+            sql = build_load_data_sql(table_name, file_columns, specs, mode, detect_line_terminator(path))
+            try:
+                return cursor.execute(sql, (path,))
+            except pymysql.Error as e:
+                if e.args and e.args[0] in LOCAL_INFILE_DISABLED_ERRORS:
+                    raise LoadDataUnavailable(str(e))
+                raise
+    finally:
+        connection.close()
+
+def _load_in_batches(database_name: str, table_name: str, path: str, file_format: str,
+                     specs: Dict[str, Any], mode: str, batch_rows: int,
+                     workers: int, total_rows: int, progress: Callable[[int, int], None]) -> Dict[str, Any]:
+    """
+    并行分批导入：主线程逐批读取和转换文件，多个工作线程各自借用连接写入
+
+    同时在途的批次不超过工作线程数的2倍，内存占用与文件大小无关。每个批次单独提交，
+    出错时停止提交新批次，已写入的批次不会回滚。
+    """
+    report = {'rows': 0, 'affected': 0, 'batches': 0, 'batch_time': 0.0, 'error': None}
+    in_flight = set()
+
+    def collect(done) -> None:
+        for future in done:
+            in_flight.discard(future)
+            try:
+                rows, affected, elapsed = future.result()
+            except Exception as e:
+                if report['error'] is None:
+                    report['error'] = e
+                continue
+            report['rows'] += rows
+            report['affected'] += affected
+            report['batches'] += 1
+            report['batch_time'] += elapsed
+            progress(report['rows'], total_rows)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mysql-import')
+    try:
+        try:
+            for batch in iter_batches(specs, path, file_format, batch_rows):
+                if report['error'] is not None:
+                    break
+                while len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                # 复制上下文，使工作线程的连接也登记到当前工具调用，超时时可以被终止
+                in_flight.add(executor.submit(contextvars.copy_context().run, _insert_batch,
+                                              database_name, table_name, batch, mode))
+        except (ValueError, UnicodeDecodeError) as e:
+            report['error'] = e
+        done, _ = wait(in_flight)
+        collect(done)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return report
+
+@mcp.tool()
+async def import_file(database_name: str, table_name: str, file_path: str, file_format: str = "",
+                      mode: str = "insert", batch_size: int = 0, workers: int = 0,
+                      use_load_data: bool = True, ctx: Context = None) -> str:
+    """
+    将本地 CSV 或 NDJSON 文件导入到表中，是 export_table 的逆操作。导入前按表结构检查字段并抽样校验类型；
+    CSV 文件优先使用 LOAD DATA LOCAL INFILE，不可用时自动改为并行分批插入。需要导入大量数据时使用
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        file_path: 文件路径（CSV需要表头行），相对路径基于服务器配置的导入目录（默认同导出目录），不能位于导入目录之外
+        file_format: 文件格式: csv、ndjson，默认按扩展名判断
+        mode: 导入模式: insert（默认）、ignore（跳过重复行）、upsert（重复时更新，始终使用分批插入）
+        batch_size: 分批插入时每批的行数，默认使用服务器配置
+        workers: 分批插入的并行线程数，默认使用服务器配置，受连接池大小限制
+        use_load_data: 是否尝试使用 LOAD DATA LOCAL INFILE，默认true
+
+    Returns:
+        str: 导入方式、行数、耗时和吞吐量
+    """
+    try:
+        if mode not in BULK_INSERT_MODES:
+            return f"❌ 导入文件失败: 不支持的导入模式 '{mode}'，可选值: {', '.join(BULK_INSERT_MODES)}"
+        try:
+            path = resolve_import_path(file_path)
+        except ValueError as e:
+            return f"❌ 导入文件失败: {e}"
+        if not os.path.isfile(path):
+            return f"❌ 导入文件失败: 文件不存在: {path}"
+        fmt = detect_import_format(path, file_format)
+        if fmt is None:
+            return f"❌ 导入文件失败: 无法确定文件格式，请通过 file_format 指定: {', '.join(IMPORT_FORMATS)}"
+
+        # 按表结构检查文件字段并抽样校验类型
+        _, describe_rows = await engine.run(get_table_columns, database_name, table_name)
+        if not describe_rows:
+            return f"❌ 导入文件失败: 表 {table_name} 不存在或没有字段"
+        specs = build_column_specs(describe_rows)
+        try:
+            file_columns = read_file_columns(path, fmt)
+        except (ValueError, UnicodeDecodeError) as e:
+            return f"❌ 导入文件失败: 文件读取错误: {e}"
+        problems = check_column_mapping(file_columns, specs)
+        problems += [] if problems else validate_sample(specs, path, fmt)
+        if problems:
+            return "❌ 导入文件失败: 文件与表结构不匹配，未写入任何数据\n" + "\n".join(f"  • {p}" for p in problems)
+
+        total_rows = count_data_lines(path, fmt)
+        file_size = os.path.getsize(path)
+        batch_rows = batch_size if batch_size > 0 else IMPORT_CONFIG['batch_rows']
+        worker_count = max(1, min(workers if workers > 0 else IMPORT_CONFIG['workers'],
+                                  pool_manager.get_pool(database_name).max_size))
+
+        loop = asyncio.get_running_loop()
+
+        def progress(done: int, total: int) -> None:
+            if ctx is not None:
+                asyncio.run_coroutine_threadsafe(ctx.report_progress(done, max(total, done)), loop)
+
+        start = time.perf_counter()
+        method = "分批插入"
+        fallback_reason = None
+        report = None
+        if fmt == "csv" and use_load_data and IMPORT_CONFIG['load_data'] and mode != "upsert":
+            try:
+                affected = await engine.run(_load_data_infile, database_name, table_name, path,
+                                            file_columns, specs, mode, timeout=IMPORT_CONFIG['timeout'])
+                method = "LOAD DATA LOCAL INFILE"
+                report = {'rows': total_rows, 'affected': affected, 'batches': 1, 'error': None}
+                if ctx is not None:
+                    await ctx.report_progress(total_rows, total_rows)
+            except LoadDataUnavailable as e:
+                fallback_reason = str(e)
+                logger.warning(f"LOAD DATA 不可用，改为分批插入: {e}")
+        if report is None:
+            report = await engine.run(_load_in_batches, database_name, table_name, path, fmt,
+                                      specs, mode, batch_rows, worker_count, total_rows, progress,
+                                      timeout=IMPORT_CONFIG['timeout'])
+        elapsed = time.perf_counter() - start
+        # 中断的导入也可能已写入部分批次
+        result_cache.invalidate(database_name, [table_name])
+
+        if report['error'] is not None:
+            logger.error(f"导入文件中断: {report['error']}")
+            return "\n".join([
+                format_error_message(report['error'], "导入文件"),
+                f"⚠️ 导入已中断: 已写入 {report['rows']} 行（{report['batches']} 个批次，各批次独立提交，已写入的数据不会回滚）",
+            ])
+
+        throughput = report['rows'] / elapsed if elapsed > 0 else float(report['rows'])
+        result = [f"✅ 成功将 {os.path.basename(path)} 导入表 {table_name} (方式: {method}, 模式: {mode})"]
+        if method == "LOAD DATA LOCAL INFILE":
+            result.append(f"  • 文件行数: {total_rows}, 写入行数: {report['affected']}")
+            if report['affected'] < total_rows and mode != "upsert":
+                result.append(f"  • ⚠️ {total_rows - report['affected']} 行未写入（重复键或数据错误，"
+                              f"LOAD DATA LOCAL 将其作为警告跳过）")
+        else:
+            result.append(f"  • 行数: {report['rows']}, 影响行数: {report['affected']}")
+            result.append(f"  • 批次: {report['batches']} 个，每批最多 {batch_rows} 行，并行 {worker_count} 个连接")
+            if fallback_reason:
+                result.append(f"  • 💡 未使用 LOAD DATA: {fallback_reason}")
+        result.append(f"⏱️ 总耗时 {elapsed:.2f}s，吞吐量 {throughput:.0f} 行/秒 "
+                      f"({format_file_size(file_size / elapsed if elapsed > 0 else file_size)}/秒)")
+
+        logger.info(f"成功导入 {report['rows']} 行数据到表 {table_name}，方式: {method}，耗时 {elapsed:.2f}s")
+        return "\n".join(result)
+
+    except QueryTimeoutError as e:
+        result_cache.invalidate(database_name, [table_name])
+        logger.error(f"导入文件超时: {e}")
+        return f"❌ 导入文件失败: 操作超时 ({e})，已终止服务端查询，部分批次可能已写入"
+    except Exception as e:
+        logger.error(f"导入文件失败: {e}")
+        return format_error_message(e, "导入文件")
+
 @mcp.tool()
-def show_databases() -> str:
+@engine.offload()
+def show_databases(use_cache: bool = True) -> str:
     """
     显示所有数据库
+
+    Args:
+        use_cache: 是否使用查询结果缓存，默认true
     
     Returns:
         str: 数据库列表
     """
     try:
-        connection = get_mysql_connection()
-        cursor = connection.cursor()
-        
-        cursor.execute("SHOW DATABASES")
-        databases = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
+        def load():
+            with get_mysql_connection() as connection, connection.cursor() as cursor:
+                cursor.execute("SHOW DATABASES")
+                rows = cursor.fetchall()
+                return rows, len(rows)
+
+        databases = result_cache.get(make_key(None, "SHOW DATABASES"), [], load, use_cache)
         
         db_list = [db[0] for db in databases]
         result = f"📊 MySQL服务器中的数据库列表:\n" + "\n".join([f"  • {db}" for db in db_list])
@@ -358,25 +1254,30 @@ def show_databases() -> str:
         return format_error_message(e, "获取数据库列表")
 
 @mcp.tool()
-def show_tables(database_name: str) -> str:
+@engine.offload()
+def show_tables(database_name: str, use_cache: bool = True) -> str:
     """
     显示指定数据库中的所有表
 
     Args:
         database_name: 数据库名称
+        use_cache: 是否使用查询结果缓存，默认true
 
     Returns:
         str: 表列表
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
+        def load():
+            _, rows = schema_cache.get(
+                (database_name, None, 'tables'),
+                lambda: get_mysql_connection(database_name),
+                lambda connection: fetch_rows(connection, "SHOW TABLES"),
+                lambda connection: database_version(connection, database_name)
+            )
+            return rows, len(rows)
+
+        # 结果缓存命中时无需借用连接校验表结构缓存
+        tables = result_cache.get(make_key(database_name, "SHOW TABLES"), [], load, use_cache)
 
         table_list = [table[0] for table in tables]
         if not table_list:
@@ -392,130 +1293,104 @@ def show_tables(database_name: str) -> str:
         return format_error_message(e, "获取表列表")
 
 @mcp.tool()
-def describe_table(database_name: str, table_name: str) -> str:
+@engine.offload()
+def describe_table(database_name: str, table_name: str, output_format: str = "text") -> str:
     """
     查看表的结构信息，包括字段名、数据类型、是否为空、键信息、默认值等
 
     Args:
         database_name: 数据库名称
         table_name: 表名称
+        output_format: 输出格式: text（默认）、json-compact、columnar（最省token）、csv
 
     Returns:
         str: 表结构详细信息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
 
-        # 使用DESCRIBE命令获取表结构
-        cursor.execute(f"DESCRIBE `{table_name}`")
-        columns = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
+        # 使用DESCRIBE命令获取表结构，结果在进程内缓存
+        field_names, columns = get_table_columns(database_name, table_name)
 
         if not columns:
             return f"📋 表 {table_name} 不存在或没有字段"
 
-        # 格式化表结构信息
-        result = f"📋 表 {database_name}.{table_name} 的结构信息:\n"
-        result += "=" * 80 + "\n"
-        result += f"{'字段名':<20} {'数据类型':<20} {'允许NULL':<10} {'键':<10} {'默认值':<15} {'额外信息'}\n"
-        result += "-" * 80 + "\n"
-
-        for column in columns:
-            field = column[0]
-            type_info = column[1]
-            null_info = column[2]
-            key_info = column[3] if column[3] else ""
-            default_value = str(column[4]) if column[4] is not None else "NULL"
-            extra_info = column[5] if column[5] else ""
-
-            result += f"{field:<20} {type_info:<20} {null_info:<10} {key_info:<10} {default_value:<15} {extra_info}\n"
-
-        result += "=" * 80 + "\n"
-        result += f"📊 共 {len(columns)} 个字段"
-
         logger.info(f"成功获取表 {database_name}.{table_name} 的结构信息")
-        return result
+        if output_format == "text":
+            return render_columns_text(database_name, table_name, columns)
+        return encode_rows(field_names, columns, output_format)
 
     except Exception as e:
         logger.error(f"获取表结构失败: {e}")
         return format_error_message(e, "获取表结构")
 
 @mcp.tool()
-def show_table_indexes(database_name: str, table_name: str) -> str:
+@engine.offload()
+def show_table_indexes(database_name: str, table_name: str, output_format: str = "text") -> str:
     """
     显示表的索引信息
 
     Args:
         database_name: 数据库名称
         table_name: 表名称
+        output_format: 输出格式: text（默认）、json-compact、columnar（最省token）、csv
 
     Returns:
         str: 表的索引信息
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-
-        # 获取表的索引信息
-        cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-        indexes = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
-
-        if not indexes:
-            return f"📋 表 {database_name}.{table_name} 没有索引"
-
-        # 格式化索引信息
-        result = f"📋 表 {database_name}.{table_name} 的索引信息:\n"
-        result += "=" * 100 + "\n"
-        result += f"{'索引名':<20} {'字段名':<20} {'唯一性':<10} {'索引类型':<15} {'注释'}\n"
-        result += "-" * 100 + "\n"
-
-        for index in indexes:
-            key_name = index[2]
-            column_name = index[4]
-            non_unique = "否" if index[1] == 0 else "是"
-            index_type = index[10] if len(index) > 10 else ""
-            comment = index[11] if len(index) > 11 and index[11] else ""
-
-            result += f"{key_name:<20} {column_name:<20} {non_unique:<10} {index_type:<15} {comment}\n"
-
-        result += "=" * 100 + "\n"
-        result += f"📊 共 {len(indexes)} 个索引项"
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # 获取表的索引信息，结果在进程内缓存
+        field_names, indexes = schema_cache.get(
+            (database_name, table_name, 'indexes'),
+            lambda: get_mysql_connection(database_name),
+            lambda connection: fetch_rows(connection, f"SHOW INDEX FROM `{table_name}`"),
+            lambda connection: table_version(connection, database_name, table_name)
+        )
 
         logger.info(f"成功获取表 {database_name}.{table_name} 的索引信息")
-        return result
+        if output_format == "text":
+            return render_indexes_text(database_name, table_name, indexes)
+        return encode_rows(field_names, indexes, output_format)
 
     except Exception as e:
         logger.error(f"获取表索引失败: {e}")
         return format_error_message(e, "获取表索引")
 
 @mcp.tool()
-def show_create_table(database_name: str, table_name: str) -> str:
+@engine.offload()
+def show_create_table(database_name: str, table_name: str, use_cache: bool = True) -> str:
     """
     显示创建表的完整SQL语句
 
     Args:
         database_name: 数据库名称
         table_name: 表名称
+        use_cache: 是否使用查询结果缓存，默认true
 
     Returns:
         str: 创建表的SQL语句
     """
     try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor()
-
-        # 获取创建表的SQL语句
-        cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
-        result = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        # 获取创建表的SQL语句，结果在进程内缓存
+        def load():
+            _, rows = schema_cache.get(
+                (database_name, table_name, 'create'),
+                lambda: get_mysql_connection(database_name),
+                lambda connection: fetch_rows(connection, f"SHOW CREATE TABLE `{table_name}`"),
+                lambda connection: table_version(connection, database_name, table_name)
+            )
+            return rows, len(rows)
+
+        # 建表语句中的 AUTO_INCREMENT 随写入变化，结果按表登记，写操作后失效
+        rows = result_cache.get(make_key(database_name, f"SHOW CREATE TABLE `{table_name}`"), [table_name],
+                                load, use_cache)
+        result = rows[0] if rows else None
 
         if not result:
             return f"❌ 无法获取表 {database_name}.{table_name} 的创建语句"
@@ -536,6 +1411,377 @@ def show_create_table(database_name: str, table_name: str) -> str:
         logger.error(f"获取表创建语句失败: {e}")
         return format_error_message(e, "获取表创建语句")
 
+def _server_supports_explain_analyze(version: str) -> bool:
+    """EXPLAIN ANALYZE 需要 MySQL 8.0.18 及以上版本（MariaDB 语法不同，不支持）"""
+    if 'mariadb' in version.lower():
+        return False
+    match = re.match(r'(\d+)\.(\d+)\.(\d+)', version)
+    return bool(match) and tuple(int(part) for part in match.groups()) >= (8, 0, 18)
+
+@mcp.tool()
+@engine.offload()
+def explain_query(database_name: str, sql: str, analyze: bool = False, full_scan_threshold: int = 0) -> str:
+    """
+    分析SQL语句的执行计划，判断是否会全表扫描、是否使用索引、是否有文件排序或临时表，并推荐候选索引。
+    在执行可能影响大量数据的查询、更新或删除之前使用
+
+    Args:
+        database_name: 数据库名称
+        sql: 要分析的 SELECT / UPDATE / DELETE / INSERT ... SELECT 语句
+        analyze: 是否同时执行 EXPLAIN ANALYZE 获取实际执行耗时（仅 SELECT，MySQL 8.0.18+，会真正执行查询）
+        full_scan_threshold: 全表扫描告警的行数阈值，默认使用服务器配置
+
+    Returns:
+        str: 执行计划分析报告
+    """
+    try:
+        statement = sql.strip().rstrip(';').strip()
+        first_word = statement.split(None, 1)[0].upper() if statement else ""
+        if first_word not in ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE'):
+            return "❌ 执行计划分析失败: 只支持 SELECT、UPDATE、DELETE、INSERT、REPLACE 语句"
+        threshold = full_scan_threshold or EXPLAIN_CONFIG['full_scan_rows']
+
+        analyze_output = None
+        with get_mysql_connection(database_name) as connection:
+            tables, flags, cost = explain_statement(connection, statement)
+            # EXPLAIN ANALYZE 会真正执行语句，只允许只读查询（WITH ... DELETE/UPDATE 不算）
+            if analyze and not is_read_only_select(statement):
+                analyze_output = "EXPLAIN ANALYZE 会真正执行语句，只支持只读的 SELECT 查询，已跳过"
+            elif analyze:
+                if _server_supports_explain_analyze(connection.get_server_info()):
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN ANALYZE {statement}")
+                        row = cursor.fetchone()
+                        analyze_output = row[0] if row else None
+                else:
+                    analyze_output = "当前MySQL版本不支持 EXPLAIN ANALYZE（需要 8.0.18+）"
+
+        warnings, suggestions = analyze_plan(tables, flags, threshold)
+
+        result = [f"📋 执行计划分析 ({database_name}):"]
+        result.append("=" * 76)
+        result.extend(format_plan_tables(tables))
+        result.append("=" * 76)
+        for table in tables:
+            access_desc = ACCESS_TYPES.get(table['access_type'], table['access_type'])
+            result.append(f"  • {table['table']}: {access_desc}" +
+                          (f"，使用索引 {table['key']}" if table['key'] else "，未使用索引"))
+        if cost is not None:
+            result.append(f"💰 优化器估算成本: {cost:.2f}")
+        result.append(f"📑 文件排序: {'是' if flags['filesort'] else '否'} | 临时表: {'是' if flags['temporary'] else '否'}")
+
+        if warnings:
+            result.append("\n🔍 发现的问题:")
+            result.extend(f"  {warning}" for warning in warnings)
+        else:
+            result.append("\n✅ 执行计划良好，未发现全表扫描等问题")
+        if suggestions:
+            result.append("\n💡 候选索引:")
+            result.append("```sql\n" + "\n".join(suggestions) + "\n```")
+        if analyze_output:
+            result.append("\n⏱️ EXPLAIN ANALYZE:")
+            result.append(analyze_output[:4000])
+
+        logger.info(f"成功分析执行计划: {database_name}")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"执行计划分析失败: {e}")
+        return format_error_message(e, "执行计划分析")
+
+SCHEMA_CHANGE_METHODS = ("auto", "direct", "shadow")
+
+def load_schema_change_context(database_name: str, table_name: str) -> Optional[Dict[str, Any]]:
+    """读取规划结构变更所需的信息：服务器版本、表大小、字段、主键、全文索引和引用该表的外键"""
+    with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DATA_LENGTH, INDEX_LENGTH, TABLE_ROWS, ROW_FORMAT FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+            (database_name, table_name)
+        )
+        status = cursor.fetchone()
+        if not status:
+            return None
+        cursor.execute(
+            "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+            (database_name, table_name)
+        )
+        columns = {row[0]: {'type': row[1], 'nullable': row[2] == 'YES', 'data_type': row[3]}
+                   for row in cursor.fetchall()}
+        pk_columns = get_primary_key_columns(cursor, database_name, table_name)
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_TYPE = 'FULLTEXT'",
+            (database_name, table_name)
+        )
+        has_fulltext = cursor.fetchone()[0] > 0
+        cursor.execute(
+            "SELECT DISTINCT CONCAT(TABLE_SCHEMA, '.', TABLE_NAME) FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE REFERENCED_TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME = %s",
+            (database_name, table_name)
+        )
+        referenced_by = [row[0] for row in cursor.fetchall()]
+        version = ServerVersion(connection.get_server_info())
+
+    return {
+        'version': version,
+        'data_length': int(status[0] or 0),
+        'index_length': int(status[1] or 0),
+        'table_rows': int(status[2] or 0),
+        'row_format': status[3] or '',
+        'columns': columns,
+        'pk_columns': pk_columns,
+        'has_fulltext': has_fulltext,
+        'referenced_by': referenced_by,
+    }
+
+def plan_alter(table_name: str, alter: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """拆分并分类 ALTER 操作，汇总算法、锁、耗时估算和推荐的执行方式"""
+    clauses = split_alter_clauses(alter, table_name)
+    operations = [classify_clause(clause, context['version'], context['columns'], context['has_fulltext'],
+                                  context['row_format']) for clause in clauses]
+    summary = summarize_plan(operations)
+    seconds, basis = estimate_duration(summary, context['data_length'], context['index_length'])
+    return {
+        'clauses': clauses,
+        'operations': operations,
+        'summary': summary,
+        'seconds': seconds,
+        'basis': basis,
+        'shadow_seconds': estimate_shadow_duration(context['data_length'], context['index_length']),
+        'method': recommend_method(summary, context['data_length'], context['index_length']),
+        'shadow_problems': shadow_copy_problems(clauses, summary, context),
+        'sql': build_alter_sql(table_name, clauses, summary),
+    }
+
+def shadow_copy_problems(clauses: List[str], summary: Dict[str, Any], context: Dict[str, Any]) -> List[str]:
+    """检查影子表复制的前提条件，返回不满足的原因"""
+    problems = []
+    pk_columns = context['pk_columns']
+    if not pk_columns:
+        problems.append("表没有主键，无法分块复制和同步增量修改")
+    elif context['columns'].get(pk_columns[0], {}).get('data_type', '').lower() not in \
+            ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'):
+        problems.append(f"主键第一列 {pk_columns[0]} 不是整数类型，无法按范围分块")
+    if context['referenced_by']:
+        problems.append(f"表被外键引用（{', '.join(context['referenced_by'])}），切换后外键会指向备份表")
+    if summary['renames']:
+        problems.append("包含字段重命名，影子表无法按字段名对应复制数据")
+    if any(re.match(r"\s*RENAME\s+(TO\s+|AS\s+)?(?!COLUMN|INDEX|KEY)", clause, re.IGNORECASE)
+           for clause in clauses):
+        problems.append("包含重命名表操作")
+    return problems
+
+def format_schema_change_plan(database_name: str, table_name: str, plan: Dict[str, Any],
+                              context: Dict[str, Any]) -> List[str]:
+    """将结构变更规划格式化为文本行"""
+    summary = plan['summary']
+    size = context['data_length'] + context['index_length']
+    result = [f"📋 表结构变更规划 ({database_name}.{table_name}, {context['version']}):"]
+    result.append(f"📊 表大小: 数据 {format_file_size(context['data_length'])}, "
+                  f"索引 {format_file_size(context['index_length'])}, 约 {context['table_rows']} 行（估算）")
+    result.append("=" * 76)
+    for op in plan['operations']:
+        lock = "" if op['algorithm'] == 'INSTANT' else f", LOCK={op['lock']}"
+        rebuild = ", 重建表" if op['rebuild'] else ""
+        result.append(f"  • {op['description']}: ALGORITHM={op['algorithm']}{lock}{rebuild}")
+        result.append(f"      {op['clause']}")
+        if op['note']:
+            result.append(f"      💡 {op['note']}")
+    result.append("=" * 76)
+    lock_desc = {'NONE': "允许并发读写", 'SHARED': "期间阻塞写入，允许读取", 'EXCLUSIVE': "期间阻塞读写"}
+    result.append(f"🔧 整体算法: {summary['algorithm']}" +
+                  ("" if summary['algorithm'] == 'INSTANT' else f", LOCK={summary['lock']}（{lock_desc[summary['lock']]}）") +
+                  (", 需要重建表" if summary['rebuild'] else ""))
+    result.append(f"⏱️ 直接执行预计耗时: {format_duration(plan['seconds'])}（{plan['basis']}）")
+    if plan['seconds'] >= 1:
+        result.append(f"  • 耗时按表大小 {format_file_size(size)} 估算，实际可能是该值的 0.5～2 倍")
+    if summary['algorithm'] != 'INSTANT' and not plan['shadow_problems']:
+        result.append(f"⏱️ 影子表复制预计耗时: {format_duration(plan['shadow_seconds'])}（不含限流等待）")
+    if summary['algorithm'] != 'INSTANT':
+        result.append("💡 结束时仍需短暂获取元数据排他锁，长事务会阻塞变更以及之后的所有查询")
+
+    result.append("\n🚀 执行语句（显式指定算法，服务器不支持时直接报错而不会退化为复制表）:")
+    result.append(f"```sql\n{plan['sql']};\n```")
+    if plan['method'] == 'shadow' and not plan['shadow_problems']:
+        result.append("💡 推荐方式: shadow（影子表复制），变更需要重建表或阻塞写入且表较大，"
+                      "分块复制可按复制延迟和负载限流")
+    elif plan['method'] == 'shadow':
+        result.append("⚠️ 变更需要重建表或阻塞写入且表较大，但无法使用影子表复制:")
+        result.extend(f"  • {problem}" for problem in plan['shadow_problems'])
+        result.append("💡 请在低峰期使用 method=\"direct\" 执行")
+    else:
+        result.append("💡 推荐方式: direct（直接执行 ALTER）")
+    return result
+
+@mcp.tool()
+@engine.offload()
+def plan_schema_change(database_name: str, table_name: str, alter: str) -> str:
+    """
+    规划 ALTER TABLE 变更：按服务器版本判断每个操作能否 INSTANT / INPLACE 执行、是否重建表、
+    是否阻塞写入，并按表大小估算耗时、推荐直接执行或影子表复制。在大表上修改结构之前使用，不会修改任何数据
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        alter: ALTER 语句或其中的操作部分，如 "ADD COLUMN age INT, ADD INDEX idx_age (age)"
+
+    Returns:
+        str: 变更规划报告
+    """
+    try:
+        context = load_schema_change_context(database_name, table_name)
+        if context is None:
+            return f"❌ 表结构变更规划失败: 表 {database_name}.{table_name} 不存在"
+        try:
+            plan = plan_alter(table_name, alter, context)
+        except ValueError as e:
+            return f"❌ 表结构变更规划失败: {e}"
+
+        logger.info(f"成功规划表结构变更: {database_name}.{table_name}, 算法 {plan['summary']['algorithm']}")
+        return "\n".join(format_schema_change_plan(database_name, table_name, plan, context))
+
+    except Exception as e:
+        logger.error(f"表结构变更规划失败: {e}")
+        return format_error_message(e, "表结构变更规划")
+
+@mcp.tool()
+async def apply_schema_change(database_name: str, table_name: str, alter: str, method: str = "auto",
+                              chunk_size: int = 1000, max_lag_seconds: float = 5, max_threads_running: int = 25,
+                              keep_old_table: bool = True, ctx: Context = None) -> str:
+    """
+    执行 ALTER TABLE 变更。auto 模式先规划：INSTANT 或不阻塞写入的小表变更直接执行（显式指定算法）；
+    大表上需要重建或阻塞写入的变更使用影子表复制：建立新结构的影子表，触发器同步增量修改，
+    按主键分块复制并根据复制延迟和服务器负载限流，最后原子切换。执行前建议先使用 plan_schema_change 查看规划
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        alter: ALTER 语句或其中的操作部分
+        method: 执行方式: auto（默认，按规划选择）、direct（直接 ALTER）、shadow（影子表复制）
+        chunk_size: 影子表复制的初始块大小（行），之后按每块耗时自动调整
+        max_lag_seconds: 影子表复制时允许的最大复制延迟（秒），超过时暂停复制
+        max_threads_running: 影子表复制时允许的最大 Threads_running，超过时暂停复制
+        keep_old_table: 影子表复制完成后是否保留原表（重命名为 _表名_old），默认true
+
+    Returns:
+        str: 执行方式、耗时以及影子表复制的统计
+    """
+    try:
+        if method not in SCHEMA_CHANGE_METHODS:
+            return f"❌ 表结构变更失败: 不支持的执行方式 '{method}'，可选值: {', '.join(SCHEMA_CHANGE_METHODS)}"
+        context = await engine.run(load_schema_change_context, database_name, table_name)
+        if context is None:
+            return f"❌ 表结构变更失败: 表 {database_name}.{table_name} 不存在"
+        try:
+            plan = plan_alter(table_name, alter, context)
+        except ValueError as e:
+            return f"❌ 表结构变更失败: {e}"
+        summary = plan['summary']
+
+        if method == "auto":
+            if plan['method'] == 'shadow' and plan['shadow_problems']:
+                return "\n".join(
+                    [f"❌ 表结构变更未执行: 变更需要 ALGORITHM={summary['algorithm']}, LOCK={summary['lock']}"
+                     f"{'（重建表）' if summary['rebuild'] else ''}，表较大且无法使用影子表复制:"]
+                    + [f"  • {problem}" for problem in plan['shadow_problems']]
+                    + [f"⏱️ 直接执行预计耗时: {format_duration(plan['seconds'])}",
+                       "💡 确认可以接受后使用 method=\"direct\" 执行"]
+                )
+            method = plan['method']
+        if method == "shadow" and plan['shadow_problems']:
+            return "\n".join(["❌ 表结构变更失败: 无法使用影子表复制:"]
+                             + [f"  • {problem}" for problem in plan['shadow_problems']])
+
+        start = time.perf_counter()
+        if method == "direct":
+            def run_direct() -> None:
+                with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+                    cursor.execute(plan['sql'])
+
+            try:
+                await engine.run(run_direct, timeout=SCHEMA_CHANGE_CONFIG['timeout'])
+            finally:
+                schema_cache.invalidate(database_name, table_name)
+                result_cache.invalidate(database_name)
+            elapsed = time.perf_counter() - start
+            logger.info(f"成功执行表结构变更: {database_name}.{table_name}, 耗时 {elapsed:.2f}s")
+            return "\n".join([
+                f"✅ 成功变更表 {database_name}.{table_name} (方式: direct, ALGORITHM={summary['algorithm']}"
+                + ("" if summary['algorithm'] == 'INSTANT' else f", LOCK={summary['lock']}") + ")",
+                f"  • 执行语句: {plan['sql']}",
+                f"⏱️ 耗时 {elapsed:.2f}s（预计 {format_duration(plan['seconds'])}）",
+            ])
+
+        loop = asyncio.get_running_loop()
+
+        def progress(fraction: float, stats: Dict[str, Any]) -> None:
+            if ctx is not None:
+                asyncio.run_coroutine_threadsafe(ctx.report_progress(round(fraction * 100, 1), 100), loop)
+
+        options = ShadowCopyOptions(chunk_size=chunk_size, max_lag=max_lag_seconds,
+                                    max_threads_running=max_threads_running, keep_old_table=keep_old_table)
+        replica_hosts = SCHEMA_CHANGE_CONFIG['replica_hosts']
+        lag_sources = [lambda address=address: replica_connection(MYSQL_CONFIG, address)
+                       for address in replica_hosts]
+        if not replica_hosts:
+            logger.warning(f"影子表复制 {database_name}.{table_name}: 未配置 MYSQL_OSC_REPLICA_HOSTS，不检查副本复制延迟")
+        # 整个复制过程使用同一个连接，触发器、分块复制和 RENAME 都在该连接上执行
+        try:
+            stats = await engine.run(run_shadow_copy, lambda: get_mysql_connection(database_name), table_name,
+                                     plan['clauses'], context['pk_columns'], options, lag_sources, progress,
+                                     check_cancelled, timeout=SCHEMA_CHANGE_CONFIG['timeout'])
+        finally:
+            schema_cache.invalidate(database_name)
+            result_cache.invalidate(database_name)
+
+        result = [f"✅ 成功变更表 {database_name}.{table_name} (方式: shadow 影子表复制)"]
+        result.append(f"  • 复制行数: {stats['rows']}, 分块: {stats['chunks']} 个")
+        if replica_hosts:
+            result.append(f"  • 监控副本复制延迟: {', '.join(replica_hosts)}")
+        else:
+            result.append("  ⚠️ 未配置 MYSQL_OSC_REPLICA_HOSTS，复制期间没有监控任何副本的复制延迟，"
+                          "只按本机复制延迟和 Threads_running 限流")
+        if stats['throttled']:
+            result.append(f"  • 限流暂停 {stats['throttled']} 次，共 {stats['throttle_time']:.1f}s"
+                          f"（复制延迟超过 {max_lag_seconds:g}s 或 Threads_running 超过 {max_threads_running}）")
+        if stats['old_table']:
+            result.append(f"  • 原表已保留为 {stats['old_table']}，确认无误后可手动删除")
+        result.append(f"⏱️ 耗时 {stats['elapsed']:.2f}s（预计 {format_duration(plan['shadow_seconds'])}）")
+        logger.info(f"成功通过影子表变更 {database_name}.{table_name}: {stats['rows']} 行, {stats['elapsed']:.2f}s")
+        return "\n".join(result)
+
+    except QueryTimeoutError as e:
+        logger.error(f"表结构变更超时: {e}")
+        return f"❌ 表结构变更失败: 操作超时 ({e})，已终止服务端查询；影子表复制在切换前中断时原表保持不变"
+    except Exception as e:
+        logger.error(f"表结构变更失败: {e}")
+        return format_error_message(e, "表结构变更")
+
+@mcp.tool()
+def show_pool_stats() -> str:
+    """
+    显示MySQL连接池的运行指标，包括连接数、复用次数、等待时间等
+
+    Returns:
+        str: 连接池状态信息
+    """
+    return format_pool_stats(pool_manager.stats())
+
+@mcp.tool()
+def show_cache_stats() -> str:
+    """
+    显示服务器缓存的命中率等统计信息
+
+    Returns:
+        str: 缓存统计信息
+    """
+    return "\n".join([
+        format_schema_cache_stats(schema_cache.stats()),
+        format_result_cache_stats(result_cache.stats()),
+    ])
+
 if __name__ == "__main__":
     # 启动MCP服务器
     mcp.run()
@@ -0,0 +1,243 @@
+"""
+查询计划解析
+
+解析 MySQL EXPLAIN FORMAT=JSON 的输出，提取每个表的访问方式、扫描行数、使用的索引，
+以及文件排序、临时表等标志，识别全表扫描并根据过滤条件推荐候选索引。
+
+本模块只依赖标准库，便于单独测试。
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# 访问类型说明，按效率从低到高
+ACCESS_TYPES = {
+    'ALL': "全表扫描",
+    'index': "全索引扫描",
+    'range': "索引范围扫描",
+    'index_merge': "索引合并",
+    'ref_or_null': "索引查找(含NULL)",
+    'fulltext': "全文索引",
+    'ref': "非唯一索引查找",
+    'eq_ref': "唯一索引关联",
+    'const': "常量查找",
+    'system': "系统表",
+}
+
+# 需要重点关注的访问类型
+SCAN_ACCESS_TYPES = ('ALL', 'index')
+
+# 条件中 `库`.`表`.`字段` 或 `表`.`字段` 后跟比较运算符的模式
+_CONDITION_PATTERN = re.compile(
+    r"(?:`[^`]+`\.)?`(?P<table>[^`]+)`\.`(?P<column>[^`]+)`\s*"
+    r"(?P<op><=>|>=|<=|<>|!=|=|>|<|\bbetween\b|\bin\b|\blike\b|\bis\b)",
+    re.IGNORECASE
+)
+
+
+# SQL词法单元：注释、字符串、反引号标识符、括号、单词，其余字符逐个跳过
+_SQL_TOKEN_PATTERN = re.compile(
+    r"(?P<skip>--[^\n]*|#[^\n]*|/\*.*?\*/|'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`(?:[^`]|``)*`)"
+    r"|(?P<paren>[()])|(?P<word>[A-Za-z_][A-Za-z0-9_$]*)|(?P<semicolon>;)",
+    re.DOTALL
+)
+
+# 可以作为主语句开头的关键字
+_STATEMENT_KEYWORDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'TABLE', 'VALUES')
+
+
+def _top_level_words(sql: str) -> Optional[List[str]]:
+    """返回不在括号、字符串和注释中的单词（大写）；包含多条语句时返回None"""
+    words = []
+    depth = 0
+    for match in _SQL_TOKEN_PATTERN.finditer(sql):
+        if match.group('paren'):
+            depth += 1 if match.group('paren') == '(' else -1
+        elif match.group('semicolon'):
+            return None
+        elif match.group('word') and depth == 0:
+            words.append(match.group('word').upper())
+    return words
+
+
+def main_statement_keyword(sql: str) -> str:
+    """
+    返回语句的主语句关键字，WITH 开头的语句跳过公用表表达式取其后的主语句，
+    如 "WITH t AS (SELECT ...) DELETE ..." 返回 DELETE；无法识别时返回空字符串
+    """
+    words = _top_level_words(sql)
+    if not words:
+        return ""
+    if words[0] != 'WITH':
+        return words[0]
+    # 公用表表达式的定义都在括号中，顶层只有 名称 [AS] 和逗号，第一个语句关键字即为主语句
+    for word in words[1:]:
+        if word in _STATEMENT_KEYWORDS:
+            return word
+    return ""
+
+
+def is_read_only_select(sql: str) -> bool:
+    """是否为只读查询：主语句为 SELECT（含 WITH ... SELECT），且不包含 INTO 写文件或变量、不含多条语句"""
+    words = _top_level_words(sql)
+    return bool(words) and main_statement_keyword(sql) == 'SELECT' and 'INTO' not in words
+
+
+def _to_int(value: Any) -> int:
+    """EXPLAIN JSON中的数值可能是字符串，统一转为整数"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def walk_plan(node: Any, tables: List[Dict[str, Any]], flags: Dict[str, bool]) -> None:
+    """递归遍历计划树，收集表访问信息和排序/临时表标志"""
+    if isinstance(node, list):
+        for item in node:
+            walk_plan(item, tables, flags)
+        return
+    if not isinstance(node, dict):
+        return
+
+    if node.get('using_filesort'):
+        flags['filesort'] = True
+    if node.get('using_temporary_table'):
+        flags['temporary'] = True
+
+    for key, value in node.items():
+        if key == 'table' and isinstance(value, dict) and 'table_name' in value:
+            tables.append({
+                'table': value.get('table_name'),
+                'access_type': value.get('access_type', ''),
+                'key': value.get('key'),
+                'possible_keys': value.get('possible_keys') or [],
+                'used_key_parts': value.get('used_key_parts') or [],
+                'rows_examined': _to_int(value.get('rows_examined_per_scan')),
+                'rows_produced': _to_int(value.get('rows_produced_per_join')),
+                'filtered': float(value.get('filtered') or 100),
+                'using_index': bool(value.get('using_index')),
+                'condition': value.get('attached_condition', ''),
+            })
+        walk_plan(value, tables, flags)
+
+
+def parse_explain_json(plan_json: str) -> Tuple[List[Dict[str, Any]], Dict[str, bool], Optional[float]]:
+    """
+    解析 EXPLAIN FORMAT=JSON 的输出
+
+    Returns:
+        Tuple: (表访问信息列表, {'filesort', 'temporary'} 标志, 查询总成本)
+    """
+    plan = json.loads(plan_json)
+    tables: List[Dict[str, Any]] = []
+    flags = {'filesort': False, 'temporary': False}
+    walk_plan(plan, tables, flags)
+
+    cost = None
+    query_block = plan.get('query_block', {}) if isinstance(plan, dict) else {}
+    cost_info = query_block.get('cost_info', {})
+    if 'query_cost' in cost_info:
+        cost = float(cost_info['query_cost'])
+    return tables, flags, cost
+
+
+def extract_condition_columns(condition: str, table_name: str) -> Tuple[List[str], List[str]]:
+    """
+    从 attached_condition 中提取指定表的过滤字段
+
+    Returns:
+        Tuple[List[str], List[str]]: (等值条件字段, 范围条件字段)，按出现顺序去重
+    """
+    equality: Dict[str, None] = {}
+    ranges: Dict[str, None] = {}
+    for match in _CONDITION_PATTERN.finditer(condition or ''):
+        if match.group('table') != table_name:
+            continue
+        column = match.group('column')
+        op = match.group('op').lower()
+        if op in ('=', '<=>', 'in', 'is'):
+            equality[column] = None
+        else:
+            ranges[column] = None
+    ranges = {col: None for col in ranges if col not in equality}
+    return list(equality), list(ranges)
+
+
+def suggest_index(table_name: str, condition: str) -> Optional[str]:
+    """
+    根据过滤条件推荐候选索引：等值字段在前，最多一个范围字段在后
+
+    Returns:
+        Optional[str]: CREATE INDEX 语句，无法推荐时返回None
+    """
+    equality, ranges = extract_condition_columns(condition, table_name)
+    columns = equality[:3] + ranges[:1]
+    if not columns:
+        return None
+    index_name = "idx_" + "_".join(columns)
+    index_name = index_name[:64]
+    column_sql = ", ".join(f"`{col}`" for col in columns)
+    return f"CREATE INDEX `{index_name}` ON `{table_name}` ({column_sql});"
+
+
+def analyze_plan(tables: List[Dict[str, Any]], flags: Dict[str, bool],
+                 full_scan_threshold: int) -> Tuple[List[str], List[str]]:
+    """
+    根据计划识别问题并推荐索引
+
+    Args:
+        tables: parse_explain_json 返回的表访问信息
+        flags: 文件排序/临时表标志
+        full_scan_threshold: 超过该行数的全表/全索引扫描视为问题
+
+    Returns:
+        Tuple[List[str], List[str]]: (问题列表, 候选索引DDL列表)
+    """
+    warnings = []
+    suggestions: Dict[str, None] = {}
+    for table in tables:
+        access_type = table['access_type']
+        rows = table['rows_examined']
+        if access_type in SCAN_ACCESS_TYPES and rows >= full_scan_threshold:
+            warnings.append(f"❌ 表 {table['table']} {ACCESS_TYPES.get(access_type, access_type)}，"
+                            f"预计扫描 {rows} 行 (阈值 {full_scan_threshold})")
+            ddl = suggest_index(table['table'], table['condition'])
+            if ddl:
+                suggestions[ddl] = None
+        elif table['filtered'] < 10 and rows >= full_scan_threshold:
+            warnings.append(f"⚠️ 表 {table['table']} 扫描 {rows} 行但只有 {table['filtered']:.1f}% 满足条件，"
+                            f"索引选择性较差")
+            ddl = suggest_index(table['table'], table['condition'])
+            if ddl:
+                suggestions[ddl] = None
+        if table['possible_keys'] and not table['key']:
+            warnings.append(f"⚠️ 表 {table['table']} 有可用索引 {', '.join(table['possible_keys'])} 但优化器未使用")
+
+    if flags.get('filesort'):
+        warnings.append("⚠️ 使用了文件排序(filesort)，考虑为 ORDER BY 字段建立索引")
+    if flags.get('temporary'):
+        warnings.append("⚠️ 使用了临时表，考虑为 GROUP BY / DISTINCT 字段建立索引")
+    return warnings, list(suggestions)
+
+
+def is_full_scan_over(tables: List[Dict[str, Any]], threshold: int) -> Optional[Dict[str, Any]]:
+    """返回第一个超过阈值的全表扫描，用于执行写操作前的拦截检查"""
+    for table in tables:
+        if table['access_type'] == 'ALL' and table['rows_examined'] >= threshold:
+            return table
+    return None
+
+
+def format_plan_tables(tables: List[Dict[str, Any]]) -> List[str]:
+    """将表访问信息格式化为对齐的文本行"""
+    lines = [f"{'表':<20} {'访问类型':<12} {'使用索引':<20} {'扫描行数':>10} {'过滤率':>8}"]
+    lines.append("-" * 76)
+    for table in tables:
+        key = table['key'] or "-"
+        if table['using_index']:
+            key += " (覆盖)"
+        lines.append(f"{table['table']:<20} {table['access_type']:<12} {key:<20} "
+                     f"{table['rows_examined']:>10} {table['filtered']:>7.1f}%")
+    return lines
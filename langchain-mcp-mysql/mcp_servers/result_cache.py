@@ -0,0 +1,173 @@
+"""
+只读查询结果缓存
+
+客户端的 ReAct 循环每轮都会重新规划，同一次对话中经常重复调用 query_data、show_databases、
+show_tables、show_create_table。本模块提供进程级的查询结果缓存：
+- 按 (数据库, 规范化后的SQL, 参数) 缓存查询结果行，相同语义的调用直接命中，无需借用连接
+- 条目数量有上限，按LRU淘汰；每个条目有TTL，过期后重新查询
+- 每个条目记录依赖的表，本服务器的写操作（插入、更新、删除、批量操作、导入）按表失效，DDL按数据库失效
+- 工具可通过 use_cache=false 跳过缓存并用最新结果刷新缓存
+- 统计命中、未命中、过期、淘汰、失效和跳过次数
+
+缓存只能感知本进程内的写操作，其他客户端的修改最多在TTL之后可见。
+缓存参数可通过环境变量配置：MYSQL_RESULT_CACHE_SIZE（条目数，0表示关闭）、
+MYSQL_RESULT_CACHE_TTL（秒）、MYSQL_RESULT_CACHE_MAX_ROWS（超过该行数的结果不缓存）
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 结果缓存配置 - 从环境变量获取
+RESULT_CACHE_CONFIG = {
+    'size': int(os.getenv('MYSQL_RESULT_CACHE_SIZE', '256')),
+    'ttl': float(os.getenv('MYSQL_RESULT_CACHE_TTL', '30')),
+    'max_rows': int(os.getenv('MYSQL_RESULT_CACHE_MAX_ROWS', '1000')),
+}
+
+# 引号内的字面量和标识符，规范化时保持原样
+_QUOTED_PATTERN = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+
+# 缓存键: (数据库名称或None, 规范化后的SQL, 参数)
+ResultKey = Tuple[Optional[str], str, str]
+
+
+def normalize_sql(sql: str) -> str:
+    """规范化SQL文本：合并引号外的空白、去掉末尾分号，引号内的内容保持不变"""
+    parts = _QUOTED_PATTERN.split(sql.strip().rstrip(';').strip())
+    return "".join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts))
+
+
+def make_key(database_name: Optional[str], sql: str, params: Sequence[Any] = ()) -> ResultKey:
+    """生成缓存键，参数按 repr 序列化，区分 1 与 '1'"""
+    return database_name, normalize_sql(sql), repr(tuple(params))
+
+
+class _ResultEntry:
+    """缓存条目：结果、依赖的表以及写入时间"""
+
+    __slots__ = ('value', 'tables', 'created_at')
+
+    def __init__(self, value: Any, tables: frozenset):
+        self.value = value
+        self.tables = tables
+        self.created_at = time.monotonic()
+
+
+class ResultCache:
+    """进程级查询结果LRU缓存，线程安全"""
+
+    def __init__(self, size: int = 256, ttl: float = 30.0, max_rows: int = 1000):
+        self.size = size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[ResultKey, _ResultEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次失效递增，查询期间发生过失效的结果不写入缓存，避免写回旧数据
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0,
+                       'invalidations': 0, 'bypasses': 0, 'oversized': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self.ttl > 0
+
+    def get(self, key: ResultKey, tables: Iterable[str], load: Callable[[], Tuple[Any, int]],
+            use_cache: bool = True) -> Any:
+        """
+        读取缓存，未命中、过期或跳过缓存时调用 load 查询
+
+        Args:
+            key: make_key 生成的缓存键
+            tables: 结果依赖的表，为空表示数据库级结果（如表列表），只在DDL时失效
+            load: 执行查询，返回 (结果, 行数)，行数用于判断结果是否过大
+            use_cache: 为False时跳过缓存直接查询，并用新结果刷新缓存
+        """
+        if not self.enabled:
+            return load()[0]
+
+        with self._lock:
+            if not use_cache:
+                self._stats['bypasses'] += 1
+            else:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if time.monotonic() - entry.created_at < self.ttl:
+                        self._entries.move_to_end(key)
+                        self._stats['hits'] += 1
+                        return entry.value
+                    del self._entries[key]
+                    self._stats['expired'] += 1
+                self._stats['misses'] += 1
+            generation = self._generation
+
+        value, row_count = load()
+
+        with self._lock:
+            if row_count > self.max_rows:
+                self._stats['oversized'] += 1
+                self._entries.pop(key, None)
+            elif generation == self._generation:
+                self._entries[key] = _ResultEntry(value, frozenset(tables))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return value
+
+    def invalidate(self, database_name: Optional[str] = None, tables: Iterable[str] = ()) -> None:
+        """
+        使缓存失效
+
+        指定表时失效依赖这些表的条目（数据写入）；只指定数据库时失效该数据库的所有条目以及
+        服务器级条目（如数据库列表，用于DDL）；都未指定时清空缓存。
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            self._generation += 1
+            if database_name is None:
+                stale = list(self._entries)
+            elif tables:
+                stale = [key for key, entry in self._entries.items()
+                         if key[0] == database_name and entry.tables & tables]
+            else:
+                stale = [key for key in self._entries if key[0] in (database_name, None)]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存指标快照"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats.update(size=self.size, ttl=self.ttl, max_rows=self.max_rows, enabled=self.enabled)
+        return stats
+
+
+# 进程级共享的查询结果缓存
+result_cache = ResultCache(**RESULT_CACHE_CONFIG)
+
+
+def format_result_cache_stats(stats: Dict[str, Any]) -> str:
+    """将结果缓存指标格式化为可读文本"""
+    if not stats['enabled']:
+        return "🧮 查询结果缓存: 已关闭 (MYSQL_RESULT_CACHE_SIZE 或 MYSQL_RESULT_CACHE_TTL 为0)"
+    return "\n".join([
+        "🧮 查询结果缓存:",
+        f"  • 缓存条目: {stats['entries']}/{stats['size']}, TTL: {stats['ttl']:g}s, 单个结果最多缓存 {stats['max_rows']} 行",
+        f"  • 命中: {stats['hits']}, 未命中: {stats['misses']} (其中过期 {stats['expired']}), "
+        f"命中率: {stats['hit_rate']:.1%}",
+        f"  • 淘汰: {stats['evictions']}, 失效次数: {stats['invalidations']}, "
+        f"跳过缓存: {stats['bypasses']}, 结果过大未缓存: {stats['oversized']}",
+    ])
@@ -0,0 +1,116 @@
+"""
+MCP工具结果编码
+
+查询结果需要由大模型阅读，输出越长，消耗的token和时间越多。本模块为工具结果提供多种输出格式：
+- text: 带图标和对齐的可读文本（默认，兼容原有输出）
+- json-compact: 紧凑JSON对象数组，无缩进和多余空格
+- columnar: 列式编码，字段名只输出一次，每行为一个数组
+- csv: CSV文本，首行为字段名
+
+本模块只依赖标准库，便于在基准测试中单独使用。
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+# 支持的输出格式
+OUTPUT_FORMATS = ("text", "json-compact", "columnar", "csv")
+
+
+def check_output_format(output_format: str) -> Optional[str]:
+    """校验输出格式，不支持时返回错误消息"""
+    if output_format not in OUTPUT_FORMATS:
+        return f"❌ 不支持的输出格式 '{output_format}'，可选值: {', '.join(OUTPUT_FORMATS)}"
+    return None
+
+
+def _compact_json(value: Any) -> str:
+    """无多余空白的JSON编码，日期、Decimal等类型转为字符串"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def encode_rows(columns: Sequence[str], rows: Sequence[Sequence[Any]], output_format: str) -> str:
+    """
+    将结果集编码为 json-compact、columnar 或 csv 格式
+
+    Args:
+        columns: 字段名列表
+        rows: 行数据，每行为与 columns 顺序一致的序列
+        output_format: json-compact | columnar | csv
+
+    Returns:
+        str: 编码后的结果
+    """
+    if output_format == "json-compact":
+        return _compact_json([dict(zip(columns, row)) for row in rows])
+    if output_format == "columnar":
+        return _compact_json({"columns": list(columns), "rows": [list(row) for row in rows]})
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(['' if value is None else value for value in row] for row in rows)
+        return buffer.getvalue().rstrip('\n')
+    raise ValueError(f"不支持的输出格式: {output_format}")
+
+
+def render_query_text(table_name: str, rows: List[Dict[str, Any]]) -> str:
+    """query_data 的文本格式：逐行输出缩进的JSON"""
+    if not rows:
+        return f"📋 查询完成，表 {table_name} 中没有符合条件的数据"
+
+    lines = [f"📋 查询结果 (共 {len(rows)} 行):\n"]
+    for i, row in enumerate(rows, 1):
+        lines.append(f"第 {i} 行: {json.dumps(row, ensure_ascii=False, indent=2, default=str)}")
+    return "\n".join(lines)
+
+
+def render_columns_text(database_name: str, table_name: str, columns: Sequence[Sequence[Any]]) -> str:
+    """describe_table 的文本格式：对齐的字段信息表"""
+    if not columns:
+        return f"📋 表 {table_name} 不存在或没有字段"
+
+    lines = [f"📋 表 {database_name}.{table_name} 的结构信息:"]
+    lines.append("=" * 80)
+    lines.append(f"{'字段名':<20} {'数据类型':<20} {'允许NULL':<10} {'键':<10} {'默认值':<15} {'额外信息'}")
+    lines.append("-" * 80)
+
+    for column in columns:
+        field = column[0]
+        type_info = column[1]
+        null_info = column[2]
+        key_info = column[3] if column[3] else ""
+        default_value = str(column[4]) if column[4] is not None else "NULL"
+        extra_info = column[5] if column[5] else ""
+
+        lines.append(f"{field:<20} {type_info:<20} {null_info:<10} {key_info:<10} {default_value:<15} {extra_info}")
+
+    lines.append("=" * 80)
+    lines.append(f"📊 共 {len(columns)} 个字段")
+    return "\n".join(lines)
+
+
+def render_indexes_text(database_name: str, table_name: str, indexes: Sequence[Sequence[Any]]) -> str:
+    """show_table_indexes 的文本格式：对齐的索引信息表"""
+    if not indexes:
+        return f"📋 表 {database_name}.{table_name} 没有索引"
+
+    lines = [f"📋 表 {database_name}.{table_name} 的索引信息:"]
+    lines.append("=" * 100)
+    lines.append(f"{'索引名':<20} {'字段名':<20} {'唯一性':<10} {'索引类型':<15} {'注释'}")
+    lines.append("-" * 100)
+
+    for index in indexes:
+        key_name = index[2]
+        column_name = index[4]
+        non_unique = "否" if index[1] == 0 else "是"
+        index_type = index[10] if len(index) > 10 else ""
+        comment = index[11] if len(index) > 11 and index[11] else ""
+
+        lines.append(f"{key_name:<20} {column_name:<20} {non_unique:<10} {index_type:<15} {comment}")
+
+    lines.append("=" * 100)
+    lines.append(f"📊 共 {len(indexes)} 个索引项")
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""
+表结构元数据缓存
+
+describe_table、show_table_indexes、show_create_table 等工具每次都会重新查询MySQL，
+而客户端提示词要求在每次增删改前先查看表结构。本模块提供进程级的元数据缓存：
+- 按 (数据库, 表, 类别) 缓存，TTL 内直接命中，无需借用连接
+- TTL 过期后通过 information_schema.TABLES 的 CREATE_TIME/UPDATE_TIME 校验，未变化则续期
+- 服务器自身的 DDL 工具执行后主动失效
+- 统计命中、未命中、校验续期和失效次数
+
+缓存时间可通过环境变量 MYSQL_SCHEMA_CACHE_TTL 配置（秒，0表示每次都校验）。
+注意：MySQL 8.0 的 information_schema 统计信息默认有缓存（information_schema_stats_expiry），
+外部DDL可能需要等到统计刷新后才能被校验发现，服务器自身的DDL不受影响。
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple
+
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 缓存键: (数据库名称, 表名称或None, 类别)
+CacheKey = Tuple[str, Optional[str], str]
+
+
+class _CacheEntry:
+    """缓存条目：值、版本以及最近一次校验时间"""
+
+    __slots__ = ('value', 'version', 'checked_at')
+
+    def __init__(self, value: Any, version: Any):
+        self.value = value
+        self.version = version
+        self.checked_at = time.monotonic()
+
+
+def table_version(connection: pymysql.Connection, database_name: str, table_name: str) -> Any:
+    """表的版本标识：建表时间和最近更新时间"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CREATE_TIME, UPDATE_TIME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+            (database_name, table_name)
+        )
+        return cursor.fetchone()
+
+
+def database_version(connection: pymysql.Connection, database_name: str) -> Any:
+    """数据库的版本标识：表数量和最近的建表时间，表的增删都会使其变化"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*), MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+            (database_name,)
+        )
+        return cursor.fetchone()
+
+
+class SchemaCache:
+    """进程级表结构元数据缓存，线程安全"""
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._entries: Dict[CacheKey, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'invalidations': 0}
+
+    def get(self, key: CacheKey, connect: Callable[[], ContextManager],
+            load: Callable[[pymysql.Connection], Any],
+            version: Optional[Callable[[pymysql.Connection], Any]] = None) -> Any:
+        """
+        读取缓存，未命中或校验失败时重新加载
+
+        Args:
+            key: 缓存键 (数据库, 表, 类别)
+            connect: 返回连接上下文管理器的函数，仅在需要访问数据库时调用
+            load: 使用连接加载元数据
+            version: 使用连接读取版本标识，为None时TTL过期即重新加载
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.checked_at < self.ttl:
+                self._stats['hits'] += 1
+                return entry.value
+
+        with connect() as connection:
+            current_version = version(connection) if version is not None else None
+            if entry is not None and current_version is not None and current_version == entry.version:
+                with self._lock:
+                    entry.checked_at = time.monotonic()
+                    self._stats['revalidated'] += 1
+                    self._stats['hits'] += 1
+                return entry.value
+
+            value = load(connection)
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, current_version)
+            self._stats['misses'] += 1
+        return value
+
+    def invalidate(self, database_name: str, table_name: Optional[str] = None) -> None:
+        """
+        使缓存失效
+
+        指定表时失效该表的所有条目及数据库级条目（如表列表）；未指定表时失效整个数据库。
+        """
+        with self._lock:
+            stale = [key for key in self._entries
+                     if key[0] == database_name and (table_name is None or key[1] in (table_name, None))]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存指标快照"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# 进程级共享的表结构缓存，同一进程中的所有MCP服务器共用
+schema_cache = SchemaCache(ttl=float(os.getenv('MYSQL_SCHEMA_CACHE_TTL', '60')))
+
+
+def format_schema_cache_stats(stats: Dict[str, Any]) -> str:
+    """将缓存指标格式化为可读文本"""
+    return "\n".join([
+        "🗂️ 表结构缓存:",
+        f"  • 缓存条目: {stats['entries']}",
+        f"  • 命中: {stats['hits']} (其中校验续期 {stats['revalidated']}), 未命中: {stats['misses']}, "
+        f"命中率: {stats['hit_rate']:.1%}",
+        f"  • 失效次数: {stats['invalidations']}",
+    ])
@@ -0,0 +1,599 @@
+"""
+在线表结构变更规划与影子表复制
+
+分析工具给出的加索引、改类型等建议没有安全的执行途径：大表上直接 ALTER 可能重建整张表、
+长时间持有锁或阻塞复制。本模块提供：
+- 规划：将 ALTER 拆分为单个操作，按服务器版本判断每个操作可用的算法（INSTANT / INPLACE / COPY）、
+  是否重建表以及并发DML的锁级别，并根据表的数据大小估算耗时
+- 影子表复制：建立结构变更后的影子表，通过触发器同步增量修改，按主键分块复制存量数据，
+  每块之间根据复制延迟和 Threads_running 限流，最后原子地 RENAME 切换
+
+算法判断依据 MySQL 8.0 / 5.7 与 MariaDB 10.3+ 的在线DDL文档，无法确定的操作按 COPY 处理。
+耗时估算使用的吞吐量可通过环境变量配置：MYSQL_DDL_REBUILD_MBPS（INPLACE 重建）、
+MYSQL_DDL_COPY_MBPS（COPY 及影子表复制）、MYSQL_DDL_INDEX_MBPS（创建二级索引时的扫描）。
+
+本模块只依赖标准库和 pymysql，便于单独测试。
+"""
+
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 结构变更默认配置 - 从环境变量获取
+SCHEMA_CHANGE_CONFIG = {
+    'rebuild_mbps': float(os.getenv('MYSQL_DDL_REBUILD_MBPS', '50')),
+    'copy_mbps': float(os.getenv('MYSQL_DDL_COPY_MBPS', '20')),
+    'index_mbps': float(os.getenv('MYSQL_DDL_INDEX_MBPS', '100')),
+    # 超过该大小（MB）且需要重建或阻塞写入的变更建议使用影子表复制
+    'shadow_threshold_mb': float(os.getenv('MYSQL_DDL_SHADOW_THRESHOLD_MB', '1024')),
+    # 影子表复制时额外检查复制延迟的副本，逗号分隔的 host:port
+    'replica_hosts': [host.strip() for host in os.getenv('MYSQL_OSC_REPLICA_HOSTS', '').split(',') if host.strip()],
+    'timeout': float(os.getenv('MYSQL_SCHEMA_CHANGE_TIMEOUT', '0')),
+}
+
+# 算法和锁按代价从低到高排序
+ALGORITHMS = ('INSTANT', 'INPLACE', 'COPY')
+LOCKS = ('NONE', 'SHARED', 'EXCLUSIVE')
+
+# 各版本开始支持的 INSTANT 操作
+_MYSQL_INSTANT = {
+    'add_column': (8, 0, 12),
+    'add_column_any_position': (8, 0, 29),
+    'drop_column': (8, 0, 29),
+    'rename_column': (8, 0, 28),
+    'column_default': (8, 0, 0),
+    'rename_table': (8, 0, 0),
+}
+_MARIADB_INSTANT = {
+    'add_column': (10, 3, 2),
+    'add_column_any_position': (10, 4, 0),
+    'drop_column': (10, 4, 0),
+    'rename_column': (10, 5, 2),
+    'column_default': (10, 3, 2),
+    'rename_table': (10, 3, 0),
+}
+
+# 可变长度字段的长度前缀字节数变化会导致重建，按 utf8mb4 每字符4字节计算
+_CHAR_BYTES = 4
+
+
+class ServerVersion:
+    """MySQL / MariaDB 服务器版本"""
+
+    def __init__(self, version: str):
+        self.text = version
+        self.mariadb = 'mariadb' in version.lower()
+        # MariaDB 通过旧协议连接时版本号形如 5.5.5-10.11.2-MariaDB
+        numbers = re.findall(r'(\d+)\.(\d+)\.(\d+)', version)
+        if self.mariadb and len(numbers) > 1 and numbers[0] == ('5', '5', '5'):
+            numbers = numbers[1:]
+        self.number = tuple(int(part) for part in numbers[0]) if numbers else (0, 0, 0)
+
+    def supports_instant(self, operation: str) -> bool:
+        """是否支持指定的 INSTANT 操作"""
+        table = _MARIADB_INSTANT if self.mariadb else _MYSQL_INSTANT
+        return self.number >= table[operation]
+
+    def __str__(self) -> str:
+        return f"{'MariaDB' if self.mariadb else 'MySQL'} {'.'.join(map(str, self.number))}"
+
+
+def split_alter_clauses(alter: str, table_name: str) -> List[str]:
+    """
+    将 ALTER 语句拆分为逗号分隔的单个操作，忽略括号和引号内的逗号
+
+    支持完整的 "ALTER TABLE t ..." 语句或只有操作部分的 "ADD COLUMN ..."。
+
+    Raises:
+        ValueError: 包含多条语句、表名不一致或没有任何操作
+    """
+    text = alter.strip().rstrip(';').strip()
+    if ';' in text:
+        raise ValueError("只能包含一条 ALTER 语句")
+    match = re.match(r"ALTER\s+(?:ONLINE\s+|IGNORE\s+)?TABLE\s+(?:`?[\w$]+`?\s*\.\s*)?`?([\w$]+)`?\s+(.*)$",
+                     text, re.IGNORECASE | re.DOTALL)
+    if match:
+        if match.group(1) != table_name:
+            raise ValueError(f"ALTER 语句中的表 '{match.group(1)}' 与 table_name '{table_name}' 不一致")
+        text = match.group(2)
+
+    clauses = []
+    depth = 0
+    quote = None
+    current = []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"', '`'):
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            clauses.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    clauses.append("".join(current).strip())
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        raise ValueError("ALTER 语句中没有任何操作")
+    for clause in clauses:
+        if re.match(r"(ALGORITHM|LOCK)\s*=", clause, re.IGNORECASE):
+            raise ValueError("请不要在 alter 中指定 ALGORITHM / LOCK，规划器会根据分析结果添加")
+    return clauses
+
+
+def _operation(clause: str, description: str, algorithm: str, rebuild: bool, lock: str = 'NONE',
+               note: str = "", renames: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+    return {'clause': clause, 'description': description, 'algorithm': algorithm, 'rebuild': rebuild,
+            'lock': lock, 'note': note, 'renames': renames}
+
+
+def _base_type(column_type: str) -> Tuple[str, List[str]]:
+    """拆分字段类型为基础类型和参数，如 varchar(100) -> ('varchar', ['100'])"""
+    match = re.match(r"\s*([a-z]+)\s*(?:\((.*?)\))?", column_type.lower())
+    if not match:
+        return column_type.lower(), []
+    return match.group(1), [part.strip() for part in (match.group(2) or '').split(',') if part.strip()]
+
+
+def _length_prefix_bytes(length: int) -> int:
+    return 1 if length * _CHAR_BYTES <= 255 else 2
+
+
+def _classify_modify(clause: str, old_name: str, new_name: str, definition: str,
+                     columns: Dict[str, Dict[str, Any]], version: ServerVersion) -> Dict[str, Any]:
+    """判断 MODIFY / CHANGE COLUMN 的算法：只改名、扩展VARCHAR、追加枚举值可以不重建表，其余多为 COPY"""
+    current = columns.get(old_name)
+    renames = (old_name, new_name) if new_name != old_name else None
+    if current is None:
+        return _operation(clause, f"修改字段 {old_name}", 'COPY', True, 'SHARED', "表中不存在该字段，按 COPY 估算")
+
+    new_type = re.match(r"\s*([a-z]+\s*(?:\([^)]*\))?(?:\s+unsigned)?)", definition.lower())
+    new_type = new_type.group(1).strip() if new_type else ''
+    old_type = current['type'].lower()
+    old_base, old_args = _base_type(old_type)
+    new_base, new_args = _base_type(new_type)
+    nullable_now = current['nullable']
+    nullable_new = not re.search(r"\bNOT\s+NULL\b", definition, re.IGNORECASE)
+    description = f"{'重命名并' if renames else ''}修改字段 {old_name}{' -> ' + new_name if renames else ''}"
+
+    if re.sub(r'\s+', '', new_type) == re.sub(r'\s+', '', old_type):
+        if nullable_now != nullable_new:
+            return _operation(clause, description, 'INPLACE', True, 'NONE',
+                              "修改 NULL / NOT NULL 需要重建表", renames)
+        if renames and version.supports_instant('rename_column'):
+            return _operation(clause, description, 'INSTANT', False, 'NONE', "只修改字段名和属性", renames)
+        return _operation(clause, description, 'INPLACE', False, 'NONE', "只修改字段名、默认值或注释", renames)
+
+    if old_base == new_base == 'varchar' and old_args and new_args and nullable_now == nullable_new:
+        old_length, new_length = int(old_args[0]), int(new_args[0])
+        if new_length >= old_length and _length_prefix_bytes(old_length) == _length_prefix_bytes(new_length):
+            return _operation(clause, description, 'INPLACE', False, 'NONE',
+                              "扩展 VARCHAR 长度且长度前缀字节数不变，只修改元数据", renames)
+        return _operation(clause, description, 'COPY', True, 'SHARED',
+                          "VARCHAR 缩短或长度前缀字节数变化需要复制表", renames)
+
+    if old_base == new_base and old_base in ('enum', 'set') and new_args[:len(old_args)] == old_args \
+            and nullable_now == nullable_new:
+        return _operation(clause, description, 'INSTANT' if version.number >= (8, 0, 0) else 'INPLACE', False,
+                          'NONE', "在末尾追加枚举值，只修改元数据", renames)
+
+    return _operation(clause, description, 'COPY', True, 'SHARED', f"字段类型 {old_type} -> {new_type} 需要复制表",
+                      renames)
+
+
+def classify_clause(clause: str, version: ServerVersion, columns: Dict[str, Dict[str, Any]],
+                    has_fulltext: bool = False, row_format: str = "") -> Dict[str, Any]:
+    """
+    判断单个 ALTER 操作可用的最低代价算法
+
+    Args:
+        clause: 单个操作，如 "ADD COLUMN age INT"
+        version: 服务器版本
+        columns: 当前字段 -> {'type', 'nullable'}
+        has_fulltext: 表是否已有全文索引（有全文索引时不能使用 INSTANT）
+        row_format: 表的行格式，COMPRESSED 表不支持 INSTANT
+
+    Returns:
+        Dict: {'clause', 'description', 'algorithm', 'rebuild', 'lock', 'note', 'renames'}
+    """
+    upper = re.sub(r'\s+', ' ', clause.strip()).upper()
+    instant_blocked = has_fulltext or row_format.lower() == 'compressed'
+    identifier = r"`?([\w$]+)`?"
+
+    # 添加字段
+    match = re.match(r"ADD (?:COLUMN )?(?!INDEX|KEY|UNIQUE|PRIMARY|FULLTEXT|SPATIAL|CONSTRAINT|FOREIGN|CHECK|PARTITION)"
+                     + identifier, clause.strip(), re.IGNORECASE)
+    if match and not upper.startswith('ADD (') and not upper.startswith('ADD COLUMN ('):
+        name = match.group(1)
+        if 'AUTO_INCREMENT' in upper:
+            return _operation(clause, f"添加自增字段 {name}", 'INPLACE', True, 'SHARED', "添加自增字段期间不允许并发写入")
+        if re.search(r"\bSTORED\b", upper):
+            return _operation(clause, f"添加存储生成列 {name}", 'COPY', True, 'SHARED', "存储生成列需要复制表")
+        positioned = re.search(r"\b(FIRST|AFTER)\b", upper) is not None
+        if version.supports_instant('add_column') and not instant_blocked and \
+                (not positioned or version.supports_instant('add_column_any_position')):
+            return _operation(clause, f"添加字段 {name}", 'INSTANT', False, 'NONE', "只修改数据字典，不复制数据")
+        note = "当前版本只能 INSTANT 添加到最后一列" if positioned and version.supports_instant('add_column') else ""
+        if instant_blocked:
+            note = "表有全文索引或使用压缩行格式，不能 INSTANT 添加字段"
+        return _operation(clause, f"添加字段 {name}", 'INPLACE', True, 'NONE', note)
+
+    # 删除字段 / 索引 / 主键 / 外键
+    match = re.match(r"DROP (?:COLUMN )?(?!INDEX|KEY|PRIMARY|FOREIGN|CONSTRAINT|CHECK|PARTITION)" + identifier,
+                     clause.strip(), re.IGNORECASE)
+    if match:
+        name = match.group(1)
+        if version.supports_instant('drop_column') and not instant_blocked:
+            return _operation(clause, f"删除字段 {name}", 'INSTANT', False, 'NONE', "只修改数据字典，不复制数据")
+        return _operation(clause, f"删除字段 {name}", 'INPLACE', True, 'NONE')
+    if re.match(r"DROP PRIMARY KEY", upper):
+        return _operation(clause, "删除主键", 'COPY', True, 'SHARED', "只删除主键而不同时添加新主键需要复制表")
+    if re.match(r"DROP (INDEX|KEY) ", upper):
+        return _operation(clause, "删除索引", 'INPLACE', False, 'NONE', "只修改元数据，很快完成")
+    if re.match(r"DROP FOREIGN KEY ", upper):
+        return _operation(clause, "删除外键", 'INPLACE', False, 'NONE', "只修改元数据")
+
+    # 重命名
+    match = re.match(r"RENAME COLUMN " + identifier + r" TO " + identifier, clause.strip(), re.IGNORECASE)
+    if match:
+        renames = (match.group(1), match.group(2))
+        algorithm = 'INSTANT' if version.supports_instant('rename_column') else 'INPLACE'
+        return _operation(clause, f"重命名字段 {renames[0]} -> {renames[1]}", algorithm, False, 'NONE', "", renames)
+    if re.match(r"RENAME (INDEX|KEY) ", upper):
+        return _operation(clause, "重命名索引", 'INPLACE', False, 'NONE', "只修改元数据")
+    if re.match(r"RENAME (TO |AS )?", upper):
+        algorithm = 'INSTANT' if version.supports_instant('rename_table') else 'INPLACE'
+        return _operation(clause, "重命名表", algorithm, False, 'NONE')
+
+    # 修改字段
+    match = re.match(r"MODIFY (?:COLUMN )?" + identifier + r"\s+(.*)$", clause.strip(), re.IGNORECASE | re.DOTALL)
+    if match:
+        return _classify_modify(clause, match.group(1), match.group(1), match.group(2), columns, version)
+    match = re.match(r"CHANGE (?:COLUMN )?" + identifier + r"\s+" + identifier + r"\s+(.*)$", clause.strip(),
+                     re.IGNORECASE | re.DOTALL)
+    if match:
+        return _classify_modify(clause, match.group(1), match.group(2), match.group(3), columns, version)
+    if re.match(r"ALTER (COLUMN )?\S+ (SET DEFAULT|DROP DEFAULT)", upper):
+        algorithm = 'INSTANT' if version.supports_instant('column_default') else 'INPLACE'
+        return _operation(clause, "修改字段默认值", algorithm, False, 'NONE', "只修改元数据")
+
+    # 索引与约束
+    if re.match(r"ADD (CONSTRAINT \S+ )?PRIMARY KEY", upper):
+        return _operation(clause, "添加主键", 'INPLACE', True, 'NONE', "需要重建聚簇索引，期间允许并发写入")
+    if re.match(r"ADD (CONSTRAINT \S+ )?FOREIGN KEY", upper):
+        return _operation(clause, "添加外键", 'COPY', True, 'SHARED',
+                          "foreign_key_checks 开启时需要复制表；关闭后可使用 INPLACE")
+    if re.match(r"ADD FULLTEXT", upper):
+        note = "表中已有全文索引" if has_fulltext else "第一个全文索引需要重建表"
+        return _operation(clause, "添加全文索引", 'INPLACE', not has_fulltext, 'SHARED', note)
+    if re.match(r"ADD SPATIAL", upper):
+        return _operation(clause, "添加空间索引", 'INPLACE', False, 'SHARED', "创建期间不允许并发写入")
+    if re.match(r"ADD (CONSTRAINT \S+ )?(UNIQUE |INDEX |KEY )", upper) or re.match(r"ADD (UNIQUE|INDEX|KEY)\b", upper):
+        return _operation(clause, "添加二级索引", 'INPLACE', False, 'NONE', "需要扫描全表构建索引，期间允许并发写入")
+
+    # 表选项
+    if re.match(r"(ENGINE\s*=\s*INNODB|FORCE)\b", upper):
+        return _operation(clause, "重建表", 'INPLACE', True, 'NONE')
+    if re.match(r"(ROW_FORMAT|KEY_BLOCK_SIZE)\s*=", upper):
+        return _operation(clause, "修改行格式", 'INPLACE', True, 'NONE')
+    if re.match(r"CONVERT TO CHARACTER SET", upper):
+        return _operation(clause, "转换字符集", 'COPY', True, 'SHARED', "转换已有数据的字符集需要复制表")
+    if re.match(r"(DEFAULT )?(CHARACTER SET|CHARSET|COLLATE)\s*=?", upper):
+        return _operation(clause, "修改表默认字符集", 'INPLACE', False, 'NONE', "只影响之后新增的字段")
+    if re.match(r"AUTO_INCREMENT\s*=", upper):
+        return _operation(clause, "修改自增起始值", 'INPLACE', False, 'NONE', "只修改内存中的计数器")
+    if re.match(r"COMMENT\s*=?", upper):
+        return _operation(clause, "修改表注释", 'INSTANT' if version.number >= (8, 0, 0) else 'INPLACE', False, 'NONE')
+
+    return _operation(clause, "其他操作", 'COPY', True, 'SHARED', "无法确定支持的在线算法，按 COPY 估算")
+
+
+def summarize_plan(operations: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并各操作：整条语句的算法和锁取各操作中代价最高的"""
+    algorithm = max((op['algorithm'] for op in operations), key=ALGORITHMS.index)
+    lock = max((op['lock'] for op in operations), key=LOCKS.index)
+    return {
+        'algorithm': algorithm,
+        'lock': lock,
+        'rebuild': any(op['rebuild'] for op in operations),
+        'adds_index': any(op['description'] in ("添加二级索引", "添加全文索引", "添加空间索引") for op in operations),
+        'renames': [op['renames'] for op in operations if op['renames']],
+    }
+
+
+def estimate_duration(summary: Dict[str, Any], data_length: int, index_length: int) -> Tuple[float, str]:
+    """
+    根据表大小和算法估算耗时（秒），返回 (秒数, 估算依据)
+
+    只是数量级参考：实际耗时取决于磁盘、缓冲池、并发写入量以及 innodb_ddl_threads 等参数。
+    """
+    mb = 1024 * 1024
+    if summary['algorithm'] == 'INSTANT':
+        return 0.0, "只修改数据字典，需要短暂获取元数据锁"
+    if summary['algorithm'] == 'COPY':
+        return (data_length + index_length) / mb / SCHEMA_CHANGE_CONFIG['copy_mbps'], \
+            f"逐行复制数据并重建全部索引，按 {SCHEMA_CHANGE_CONFIG['copy_mbps']:g} MB/s 估算"
+    if summary['rebuild']:
+        return (data_length + index_length) / mb / SCHEMA_CHANGE_CONFIG['rebuild_mbps'], \
+            f"原地重建表，按 {SCHEMA_CHANGE_CONFIG['rebuild_mbps']:g} MB/s 估算"
+    if summary['adds_index']:
+        return data_length / mb / SCHEMA_CHANGE_CONFIG['index_mbps'], \
+            f"扫描聚簇索引并排序构建新索引，按 {SCHEMA_CHANGE_CONFIG['index_mbps']:g} MB/s 估算"
+    return 0.0, "只修改元数据"
+
+
+def estimate_shadow_duration(data_length: int, index_length: int) -> float:
+    """估算影子表复制的耗时（秒）：按复制吞吐量计算，并为限流和触发器开销留出余量"""
+    return (data_length + index_length) / (1024 * 1024) / SCHEMA_CHANGE_CONFIG['copy_mbps'] * 1.5
+
+
+def recommend_method(summary: Dict[str, Any], data_length: int, index_length: int) -> str:
+    """
+    推荐执行方式: direct（直接 ALTER）或 shadow（影子表复制）
+
+    INSTANT、只修改元数据以及小表上的变更直接执行；需要重建或阻塞写入的大表变更使用影子表复制。
+    """
+    size_mb = (data_length + index_length) / (1024 * 1024)
+    if summary['algorithm'] == 'INSTANT' or size_mb < SCHEMA_CHANGE_CONFIG['shadow_threshold_mb']:
+        return 'direct'
+    if summary['algorithm'] == 'COPY' or summary['lock'] != 'NONE' or summary['rebuild']:
+        return 'shadow'
+    return 'direct'
+
+
+def build_alter_sql(table_name: str, clauses: Sequence[str], summary: Dict[str, Any]) -> str:
+    """生成带显式 ALGORITHM / LOCK 的 ALTER 语句，服务器无法按该算法执行时会直接报错而不是退化为复制表"""
+    options = [f"ALGORITHM={summary['algorithm']}"]
+    if summary['algorithm'] != 'INSTANT':
+        options.append(f"LOCK={summary['lock']}")
+    return f"ALTER TABLE `{table_name}` {', '.join(list(clauses) + options)}"
+
+
+def format_duration(seconds: float) -> str:
+    """将秒数格式化为可读的时长"""
+    if seconds < 1:
+        return "不到1秒"
+    if seconds < 60:
+        return f"约 {seconds:.0f} 秒"
+    if seconds < 3600:
+        return f"约 {seconds / 60:.1f} 分钟"
+    return f"约 {seconds / 3600:.1f} 小时"
+
+
+# ---------------------------------------------------------------------------
+# 影子表复制
+# ---------------------------------------------------------------------------
+
+def shadow_names(table_name: str) -> Dict[str, str]:
+    """影子表、备份表和触发器的名称"""
+    base = table_name[:50]
+    return {
+        'new': f"_{base}_new",
+        'old': f"_{base}_old",
+        'insert_trigger': f"_{base}_osc_ins",
+        'update_trigger': f"_{base}_osc_upd",
+        'delete_trigger': f"_{base}_osc_del",
+    }
+
+
+def replication_lag(connection: pymysql.Connection) -> Optional[float]:
+    """读取当前服务器作为副本的复制延迟（秒），不是副本或无法读取时返回None"""
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        for statement, field in (("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),
+                                 ("SHOW SLAVE STATUS", 'Seconds_Behind_Master')):
+            try:
+                cursor.execute(statement)
+            except pymysql.Error:
+                continue
+            row = cursor.fetchone()
+            if not row:
+                return None
+            lag = row.get(field)
+            # 复制线程停止时延迟为NULL，视为无限延迟
+            return float(lag) if lag is not None else float('inf')
+    return None
+
+
+def threads_running(connection: pymysql.Connection) -> int:
+    """读取服务器当前正在执行的线程数"""
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+        row = cursor.fetchone()
+        return int(row[1]) if row else 0
+
+
+class ShadowCopyOptions:
+    """影子表复制参数"""
+
+    def __init__(self, chunk_size: int = 1000, chunk_time: float = 0.5, max_lag: float = 5.0,
+                 max_threads_running: int = 25, throttle_sleep: float = 1.0, keep_old_table: bool = True):
+        self.chunk_size = max(1, chunk_size)
+        # 每块的目标耗时，块大小据此自适应调整
+        self.chunk_time = chunk_time
+        self.max_lag = max_lag
+        self.max_threads_running = max_threads_running
+        self.throttle_sleep = throttle_sleep
+        self.keep_old_table = keep_old_table
+
+
+def _copy_columns(cursor, table_name: str, new_table: str) -> List[str]:
+    """原表和影子表共有的非生成列，按原表顺序"""
+    cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
+    old_columns = [(row[0], row[5] if len(row) > 5 else '') for row in cursor.fetchall()]
+    cursor.execute(f"SHOW COLUMNS FROM `{new_table}`")
+    new_columns = {row[0]: (row[5] if len(row) > 5 else '') for row in cursor.fetchall()}
+    return [name for name, extra in old_columns
+            if name in new_columns and 'GENERATED' not in (extra or '').upper()
+            and 'GENERATED' not in (new_columns[name] or '').upper()]
+
+
+def _create_triggers(cursor, table_name: str, names: Dict[str, str], columns: Sequence[str],
+                     pk_columns: Sequence[str]) -> None:
+    """在原表上创建同步增量修改到影子表的触发器"""
+    column_sql = ", ".join(f"`{col}`" for col in columns)
+    new_values = ", ".join(f"NEW.`{col}`" for col in columns)
+    match_old = " AND ".join(f"`{names['new']}`.`{col}` <=> OLD.`{col}`" for col in pk_columns)
+    key_changed = " OR ".join(f"NOT (OLD.`{col}` <=> NEW.`{col}`)" for col in pk_columns)
+    cursor.execute(
+        f"CREATE TRIGGER `{names['insert_trigger']}` AFTER INSERT ON `{table_name}` FOR EACH ROW "
+        f"REPLACE INTO `{names['new']}` ({column_sql}) VALUES ({new_values})"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER `{names['update_trigger']}` AFTER UPDATE ON `{table_name}` FOR EACH ROW BEGIN "
+        f"DELETE IGNORE FROM `{names['new']}` WHERE ({key_changed}) AND {match_old}; "
+        f"REPLACE INTO `{names['new']}` ({column_sql}) VALUES ({new_values}); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER `{names['delete_trigger']}` AFTER DELETE ON `{table_name}` FOR EACH ROW "
+        f"DELETE IGNORE FROM `{names['new']}` WHERE {match_old}"
+    )
+
+
+def _drop_triggers(cursor, names: Dict[str, str]) -> None:
+    for key in ('insert_trigger', 'update_trigger', 'delete_trigger'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS `{names[key]}`")
+
+
+def run_shadow_copy(connect: Callable[[], ContextManager], table_name: str, clauses: Sequence[str],
+                    pk_columns: Sequence[str], options: ShadowCopyOptions,
+                    lag_sources: Sequence[Callable[[], ContextManager]] = (),
+                    progress: Optional[Callable[[float, Dict[str, Any]], None]] = None,
+                    check_cancelled: Callable[[], None] = lambda: None) -> Dict[str, Any]:
+    """
+    通过影子表在线执行结构变更
+
+    1. CREATE TABLE ... LIKE 建立影子表并在影子表上执行 ALTER
+    2. 在原表上创建触发器，复制期间的插入、更新、删除同步到影子表
+    3. 按主键第一列分块 INSERT IGNORE ... SELECT 复制存量数据，块大小按目标耗时自适应；
+       每块之间检查复制延迟和 Threads_running，超过阈值时暂停
+    4. RENAME TABLE 原子切换原表和影子表，删除触发器，按需删除备份表
+
+    切换前的任何失败都会删除触发器和影子表，原表保持不变。
+
+    Args:
+        connect: 返回主库连接上下文管理器的函数，整个过程使用同一个连接
+        pk_columns: 主键字段，第一列必须为整数类型
+        lag_sources: 返回副本连接上下文管理器的函数，用于检查复制延迟
+        progress: 每复制一块调用一次，参数为 (完成比例, 当前统计)
+        check_cancelled: 每块之间调用，工具调用已取消时应抛出异常
+
+    Returns:
+        Dict: 复制统计 {'rows', 'chunks', 'throttled', 'throttle_time', 'elapsed', 'old_table'}
+    """
+    names = shadow_names(table_name)
+    pk = pk_columns[0]
+    stats = {'rows': 0, 'chunks': 0, 'throttled': 0, 'throttle_time': 0.0, 'elapsed': 0.0,
+             'old_table': names['old'] if options.keep_old_table else None}
+    start = time.perf_counter()
+
+    def wait_for_capacity(connection) -> None:
+        """复制延迟或服务器负载超过阈值时暂停"""
+        while True:
+            check_cancelled()
+            lags = []
+            own_lag = replication_lag(connection)
+            if own_lag is not None:
+                lags.append(own_lag)
+            for source in lag_sources:
+                try:
+                    with source() as replica:
+                        lag = replication_lag(replica)
+                except pymysql.Error:
+                    lag = None
+                if lag is not None:
+                    lags.append(lag)
+            busy = threads_running(connection) > options.max_threads_running
+            if not busy and (not lags or max(lags) <= options.max_lag):
+                return
+            stats['throttled'] += 1
+            stats['throttle_time'] += options.throttle_sleep
+            time.sleep(options.throttle_sleep)
+
+    with connect() as connection, connection.cursor() as cursor:
+        for key in ('new', 'old'):
+            # 用 = 精确比较，SHOW TABLES LIKE 会把表名中的 _ 当作通配符
+            cursor.execute("SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() "
+                           "AND TABLE_NAME = %s", (names[key],))
+            if cursor.fetchone():
+                raise ValueError(f"表 {names[key]} 已存在，可能是上次变更遗留的，请确认后删除")
+
+        cursor.execute(f"CREATE TABLE `{names['new']}` LIKE `{table_name}`")
+        swapped = False
+        try:
+            cursor.execute(f"ALTER TABLE `{names['new']}` {', '.join(clauses)}")
+            columns = _copy_columns(cursor, table_name, names['new'])
+            missing_keys = [col for col in pk_columns if col not in columns]
+            if missing_keys:
+                raise ValueError(f"变更后的表缺少主键字段 {', '.join(missing_keys)}，无法同步数据")
+            _create_triggers(cursor, table_name, names, columns, pk_columns)
+
+            cursor.execute(f"SELECT MIN(`{pk}`), MAX(`{pk}`) FROM `{table_name}`")
+            low, high = cursor.fetchone()
+            column_sql = ", ".join(f"`{col}`" for col in columns)
+            chunk_size = options.chunk_size
+            if low is not None:
+                low, high = int(low), int(high)
+                position = low
+                while position <= high:
+                    wait_for_capacity(connection)
+                    end = min(position + chunk_size - 1, high)
+                    chunk_start = time.perf_counter()
+                    cursor.execute(
+                        f"INSERT IGNORE INTO `{names['new']}` ({column_sql}) "
+                        f"SELECT {column_sql} FROM `{table_name}` FORCE INDEX (PRIMARY) "
+                        f"WHERE `{pk}` BETWEEN %s AND %s LOCK IN SHARE MODE",
+                        (position, end)
+                    )
+                    chunk_elapsed = time.perf_counter() - chunk_start
+                    stats['rows'] += max(cursor.rowcount, 0)
+                    stats['chunks'] += 1
+                    position = end + 1
+                    # 按目标耗时调整下一块的大小，每次最多放大一倍
+                    if chunk_elapsed > 0:
+                        scale = min(2.0, max(0.5, options.chunk_time / chunk_elapsed))
+                        chunk_size = max(100, int(chunk_size * scale))
+                    if progress is not None:
+                        progress((position - low) / (high - low + 1), stats)
+
+            check_cancelled()
+            cursor.execute(f"RENAME TABLE `{table_name}` TO `{names['old']}`, `{names['new']}` TO `{table_name}`")
+            swapped = True
+            _drop_triggers(cursor, names)
+            if not options.keep_old_table:
+                cursor.execute(f"DROP TABLE `{names['old']}`")
+        except BaseException:
+            if not swapped:
+                try:
+                    _drop_triggers(cursor, names)
+                    cursor.execute(f"DROP TABLE IF EXISTS `{names['new']}`")
+                except pymysql.Error:
+                    pass
+            raise
+
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+@contextmanager
+def replica_connection(config: Dict[str, Any], address: str):
+    """连接到副本（host:port，使用与主库相同的账号），用于检查复制延迟"""
+    host, _, port = address.strip().partition(':')
+    replica_config = {k: v for k, v in config.items() if k not in ('host', 'port', 'database')}
+    connection = pymysql.connect(host=host, port=int(port or 3306), connect_timeout=5, **replica_config)
+    try:
+        yield connection
+    finally:
+        connection.close()
@@ -9,16 +9,33 @@
 - 数据类型合理性分析
 """
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+import asyncio
+import contextvars
+import fnmatch
 import logging
 import pymysql
 import os
-from typing import Optional, Dict, List, Any
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any, Tuple, Callable
 from dotenv import load_dotenv
 
-# 加载环境变量
+# 加载环境变量，需要在导入本地模块之前完成，各模块在导入时读取配置
 load_dotenv()
 
+from column_sampling import (SAMPLE_CONFIG, is_sampleable, is_integer_type, sample_table,  # noqa: E402
+                             column_statistics, selectivity_level, format_column_stats)
+from mysql_async import get_async_engine, track_query, QueryTimeoutError  # noqa: E402
+from mysql_pool import get_pool_manager  # noqa: E402
+from schema_cache import schema_cache, table_version  # noqa: E402
+from table_export import confine_path  # noqa: E402
+from workload_digest import (DIGEST_ORDERS, load_statement_digests, parse_slow_log, rank_digests, digest_findings,  # noqa: E402
+                             examined_ratio, extract_tables, workload_index_candidates, workload_by_table,
+                             format_latency, candidate_index_sql)
+
 # 配置日志记录器
 logging.basicConfig(
     level=logging.INFO,
@@ -39,26 +56,34 @@ MYSQL_CONFIG = {
     'autocommit': True
 }
 
-def get_mysql_connection(database: Optional[str] = None) -> pymysql.Connection:
-    """获取MySQL数据库连接"""
-    config = MYSQL_CONFIG.copy()
-    if database:
-        config['database'] = database
-    
+# 进程内共享的连接池管理器，按数据库名称划分连接池
+pool_manager = get_pool_manager(MYSQL_CONFIG)
+
+# 异步执行引擎：工具在有界线程池中执行，支持超时与取消时终止查询
+engine = get_async_engine(MYSQL_CONFIG)
+
+@contextmanager
+def get_mysql_connection(database: Optional[str] = None):
+    """从连接池借用MySQL数据库连接，用法: with get_mysql_connection(database) as connection"""
+    with pool_manager.connection(database) as connection, track_query(connection):
+        yield connection
+
+def get_table_detailed_info(database_name: str, table_name: str) -> Dict[str, Any]:
+    """获取表的详细信息，包括字段、索引、约束等，结果在进程内缓存"""
     try:
-        connection = pymysql.connect(**config)
-        logger.info(f"成功连接到MySQL数据库: {config['host']}:{config['port']}")
-        return connection
+        return schema_cache.get(
+            (database_name, table_name, 'detail'),
+            lambda: get_mysql_connection(database_name),
+            lambda connection: _load_table_detailed_info(connection, table_name),
+            lambda connection: table_version(connection, database_name, table_name)
+        )
     except Exception as e:
-        logger.error(f"MySQL连接失败: {e}")
+        logger.error(f"获取表详细信息失败: {e}")
         raise
 
-def get_table_detailed_info(database_name: str, table_name: str) -> Dict[str, Any]:
-    """获取表的详细信息，包括字段、索引、约束等"""
-    try:
-        connection = get_mysql_connection(database_name)
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
-        
+def _load_table_detailed_info(connection: pymysql.Connection, table_name: str) -> Dict[str, Any]:
+    """从数据库读取表的字段、索引、状态和建表语句"""
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
         # 获取表结构信息
         cursor.execute(f"DESCRIBE `{table_name}`")
         columns = cursor.fetchall()
@@ -74,20 +99,13 @@ def get_table_detailed_info(database_name: str, table_name: str) -> Dict[str, An
         # 获取建表语句
         cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
         create_table = cursor.fetchone()
-        
-        cursor.close()
-        connection.close()
-        
-        return {
-            'columns': columns,
-            'indexes': indexes,
-            'table_status': table_status,
-            'create_table_sql': create_table['Create Table'] if create_table else None
-        }
-        
-    except Exception as e:
-        logger.error(f"获取表详细信息失败: {e}")
-        raise
+    
+    return {
+        'columns': columns,
+        'indexes': indexes,
+        'table_status': table_status,
+        'create_table_sql': create_table['Create Table'] if create_table else None
+    }
 
 def analyze_naming_conventions(table_name: str, columns: List[Dict]) -> List[str]:
     """分析命名规范"""
@@ -156,9 +174,279 @@ def analyze_data_types(columns: List[Dict]) -> List[str]:
     
     return suggestions
 
-def analyze_indexes(indexes: List[Dict], columns: List[Dict]) -> List[str]:
-    """分析索引设计"""
+def group_indexes(indexes: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """将 SHOW INDEX 的逐列结果按索引名聚合，字段按 Seq_in_index 排序并保留前缀长度"""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for idx in sorted(indexes, key=lambda item: (item['Key_name'], item.get('Seq_in_index') or 0)):
+        info = grouped.setdefault(idx['Key_name'], {
+            'columns': [],
+            'unique': int(idx['Non_unique']) == 0,
+            'type': idx.get('Index_type') or 'BTREE',
+        })
+        info['columns'].append((idx['Column_name'], idx.get('Sub_part')))
+    return grouped
+
+def find_redundant_indexes(indexes: List[Dict]) -> List[Dict[str, Any]]:
+    """
+    检测重复索引和左前缀冗余索引
+
+    规则：
+    - 字段（含前缀长度）完全相同的索引互为重复，保留主键、唯一索引或名称靠前的一个
+    - 非唯一索引的字段是另一个同类型索引的严格左前缀时，该索引冗余
+    - 主键永不删除；唯一索引承担约束，不因左前缀规则被判定冗余；FULLTEXT/SPATIAL 索引不参与比较
+
+    Returns:
+        List[Dict]: 每项包含 index（冗余索引）、covered_by（覆盖它的索引）、kind（duplicate/left-prefix）、reason
+    """
+    grouped = group_indexes(indexes)
+
+    def keep_rank(name: str):
+        info = grouped[name]
+        return (name != 'PRIMARY', not info['unique'], name)
+
+    findings = []
+    redundant = set()
+    names = sorted(grouped, key=keep_rank)
+    for i, name in enumerate(names):
+        info = grouped[name]
+        if name == 'PRIMARY' or info['type'] in ('FULLTEXT', 'SPATIAL'):
+            continue
+        for other in names:
+            if other == name or other in redundant:
+                continue
+            other_info = grouped[other]
+            if other_info['type'] != info['type']:
+                continue
+            if other_info['columns'] == info['columns'] and names.index(other) < i:
+                findings.append({'index': name, 'covered_by': other, 'kind': 'duplicate',
+                                 'reason': f"与索引 '{other}' 字段完全相同"})
+                redundant.add(name)
+                break
+            if (not info['unique'] and len(other_info['columns']) > len(info['columns'])
+                    and other_info['columns'][:len(info['columns'])] == info['columns']):
+                findings.append({'index': name, 'covered_by': other, 'kind': 'left-prefix',
+                                 'reason': f"是索引 '{other}' 的左前缀"})
+                redundant.add(name)
+                break
+    return findings
+
+# 字段类型的大致存储字节数，用于无法读取索引统计时估算索引大小
+_TYPE_BYTES = {
+    'tinyint': 1, 'smallint': 2, 'mediumint': 3, 'int': 4, 'integer': 4, 'bigint': 8,
+    'float': 4, 'double': 8, 'date': 3, 'time': 3, 'year': 1, 'datetime': 5, 'timestamp': 4,
+    'bit': 1, 'enum': 2, 'set': 8,
+}
+
+def estimate_column_bytes(column_type: str, sub_part: Optional[int] = None) -> int:
+    """估算字段在索引中占用的字节数"""
+    column_type = column_type.lower()
+    base = re.match(r'[a-z]+', column_type)
+    base_type = base.group(0) if base else column_type
+    length_match = re.search(r'\((\d+)', column_type)
+    length = int(length_match.group(1)) if length_match else None
+    if sub_part:
+        length = int(sub_part)
+
+    if base_type in _TYPE_BYTES:
+        return _TYPE_BYTES[base_type]
+    if base_type == 'decimal':
+        return (length or 10) // 2 + 1
+    if base_type in ('char', 'binary'):
+        return length or 1
+    if base_type in ('varchar', 'varbinary'):
+        # 变长字段按声明长度的一半估算实际平均长度，上限64字节
+        return min((length or 255) // 2, 64) + 2
+    # TEXT/BLOB 等只能以前缀建立索引
+    return min(length or 64, 255) + 2
+
+def load_index_usage(database_name: str) -> Optional[Dict[Tuple[str, str], Dict[str, int]]]:
+    """
+    从 performance_schema 读取索引自服务器启动以来的读写次数
+
+    Returns:
+        (表名, 索引名) -> {'reads', 'writes'}；performance_schema 不可用或无权限时返回None
+    """
+    try:
+        with get_mysql_connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT OBJECT_NAME, INDEX_NAME, COUNT_READ, COUNT_WRITE "
+                "FROM performance_schema.table_io_waits_summary_by_index_usage "
+                "WHERE OBJECT_SCHEMA = %s AND INDEX_NAME IS NOT NULL",
+                (database_name,)
+            )
+            return {(row[0], row[1]): {'reads': int(row[2]), 'writes': int(row[3])}
+                    for row in cursor.fetchall()}
+    except Exception as e:
+        logger.warning(f"无法读取 performance_schema 索引使用统计: {e}")
+        return None
+
+def load_index_sizes(database_name: str) -> Optional[Dict[Tuple[str, str], int]]:
+    """
+    从 mysql.innodb_index_stats 读取InnoDB索引实际占用的字节数
+
+    Returns:
+        (表名, 索引名) -> 字节数；无权限或非InnoDB时返回None
+    """
+    try:
+        with get_mysql_connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.table_name, s.index_name, s.stat_value * @@innodb_page_size "
+                "FROM mysql.innodb_index_stats s "
+                "WHERE s.database_name = %s AND s.stat_name = 'size'",
+                (database_name,)
+            )
+            return {(row[0], row[1]): int(row[2]) for row in cursor.fetchall()}
+    except Exception as e:
+        logger.warning(f"无法读取 mysql.innodb_index_stats: {e}")
+        return None
+
+def format_bytes(size: float) -> str:
+    """将字节数格式化为可读大小"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+def suggest_indexes_by_selectivity(indexes: List[Dict], columns: List[Dict],
+                                   column_stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    根据采样得到的字段分布给出索引建议，按估算选择性从高到低排序
+
+    - 未建索引的外键字段：选择性高或中等时建议添加索引，选择性低时建议改用联合索引
+    - 已有索引的首列选择性低时提示该索引效果有限
+    """
+    grouped = group_indexes(indexes)
+    leading = {info['columns'][0][0]: name for name, info in grouped.items() if info['columns']}
+    ranked = []
+    for col in columns:
+        field_name = col['Field']
+        stat = column_stats.get(field_name)
+        if stat is None or not stat['sample_size']:
+            continue
+        level = selectivity_level(stat)
+        detail = f"约{stat['distinct']}个不同值，区分度{stat['distinct_ratio']:.2%}"
+        if stat['top_values'] and stat['top_values'][0][1] >= 0.3:
+            detail += f"，最高频值占{stat['top_values'][0][1]:.0%}"
+
+        if field_name in leading:
+            index_name = leading[field_name]
+            if level == 'low' and index_name != 'PRIMARY' and not grouped[index_name]['unique']:
+                ranked.append((stat['distinct_ratio'],
+                               f"⚠️ 索引 '{index_name}' 的首列 '{field_name}' 选择性低（{detail}），"
+                               f"单独使用效果有限，建议与其他条件字段组成联合索引或调整字段顺序"))
+        elif field_name.endswith('_id') and field_name != 'id':
+            if level == 'low':
+                ranked.append((stat['distinct_ratio'],
+                               f"💡 外键字段 '{field_name}' 选择性低（{detail}），"
+                               f"单列索引收益有限，建议与常用的过滤字段组成联合索引"))
+            else:
+                ranked.append((stat['distinct_ratio'],
+                               f"💡 外键字段 '{field_name}' 选择性{'高' if level == 'high' else '中等'}（{detail}），"
+                               f"建议添加索引以提高查询性能"))
+    return [suggestion for _, suggestion in sorted(ranked, key=lambda item: -item[0])]
+
+def primary_integer_column(table_info: Dict[str, Any]) -> Optional[str]:
+    """主键（或联合主键的第一个字段）为整数类型时返回该字段，可用于按主键范围切分表"""
+    primary = group_indexes(table_info['indexes']).get('PRIMARY')
+    if not primary:
+        return None
+    pk_column = primary['columns'][0][0]
+    column_types = {col['Field']: col['Type'] for col in table_info['columns']}
+    return pk_column if is_integer_type(column_types.get(pk_column, '')) else None
+
+def collect_column_stats(database_name: str, table_name: str, table_info: Dict[str, Any],
+                         columns: Optional[List[str]] = None, sample_rows: int = 0,
+                         top_k: int = 5) -> Tuple[Dict[str, Dict[str, Any]], str]:
+    """
+    对表进行有界采样并计算字段分布
+
+    Args:
+        table_info: get_table_detailed_info 的结果，用于确定字段类型、主键和估算行数
+        columns: 需要采样的字段，默认所有适合采样的字段
+        sample_rows: 采样行数，0表示使用默认配置
+
+    Returns:
+        Tuple[Dict, str]: (字段名 -> 分布统计, 采样方式)
+    """
+    column_types = {col['Field']: col['Type'] for col in table_info['columns']}
+    targets = [col for col in (columns or column_types) if col in column_types and is_sampleable(column_types[col])]
+    if not targets:
+        return {}, 'full'
+
+    pk_column = primary_integer_column(table_info)
+
+    table_status = table_info['table_status'] or {}
+    total_rows = int(table_status.get('Rows') or 0)
+    with get_mysql_connection(database_name) as connection:
+        rows, method = sample_table(connection, table_name, targets, total_rows, pk_column,
+                                    sample_rows=sample_rows or SAMPLE_CONFIG['sample_rows'])
+    if method == 'full':
+        total_rows = len(rows)
+    return column_statistics(targets, rows, total_rows, top_k), method
+
+# 查询负载分析配置 - 从环境变量获取
+WORKLOAD_CONFIG = {
+    # 读取的语句摘要数量上限，候选索引基于全部读取的摘要生成
+    'digest_limit': int(os.getenv('MYSQL_WORKLOAD_DIGEST_LIMIT', '200')),
+    # 慢查询日志只能从该目录读取，相对路径基于该目录
+    'slow_log_dir': os.getenv('MYSQL_SLOW_LOG_DIR', 'slow_logs'),
+    'allow_any_path': os.getenv('MYSQL_SLOW_LOG_ALLOW_ANY_PATH', 'false').lower() in ('1', 'true', 'yes'),
+}
+
+def load_workload(database_name: str, slow_log_path: str = "") -> Tuple[List[Dict[str, Any]], str]:
+    """
+    读取查询负载摘要：指定慢查询日志时解析日志文件，否则读取 performance_schema
+
+    Returns:
+        Tuple[List[Dict], str]: (摘要列表, 数据来源说明)
+
+    Raises:
+        ValueError: 慢查询日志路径在 MYSQL_SLOW_LOG_DIR 之外且未设置 MYSQL_SLOW_LOG_ALLOW_ANY_PATH
+    """
+    if slow_log_path:
+        path = confine_path(slow_log_path, WORKLOAD_CONFIG['slow_log_dir'], WORKLOAD_CONFIG['allow_any_path'])
+        with open(path, 'r', encoding='utf-8', errors='replace') as handle:
+            return parse_slow_log(handle, database_name), f"慢查询日志 {path}"
+    with get_mysql_connection() as connection:
+        return (load_statement_digests(connection, database_name, WORKLOAD_CONFIG['digest_limit']),
+                "performance_schema.events_statements_summary_by_digest")
+
+def build_workload_candidates(digests: List[Dict[str, Any]],
+                              metadata: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """根据表元数据（get_table_detailed_info / load_database_metadata 的结构）生成负载候选索引"""
+    table_columns = {table: [col['Field'] for col in info['columns']] for table, info in metadata.items()}
+    table_indexes = {table: [[column for column, _ in index['columns']]
+                             for index in group_indexes(info['indexes']).values()]
+                     for table, info in metadata.items()}
+    return workload_index_candidates(digests, table_columns, table_indexes)
+
+def suggest_indexes_from_workload(candidates: List[Dict[str, Any]], total_latency: float,
+                                  limit: int = 5) -> List[str]:
+    """将负载候选索引格式化为建议，按支撑查询的总耗时排序"""
+    suggestions = []
+    for candidate in candidates[:limit]:
+        share = candidate['latency'] / total_latency if total_latency > 0 else 0.0
+        suggestions.append(
+            f"🔥 实际负载中有 {candidate['digests']} 类语句按 ({', '.join(candidate['columns'])}) 过滤或排序，"
+            f"没有可用的索引（执行 {candidate['count']} 次，总耗时 {format_latency(candidate['latency'])}，"
+            f"占负载 {share:.1%}），建议: {candidate_index_sql(candidate['table'], candidate['columns'])}"
+        )
+    return suggestions
+
+def analyze_indexes(indexes: List[Dict], columns: List[Dict],
+                    column_stats: Optional[Dict[str, Dict[str, Any]]] = None,
+                    workload: Optional[Tuple[List[Dict[str, Any]], float]] = None) -> List[str]:
+    """
+    分析索引设计
+
+    提供 column_stats（采样得到的字段分布）时，外键字段的索引建议按估算选择性排序，
+    否则仅按字段名判断。提供 workload（本表的负载候选索引, 负载总耗时）时，
+    优先给出实际查询负载中缺少的索引。
+    """
     suggestions = []
+    if workload is not None:
+        suggestions.extend(suggest_indexes_from_workload(*workload))
     
     # 统计索引信息
     index_info = {}
@@ -181,15 +469,14 @@ def analyze_indexes(indexes: List[Dict], columns: List[Dict]) -> List[str]:
     if len(non_primary_indexes) > 5:
         suggestions.append(f"⚠️ 表有{len(non_primary_indexes)}个非主键索引，过多索引可能影响写入性能")
     
-    # 检查重复索引
-    column_sets = []
-    for idx_name, idx_info in index_info.items():
-        if idx_name != 'PRIMARY':
-            col_set = tuple(sorted(idx_info['columns']))
-            if col_set in column_sets:
-                suggestions.append(f"⚠️ 可能存在重复索引，请检查索引 '{idx_name}'")
-            column_sets.append(col_set)
+    # 检查重复索引和左前缀冗余索引
+    for finding in find_redundant_indexes(indexes):
+        suggestions.append(f"⚠️ 索引 '{finding['index']}' {finding['reason']}，建议删除")
     
+    if column_stats is not None:
+        suggestions.extend(suggest_indexes_by_selectivity(indexes, columns, column_stats))
+        return suggestions
+
     # 检查外键字段是否有索引
     for col in columns:
         field_name = col['Field']
@@ -202,13 +489,17 @@ def analyze_indexes(indexes: List[Dict], columns: List[Dict]) -> List[str]:
     return suggestions
 
 @mcp.tool()
-def analyze_table_design(database_name: str, table_name: str) -> str:
+@engine.offload()
+def analyze_table_design(database_name: str, table_name: str, sample_data: bool = False,
+                         use_workload: bool = False) -> str:
     """
     分析数据库表设计，提供专业的评判和优化建议，可以分析用户传入的表结构设计如何
     
     Args:
         database_name: 数据库名称
         table_name: 表名称
+        sample_data: 是否采样表数据，按字段实际选择性给出索引建议（有界采样，大表同样适用）
+        use_workload: 是否结合 performance_schema 中的实际查询负载给出索引建议
         
     Returns:
         str: 详细的表设计分析报告
@@ -256,8 +547,25 @@ def analyze_table_design(database_name: str, table_name: str) -> str:
             analysis_result.append("  ✅ 数据类型选择合理")
         
         # 索引设计分析
-        index_suggestions = analyze_indexes(indexes, columns)
-        analysis_result.append(f"\n🚀 索引设计分析:")
+        column_stats = None
+        if sample_data:
+            column_stats, _ = collect_column_stats(database_name, table_name, table_info)
+        workload = None
+        workload_note = None
+        if use_workload:
+            try:
+                digests, _ = load_workload(database_name)
+                candidates = build_workload_candidates(digests, {table_name: table_info})
+                workload = (candidates.get(table_name, []),
+                            sum(digest['total_latency'] for digest in digests))
+            except Exception as e:
+                logger.warning(f"无法读取查询负载: {e}")
+                workload_note = f"  💡 无法读取 performance_schema 查询负载（{e}），仅基于表结构分析"
+        index_suggestions = analyze_indexes(indexes, columns, column_stats, workload)
+        basis = [name for name, enabled in (("数据采样", sample_data), ("实际负载", workload is not None)) if enabled]
+        analysis_result.append(f"\n🚀 索引设计分析{'（基于' + '、'.join(basis) + '）' if basis else ''}:")
+        if workload_note:
+            analysis_result.append(workload_note)
         if index_suggestions:
             for suggestion in index_suggestions:
                 analysis_result.append(f"  {suggestion}")
@@ -287,6 +595,7 @@ def analyze_table_design(database_name: str, table_name: str) -> str:
         return f"❌ 表设计分析失败: {str(e)}"
 
 @mcp.tool()
+@engine.offload()
 def get_table_structure_info(database_name: str, table_name: str) -> str:
     """
     获取表的详细结构信息，包括字段、索引、约束等
@@ -363,6 +672,7 @@ def get_table_structure_info(database_name: str, table_name: str) -> str:
         return f"❌ 获取表结构信息失败: {str(e)}"
 
 @mcp.tool()
+@engine.offload()
 def check_table_performance_issues(database_name: str, table_name: str) -> str:
     """
     检查表的性能问题并提供优化建议
@@ -451,6 +761,711 @@ def check_table_performance_issues(database_name: str, table_name: str) -> str:
         logger.error(f"性能分析失败: {e}")
         return f"❌ 性能分析失败: {str(e)}"
 
+@mcp.tool()
+@engine.offload()
+def analyze_query_workload(database_name: str, top_n: int = 10, order_by: str = "latency",
+                           slow_log_path: str = "") -> str:
+    """
+    分析数据库的实际查询负载：从 performance_schema 语句摘要（或本地慢查询日志）中找出最耗时的查询，
+    识别扫描行数远多于返回行数、未使用索引、磁盘临时表等问题，按表汇总，并根据查询条件推荐缺失的索引
+
+    Args:
+        database_name: 数据库名称
+        top_n: 展示的语句数量，默认10
+        order_by: 排序方式: latency（总耗时，默认）、examined（扫描行数）、ratio（扫描/返回行数比）、tmp（临时表使用）
+        slow_log_path: 可选，慢查询日志文件路径，相对路径基于 MYSQL_SLOW_LOG_DIR；未提供时读取 performance_schema
+
+    Returns:
+        str: 负载分析报告
+    """
+    try:
+        if order_by not in DIGEST_ORDERS:
+            return f"❌ 负载分析失败: 不支持的排序方式 '{order_by}'，可选值: {', '.join(DIGEST_ORDERS)}"
+
+        try:
+            digests, source = load_workload(database_name, slow_log_path)
+        except ValueError as e:
+            return f"❌ 负载分析失败: {e}"
+        except OSError as e:
+            return f"❌ 负载分析失败: 无法读取慢查询日志: {e}"
+        except pymysql.Error as e:
+            logger.warning(f"无法读取 performance_schema 语句摘要: {e}")
+            return (f"❌ 负载分析失败: 无法读取 performance_schema 语句摘要（{e}）\n"
+                    f"💡 请确认 performance_schema 已开启且当前用户有 SELECT 权限，或通过 slow_log_path 指定慢查询日志文件")
+        if not digests:
+            return f"📋 {source} 中没有数据库 {database_name} 的查询记录"
+
+        total_latency = sum(digest['total_latency'] for digest in digests)
+        total_count = sum(digest['count'] for digest in digests)
+        top = rank_digests(digests, order_by, max(1, top_n))
+
+        result = [f"📈 查询负载分析: {database_name}"]
+        result.append(f"  • 数据来源: {source}")
+        result.append(f"  • 语句类型: {len(digests)} 类，执行 {total_count} 次，总耗时 {format_latency(total_latency)}")
+        result.append("=" * 80)
+
+        result.append(f"\n🐢 按{DIGEST_ORDERS[order_by][0]}排序的前 {len(top)} 类语句:")
+        for i, digest in enumerate(top, 1):
+            count = max(1, digest['count'])
+            share = digest['total_latency'] / total_latency if total_latency > 0 else 0.0
+            result.append(f"\n  #{i} 总耗时 {format_latency(digest['total_latency'])} ({share:.1%}), "
+                          f"执行 {digest['count']} 次, 平均 {format_latency(digest['total_latency'] / count)}, "
+                          f"最长 {format_latency(digest['max_latency'])}")
+            result.append(f"     扫描 {digest['rows_examined']} 行 / 返回 {digest['rows_sent']} 行 / "
+                          f"修改 {digest['rows_affected']} 行 (扫描/返回比 {examined_ratio(digest):.1f})")
+            tables = list(dict.fromkeys(extract_tables(digest['text'] or '').values()))
+            if tables:
+                result.append(f"     涉及表: {', '.join(tables)}")
+            text = digest['text'] or ''
+            result.append(f"     SQL: {text if len(text) <= 300 else text[:299] + '…'}")
+            result.extend(f"     {finding}" for finding in digest_findings(digest))
+
+        # 按表汇总和候选索引只针对当前数据库中实际存在的表
+        metadata = load_database_metadata(database_name)
+        table_summary = workload_by_table(digests, metadata)
+        if table_summary:
+            result.append("\n📊 按表汇总（按总耗时排序）:")
+            for table, item in sorted(table_summary.items(), key=lambda entry: -entry[1]['latency'])[:10]:
+                result.append(f"  • {table}: {item['digests']} 类语句, 执行 {item['count']} 次, "
+                              f"总耗时 {format_latency(item['latency'])}, 扫描 {item['rows_examined']} 行")
+
+        candidates = build_workload_candidates(digests, metadata)
+        ranked = sorted((candidate for items in candidates.values() for candidate in items),
+                        key=lambda candidate: -candidate['latency'])
+        result.append("\n🚀 基于实际负载的索引建议:")
+        if ranked:
+            result.extend(f"  {suggestion}" for suggestion in suggest_indexes_from_workload(ranked, total_latency, 10))
+            result.append("  💡 创建前可使用 explain_query 验证执行计划，并结合 analyze_column_selectivity 确认字段选择性")
+        else:
+            result.append("  ✅ 负载中的过滤和排序字段都已有可用的索引")
+
+        logger.info(f"成功分析查询负载: {database_name}，{len(digests)} 类语句")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"负载分析失败: {e}")
+        return f"❌ 负载分析失败: {str(e)}"
+
+@mcp.tool()
+@engine.offload()
+def analyze_column_selectivity(database_name: str, table_name: str, columns: str = "",
+                               sample_rows: int = 0, top_k: int = 5) -> str:
+    """
+    采样分析表中字段的数据分布（不同值数量、NULL比例、高频值），并按选择性给出索引建议。
+    采样行数固定，大表按主键范围采样，不会全表扫描
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        columns: 要分析的字段，逗号分隔，默认所有字段（TEXT/BLOB/JSON 字段不参与采样）
+        sample_rows: 采样行数，默认使用服务器配置（MYSQL_SAMPLE_ROWS）
+        top_k: 每个字段统计的高频值数量
+
+    Returns:
+        str: 字段分布和索引建议报告
+    """
+    try:
+        table_info = get_table_detailed_info(database_name, table_name)
+        if not table_info['columns']:
+            return f"❌ 表 {table_name} 不存在或无法访问"
+
+        selected = [col.strip() for col in columns.split(',') if col.strip()] or None
+        if selected:
+            known = {col['Field'] for col in table_info['columns']}
+            unknown = [col for col in selected if col not in known]
+            if unknown:
+                return f"❌ 字段不存在: {', '.join(unknown)}"
+
+        start = time.perf_counter()
+        stats, method = collect_column_stats(database_name, table_name, table_info, selected,
+                                             sample_rows, max(1, top_k))
+        elapsed = time.perf_counter() - start
+        if not stats:
+            return f"📋 表 {database_name}.{table_name} 没有可采样的字段"
+
+        sample_size = next(iter(stats.values()))['sample_size']
+        method_desc = {
+            'full': "全量读取（结果精确）",
+            'pk-range': "主键范围随机采样",
+            'first-n': "读取前N行（无整数主键，结果可能有偏差）",
+        }[method]
+
+        result = [f"📊 字段选择性分析: {database_name}.{table_name}"]
+        result.append(f"  • 采样方式: {method_desc}")
+        result.append(f"  • 采样行数: {sample_size}，耗时 {elapsed:.2f}s")
+        result.append("=" * 90)
+        result.extend(format_column_stats(stats))
+        result.append("=" * 90)
+
+        suggestions = suggest_indexes_by_selectivity(table_info['indexes'], table_info['columns'], stats)
+        result.append("\n🚀 基于选择性的索引建议:")
+        if suggestions:
+            result.extend(f"  {suggestion}" for suggestion in suggestions)
+        else:
+            result.append("  ✅ 未发现需要调整的索引")
+
+        logger.info(f"成功分析字段选择性: {database_name}.{table_name} ({method}, {sample_size} 行)")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"字段选择性分析失败: {e}")
+        return f"❌ 字段选择性分析失败: {str(e)}"
+
+# 精确计数的超时时间（秒），0表示不限制
+EXACT_COUNT_TIMEOUT = float(os.getenv('MYSQL_EXACT_COUNT_TIMEOUT', '300'))
+
+def count_rows_by_pk_ranges(database_name: str, table_name: str, pk_column: str, chunks: int, workers: int,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, int]:
+    """
+    按整数主键把表切分为若干区间，并行执行 COUNT(*) 后求和
+
+    每个区间在独立的连接上沿主键索引做范围扫描，区间按主键取值等宽划分。
+
+    Returns:
+        Tuple[int, int]: (精确行数, 实际区间数)
+    """
+    with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(`{pk_column}`), MAX(`{pk_column}`) FROM `{table_name}`")
+        low, high = cursor.fetchone()
+    if low is None:
+        return 0, 0
+
+    low, high = int(low), int(high)
+    step = max(1, -(-(high - low + 1) // max(1, chunks)))
+    ranges = [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+    def count_range(start: int, end: int) -> int:
+        with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM `{table_name}` WHERE `{pk_column}` BETWEEN %s AND %s",
+                           (start, end))
+            return int(cursor.fetchone()[0])
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mysql-count') as executor:
+        # 复制上下文，使工作线程的连接也登记到当前工具调用，超时时可以被终止
+        futures = [executor.submit(contextvars.copy_context().run, count_range, start, end)
+                   for start, end in ranges]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                total += future.result()
+                if progress is not None:
+                    progress(done, len(ranges))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return total, len(ranges)
+
+def count_rows_full(database_name: str, table_name: str) -> int:
+    """没有整数主键时退化为单条 COUNT(*)"""
+    with get_mysql_connection(database_name) as connection, connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM `{table_name}`")
+        return int(cursor.fetchone()[0])
+
+@mcp.tool()
+async def table_stats(database_name: str, table_name: str, exact: bool = False, chunks: int = 0,
+                      max_workers: int = 4, ctx: Context = None) -> str:
+    """
+    查看表的大小：估算行数、数据大小、索引大小和平均行长度，直接读取统计信息，不扫描表。
+    需要了解表有多大时使用此工具，不要用 COUNT(*) 查询。需要精确行数时传 exact=true
+
+    Args:
+        database_name: 数据库名称
+        table_name: 表名称
+        exact: 是否精确计数，按主键区间并行执行 COUNT(*)，大表耗时较长
+        chunks: 精确计数的区间数，默认为并行数的4倍
+        max_workers: 精确计数的并行连接数，默认4，受连接池大小限制
+
+    Returns:
+        str: 表的行数和存储空间统计
+    """
+    try:
+        table_info = await engine.run(get_table_detailed_info, database_name, table_name)
+        status = table_info['table_status']
+        if not table_info['columns'] or not status:
+            return f"❌ 表 {table_name} 不存在或无法访问"
+
+        estimated_rows = int(status.get('Rows') or 0)
+        data_length = int(status.get('Data_length') or 0)
+        index_length = int(status.get('Index_length') or 0)
+        data_free = int(status.get('Data_free') or 0)
+
+        result = [f"📊 表统计信息: {database_name}.{table_name}"]
+        result.append("=" * 50)
+        result.append(f"  • 存储引擎: {status.get('Engine', 'Unknown')}")
+        result.append(f"  • 估算行数: {estimated_rows}")
+        result.append(f"  • 平均行长度: {int(status.get('Avg_row_length') or 0)} bytes")
+        result.append(f"  • 数据大小: {format_bytes(data_length)}")
+        result.append(f"  • 索引大小: {format_bytes(index_length)}")
+        result.append(f"  • 总大小: {format_bytes(data_length + index_length)}")
+        if data_free:
+            result.append(f"  • 可回收空间: {format_bytes(data_free)}")
+        if status.get('Auto_increment') is not None:
+            result.append(f"  • 下一个自增值: {status['Auto_increment']}")
+        if status.get('Update_time'):
+            result.append(f"  • 最近更新时间: {status['Update_time']}")
+
+        index_sizes = await engine.run(load_index_sizes, database_name)
+        table_index_sizes = sorted(((index, size) for (table, index), size in (index_sizes or {}).items()
+                                    if table == table_name), key=lambda item: -item[1])
+        if table_index_sizes:
+            result.append(f"\n🚀 各索引大小:")
+            result.extend(f"  • {index}: {format_bytes(size)}" for index, size in table_index_sizes)
+
+        if exact:
+            primary = primary_integer_column(table_info)
+            workers = max(1, min(max_workers, pool_manager.get_pool(database_name).max_size))
+            loop = asyncio.get_running_loop()
+
+            def progress(done: int, total: int) -> None:
+                if ctx is not None:
+                    asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total), loop)
+
+            start = time.perf_counter()
+            if primary is not None:
+                exact_rows, used_chunks = await engine.run(
+                    count_rows_by_pk_ranges, database_name, table_name, primary,
+                    chunks if chunks > 0 else workers * 4, workers, progress, timeout=EXACT_COUNT_TIMEOUT)
+                method = f"按主键 `{primary}` 分 {used_chunks} 个区间，{workers} 个连接并行计数"
+            else:
+                exact_rows = await engine.run(count_rows_full, database_name, table_name,
+                                              timeout=EXACT_COUNT_TIMEOUT)
+                method = "没有整数主键，使用单条 COUNT(*)"
+            elapsed = time.perf_counter() - start
+
+            result.append(f"\n🔢 精确行数: {exact_rows}")
+            result.append(f"  • 计数方式: {method}，耗时 {elapsed:.2f}s")
+            if exact_rows:
+                result.append(f"  • 估算误差: {(estimated_rows - exact_rows) / exact_rows:+.1%}")
+        else:
+            result.append("\n💡 行数为存储引擎统计信息的估算值（InnoDB 误差可能达到 40%），需要精确行数时传 exact=true")
+
+        logger.info(f"成功获取表统计信息: {database_name}.{table_name}{' (精确计数)' if exact else ''}")
+        return "\n".join(result)
+
+    except QueryTimeoutError as e:
+        logger.error(f"精确计数超时: {e}")
+        return f"❌ 获取表统计信息失败: 精确计数超时 ({e})，已终止服务端查询，可使用估算行数"
+    except Exception as e:
+        logger.error(f"获取表统计信息失败: {e}")
+        return f"❌ 获取表统计信息失败: {str(e)}"
+
+def load_database_metadata(database_name: str, table_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    通过三条 information_schema 查询一次性获取整个数据库的字段、索引和表状态
+
+    返回结构与 get_table_detailed_info 保持一致（字段名同 DESCRIBE / SHOW INDEX / SHOW TABLE STATUS），
+    可直接交给 analyze_naming_conventions、analyze_data_types、analyze_indexes 使用。
+
+    Args:
+        database_name: 数据库名称
+        table_name: 可选，只读取指定表
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 表名 -> {'columns', 'indexes', 'table_status'}
+    """
+    table_filter = " AND TABLE_NAME = %s" if table_name else ""
+    params = (database_name, table_name) if table_name else (database_name,)
+    with get_mysql_connection() as connection, connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(
+            "SELECT TABLE_NAME, ENGINE, TABLE_COLLATION, TABLE_ROWS, AVG_ROW_LENGTH, "
+            "DATA_LENGTH, INDEX_LENGTH, DATA_FREE, AUTO_INCREMENT, CREATE_TIME, UPDATE_TIME "
+            "FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'{table_filter} ORDER BY TABLE_NAME",
+            params
+        )
+        tables = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA "
+            f"FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s{table_filter} "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            params
+        )
+        columns = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT TABLE_NAME, NON_UNIQUE, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, "
+            "CARDINALITY, SUB_PART, NULLABLE, INDEX_TYPE "
+            f"FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s{table_filter} "
+            "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            params
+        )
+        statistics = cursor.fetchall()
+
+    metadata: Dict[str, Dict[str, Any]] = {}
+    for table in tables:
+        metadata[table['TABLE_NAME']] = {
+            'columns': [],
+            'indexes': [],
+            'table_status': {
+                'Name': table['TABLE_NAME'],
+                'Engine': table['ENGINE'],
+                'Collation': table['TABLE_COLLATION'],
+                'Rows': table['TABLE_ROWS'],
+                'Avg_row_length': table['AVG_ROW_LENGTH'],
+                'Data_length': table['DATA_LENGTH'],
+                'Index_length': table['INDEX_LENGTH'],
+                'Data_free': table['DATA_FREE'],
+                'Auto_increment': table['AUTO_INCREMENT'],
+                'Create_time': table['CREATE_TIME'],
+                'Update_time': table['UPDATE_TIME'],
+            },
+        }
+
+    for col in columns:
+        table_info = metadata.get(col['TABLE_NAME'])
+        if table_info is not None:
+            table_info['columns'].append({
+                'Field': col['COLUMN_NAME'],
+                'Type': col['COLUMN_TYPE'],
+                'Null': col['IS_NULLABLE'],
+                'Key': col['COLUMN_KEY'] or '',
+                'Default': col['COLUMN_DEFAULT'],
+                'Extra': col['EXTRA'] or '',
+            })
+
+    for idx in statistics:
+        table_info = metadata.get(idx['TABLE_NAME'])
+        if table_info is not None:
+            table_info['indexes'].append({
+                'Table': idx['TABLE_NAME'],
+                'Non_unique': int(idx['NON_UNIQUE']),
+                'Key_name': idx['INDEX_NAME'],
+                'Seq_in_index': idx['SEQ_IN_INDEX'],
+                'Column_name': idx['COLUMN_NAME'],
+                'Cardinality': idx['CARDINALITY'],
+                'Sub_part': idx['SUB_PART'],
+                'Null': idx['NULLABLE'],
+                'Index_type': idx['INDEX_TYPE'],
+            })
+
+    return metadata
+
+# 问题严重程度权重，按建议前缀的图标区分
+ISSUE_WEIGHTS = {"❌": 3, "⚠️": 2, "💡": 1}
+
+def issue_weight(issue: str) -> int:
+    """根据问题前缀图标返回严重程度权重"""
+    for prefix, weight in ISSUE_WEIGHTS.items():
+        if issue.startswith(prefix):
+            return weight
+    return 1
+
+def analyze_table_metadata(table_name: str, table_info: Dict[str, Any]) -> Dict[str, List[str]]:
+    """对单个表运行命名、数据类型和索引分析，返回各维度的问题列表"""
+    columns = table_info['columns']
+    return {
+        'naming': analyze_naming_conventions(table_name, columns),
+        'datatype': analyze_data_types(columns),
+        'index': analyze_indexes(table_info['indexes'], columns),
+    }
+
+def format_table_findings(table_name: str, score: int, issues: List[str]) -> List[str]:
+    """格式化单个表的问题列表，问题按严重程度排序"""
+    lines = [f"  📌 {table_name} (严重程度得分: {score}, 问题数: {len(issues)})"]
+    if not issues:
+        lines.append("    ✅ 设计良好，没有发现明显问题")
+    for issue in sorted(issues, key=lambda item: -issue_weight(item)):
+        lines.append(f"    {issue}")
+    return lines
+
+@mcp.tool()
+@engine.offload()
+def analyze_database_design(database_name: str, top_n: int = 20) -> str:
+    """
+    一次性分析整个数据库所有表的设计，按问题严重程度排序输出汇总报告。
+    只需3次元数据查询，适合审计包含大量表的数据库，无需逐表调用 analyze_table_design
+
+    Args:
+        database_name: 数据库名称
+        top_n: 详细列出问题最严重的前N个表，默认20
+
+    Returns:
+        str: 按表排序的数据库设计分析汇总报告
+    """
+    try:
+        metadata = load_database_metadata(database_name)
+        if not metadata:
+            return f"❌ 数据库 {database_name} 不存在或没有表"
+
+        table_reports = []
+        category_counts = {'naming': 0, 'datatype': 0, 'index': 0}
+        issue_type_counts: Dict[str, int] = {}
+        for table_name, table_info in metadata.items():
+            findings = analyze_table_metadata(table_name, table_info)
+            issues = [issue for category in findings.values() for issue in category]
+            for category, category_issues in findings.items():
+                category_counts[category] += len(category_issues)
+            for issue in issues:
+                # 去掉具体字段名，按问题类型聚合
+                issue_type = re.sub(r"'[^']*'", "'*'", issue)
+                issue_type = re.sub(r"\d+", "N", issue_type)
+                issue_type_counts[issue_type] = issue_type_counts.get(issue_type, 0) + 1
+            score = sum(issue_weight(issue) for issue in issues)
+            table_reports.append((score, table_name, issues))
+
+        table_reports.sort(key=lambda item: (-item[0], item[1]))
+        total_issues = sum(category_counts.values())
+        clean_tables = sum(1 for score, _, _ in table_reports if score == 0)
+
+        result = [f"🔍 数据库设计分析报告: {database_name}"]
+        result.append("=" * 60)
+        result.append(f"\n📊 总体概况:")
+        result.append(f"  • 表数量: {len(metadata)}")
+        result.append(f"  • 无问题的表: {clean_tables}")
+        result.append(f"  • 发现问题/建议总数: {total_issues}")
+        result.append(f"  • 命名规范: {category_counts['naming']} | 数据类型: {category_counts['datatype']} "
+                      f"| 索引设计: {category_counts['index']}")
+
+        if issue_type_counts:
+            result.append(f"\n📋 最常见的问题:")
+            common = sorted(issue_type_counts.items(), key=lambda item: (-issue_weight(item[0]), -item[1]))
+            for issue_type, count in common[:10]:
+                result.append(f"  {issue_type} ×{count}")
+
+        problem_tables = [report for report in table_reports if report[0] > 0]
+        if problem_tables:
+            result.append(f"\n🚨 问题最严重的表 (前 {min(top_n, len(problem_tables))} 个，按严重程度排序):")
+            for score, table_name, issues in problem_tables[:top_n]:
+                result.append("")
+                result.extend(format_table_findings(table_name, score, issues))
+            if len(problem_tables) > top_n:
+                result.append(f"\n  • ... 其余 {len(problem_tables) - top_n} 个有问题的表已省略")
+        else:
+            result.append("\n🌟 优秀! 所有表设计都很规范，没有发现明显问题")
+
+        logger.info(f"成功分析数据库设计: {database_name}，共 {len(metadata)} 个表")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"数据库设计分析失败: {e}")
+        return f"❌ 数据库设计分析失败: {str(e)}"
+
+@mcp.tool()
+@engine.offload()
+def detect_redundant_indexes(database_name: str, table_name: str = "") -> str:
+    """
+    检测重复索引、左前缀冗余索引和未使用的索引，估算删除后节省的空间和写入开销，并生成 DROP INDEX 语句
+
+    Args:
+        database_name: 数据库名称
+        table_name: 可选，只检测指定表，默认检测整个数据库
+
+    Returns:
+        str: 冗余索引报告和对应的DDL语句
+    """
+    try:
+        metadata = load_database_metadata(database_name, table_name or None)
+        if not metadata:
+            target = f"{database_name}.{table_name}" if table_name else database_name
+            return f"❌ {target} 不存在或没有表"
+
+        usage = load_index_usage(database_name)
+        sizes = load_index_sizes(database_name)
+
+        result = [f"🔍 冗余索引检测: {database_name}" + (f".{table_name}" if table_name else "")]
+        result.append("=" * 60)
+        ddl = []
+        total_space = 0
+        total_findings = 0
+
+        for name, table_info in metadata.items():
+            indexes = table_info['indexes']
+            if not indexes:
+                continue
+            grouped = group_indexes(indexes)
+            findings = find_redundant_indexes(indexes)
+            # 已判定冗余的索引，以及替代冗余索引的覆盖索引，不再参与未使用检测
+            skipped = {finding['index'] for finding in findings} | {finding['covered_by'] for finding in findings}
+
+            # 自服务器启动以来从未被读取过的索引
+            if usage is not None:
+                for index_name, info in grouped.items():
+                    stats = usage.get((name, index_name))
+                    if index_name == 'PRIMARY' or index_name in skipped or stats is None:
+                        continue
+                    if stats['reads'] == 0:
+                        findings.append({'index': index_name, 'covered_by': None, 'kind': 'unused',
+                                         'reason': "自服务器启动以来从未被读取"})
+            if not findings:
+                continue
+
+            column_types = {col['Field']: col['Type'] for col in table_info['columns']}
+            pk_bytes = sum(estimate_column_bytes(column_types.get(col, 'int'), sub_part)
+                           for col, sub_part in grouped.get('PRIMARY', {'columns': []})['columns']) or 6
+            rows = int(table_info['table_status'].get('Rows') or 0)
+            index_count = len(grouped)
+
+            result.append(f"\n📌 表 {name} (约 {rows} 行, {index_count} 个索引)")
+            drops = []
+            for finding in findings:
+                index_name = finding['index']
+                columns_str = ", ".join(col if not sub_part else f"{col}({sub_part})"
+                                        for col, sub_part in grouped[index_name]['columns'])
+                label = {'duplicate': "重复索引", 'left-prefix': "冗余索引", 'unused': "未使用索引"}[finding['kind']]
+                result.append(f"  ⚠️ {label} '{index_name}' ({columns_str}): {finding['reason']}")
+
+                # 空间估算：优先使用InnoDB实际统计，否则按 行数 × (索引字段 + 主键 + 行开销) 估算
+                actual = sizes.get((name, index_name)) if sizes is not None else None
+                if actual is not None:
+                    space = actual
+                    space_note = "实际"
+                else:
+                    key_bytes = sum(estimate_column_bytes(column_types.get(col, 'int'), sub_part)
+                                    for col, sub_part in grouped[index_name]['columns'])
+                    space = int(rows * (key_bytes + pk_bytes + 13) * 1.4)
+                    space_note = "估算"
+                write_note = f"每次INSERT/DELETE少维护1棵B+树（约占该表索引维护开销的 {1 / index_count:.0%}）"
+                stats = usage.get((name, index_name)) if usage is not None else None
+                if stats is not None and stats['writes']:
+                    write_note += f"，启动以来该索引写入 {stats['writes']} 次"
+                result.append(f"    💾 可节省空间({space_note}): {format_bytes(space)}")
+                result.append(f"    ✏️ 写入开销: {write_note}")
+                total_findings += 1
+                if finding['kind'] == 'unused' and grouped[index_name]['unique']:
+                    # 唯一索引承担约束，不自动生成删除语句
+                    result.append("    💡 唯一索引承担唯一性约束，未包含在删除语句中，请确认业务不依赖后手动处理")
+                    continue
+                total_space += space
+                drops.append(f"DROP INDEX `{index_name}`")
+
+            # 同一张表的多个删除合并为一条ALTER，只重建一次
+            if drops:
+                ddl.append(f"ALTER TABLE `{database_name}`.`{name}` {', '.join(drops)};")
+
+        if total_findings == 0:
+            result.append("\n✅ 未发现重复、冗余或未使用的索引")
+        else:
+            result.append(f"\n📈 汇总: 发现 {total_findings} 个问题索引，删除语句预计节省空间 {format_bytes(total_space)}")
+            if ddl:
+                result.append("\n📝 删除语句（执行前请在测试环境验证查询计划）:")
+                result.append("```sql\n" + "\n".join(ddl) + "\n```")
+        if usage is None:
+            result.append("\n💡 performance_schema 不可用，未检测未使用的索引")
+        else:
+            result.append("\n💡 未使用索引基于服务器启动以来的统计，启动时间较短时请谨慎判断")
+
+        logger.info(f"成功检测冗余索引: {database_name}，发现 {total_findings} 个")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"冗余索引检测失败: {e}")
+        return f"❌ 冗余索引检测失败: {str(e)}"
+
+def resolve_table_patterns(database_name: str, tables: str) -> List[str]:
+    """
+    将逗号分隔的表名或通配符（如 "order_*, users"）解析为数据库中实际存在的表
+
+    Returns:
+        List[str]: 按出现顺序去重后的表名列表
+    """
+    patterns = [pattern.strip() for pattern in tables.split(',') if pattern.strip()]
+    with get_mysql_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_NAME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME",
+            (database_name,)
+        )
+        existing = [row[0] for row in cursor.fetchall()]
+
+    matched: Dict[str, None] = {}
+    for pattern in patterns or ['*']:
+        for table_name in existing:
+            if fnmatch.fnmatchcase(table_name, pattern):
+                matched[table_name] = None
+    return list(matched)
+
+def _analyze_single_table(database_name: str, table_name: str) -> Tuple[int, List[str]]:
+    """读取单个表的元数据并运行所有分析器，返回严重程度得分和问题列表"""
+    table_info = get_table_detailed_info(database_name, table_name)
+    if not table_info['columns']:
+        return 0, [f"❌ 表 {table_name} 不存在或无法访问"]
+    findings = analyze_table_metadata(table_name, table_info)
+    issues = [issue for category in findings.values() for issue in category]
+    return sum(issue_weight(issue) for issue in issues), issues
+
+@mcp.tool()
+async def analyze_tables_parallel(database_name: str, tables: str = "*", max_workers: int = 4,
+                                  deadline_seconds: float = 60, ctx: Context = None) -> str:
+    """
+    并发分析多个表的设计。表名支持逗号分隔列表和通配符，如 "users, order_*"。
+    每个表分析完成后立即通过进度通知推送结果，超过总时限未完成的表会被取消
+
+    Args:
+        database_name: 数据库名称
+        tables: 表名列表或通配符，逗号分隔，默认 "*" 表示所有表
+        max_workers: 并发分析的表数量，默认4，受连接池大小限制
+        deadline_seconds: 总时限（秒），默认60
+
+    Returns:
+        str: 按完成顺序排列的各表分析结果
+    """
+    try:
+        start = time.monotonic()
+        table_names = await engine.run(resolve_table_patterns, database_name, tables)
+        if not table_names:
+            return f"❌ 数据库 {database_name} 中没有匹配 '{tables}' 的表"
+
+        # 并发数不超过连接池大小，避免工作线程在连接池上排队
+        workers = max(1, min(max_workers, pool_manager.get_pool(database_name).max_size))
+        semaphore = asyncio.Semaphore(workers)
+
+        async def analyze(table_name: str):
+            async with semaphore:
+                table_start = time.monotonic()
+                try:
+                    score, issues = await engine.run(_analyze_single_table, database_name, table_name,
+                                                     timeout=deadline_seconds)
+                except Exception as e:
+                    logger.error(f"分析表 {table_name} 失败: {e}")
+                    return table_name, None, [str(e)], time.monotonic() - table_start
+                return table_name, score, issues, time.monotonic() - table_start
+
+        tasks = [asyncio.ensure_future(analyze(table_name)) for table_name in table_names]
+        result = [f"🔍 并发表设计分析: {database_name} ({len(table_names)} 个表, 并发 {workers})"]
+        result.append("=" * 60)
+
+        completed = 0
+        failed = []
+        remaining = max(0.0, deadline_seconds - (time.monotonic() - start))
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=remaining):
+                table_name, score, issues, elapsed = await next_done
+                if score is None:
+                    failed.append(f"{table_name}: {issues[0]}")
+                    continue
+                completed += 1
+                lines = format_table_findings(table_name, score, issues)
+                lines[0] += f" [{elapsed * 1000:.0f}ms]"
+                result.append("")
+                result.extend(lines)
+                if ctx is not None:
+                    # 逐表推送结果，客户端无需等待全部完成
+                    await ctx.report_progress(completed, len(table_names))
+                    await ctx.info("\n".join(lines))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        unfinished = len(table_names) - completed - len(failed)
+        result.append("\n📈 汇总:")
+        result.append(f"  • 完成: {completed}/{len(table_names)} 个表, 总耗时 {time.monotonic() - start:.2f}s")
+        if failed:
+            result.append(f"  • 失败: {len(failed)} 个表 ({'; '.join(failed[:3])})")
+        if unfinished > 0:
+            result.append(f"  • ⏱️ 超过总时限 {deadline_seconds:g}s，{unfinished} 个表未完成分析已取消")
+
+        logger.info(f"并发分析完成: {database_name}，{completed}/{len(table_names)} 个表")
+        return "\n".join(result)
+
+    except Exception as e:
+        logger.error(f"并发表设计分析失败: {e}")
+        return f"❌ 并发表设计分析失败: {str(e)}"
+
 if __name__ == "__main__":
     # 启动MCP服务器
     mcp.run()
@@ -0,0 +1,256 @@
+"""
+表数据流式导出
+
+export_table 工具将整张表或查询结果写入本地文件，只把文件路径、行数和大小返回给大模型，
+数据本身不经过对话。导出使用服务端游标（SSCursor）逐批读取、逐批写入，内存占用与表大小无关。
+
+支持的格式：
+- csv: 首行为字段名，NULL 写为空字符串
+- ndjson: 每行一个JSON对象
+- parquet: 列式压缩格式，需要安装可选依赖 pyarrow
+
+导出参数可通过环境变量配置：MYSQL_EXPORT_DIR（导出目录，默认 ./exports，文件只能写在该目录中）、
+MYSQL_EXPORT_ALLOW_ANY_PATH（为true时允许写到导出目录之外）、
+MYSQL_EXPORT_CHUNK_ROWS（每批读取行数）、MYSQL_EXPORT_TIMEOUT（导出超时秒数，0表示不限制）
+"""
+
+import base64
+import csv
+import datetime
+import decimal
+import json
+import os
+from typing import Any, Optional, Sequence, Tuple
+
+from pymysql.constants import FIELD_TYPE
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖，仅 parquet 格式需要
+    pa = None
+    pq = None
+
+# 导出默认配置 - 从环境变量获取
+EXPORT_CONFIG = {
+    'dir': os.getenv('MYSQL_EXPORT_DIR', 'exports'),
+    'allow_any_path': os.getenv('MYSQL_EXPORT_ALLOW_ANY_PATH', 'false').lower() in ('1', 'true', 'yes'),
+    'chunk_rows': int(os.getenv('MYSQL_EXPORT_CHUNK_ROWS', '5000')),
+    'timeout': float(os.getenv('MYSQL_EXPORT_TIMEOUT', '600')),
+}
+
+# 支持的导出格式 -> 文件扩展名
+EXPORT_FORMATS = {"csv": ".csv", "ndjson": ".ndjson", "parquet": ".parquet"}
+
+
+def check_export_format(export_format: str) -> Optional[str]:
+    """校验导出格式，不支持或缺少依赖时返回错误消息"""
+    if export_format not in EXPORT_FORMATS:
+        return f"❌ 不支持的导出格式 '{export_format}'，可选值: {', '.join(EXPORT_FORMATS)}"
+    if export_format == "parquet" and pa is None:
+        return "❌ 导出 parquet 格式需要安装 pyarrow: pip install pyarrow"
+    return None
+
+
+def confine_path(file_path: str, base_dir: str, allow_any_path: bool = False) -> str:
+    """
+    将路径解析为基于 base_dir 的规范化绝对路径（展开 ~、.. 和符号链接）
+
+    Raises:
+        ValueError: 路径不在 base_dir 之内且未允许任意路径
+    """
+    base = os.path.realpath(base_dir)
+    path = os.path.realpath(os.path.join(base, os.path.expanduser(file_path)))
+    if not allow_any_path and os.path.commonpath([base, path]) != base:
+        raise ValueError(f"路径 {file_path} 不在允许的目录 {base} 之内")
+    return path
+
+
+def resolve_export_path(file_path: str, default_name: str, export_format: str) -> str:
+    """
+    确定导出文件的绝对路径并创建所在目录
+
+    未指定路径时使用默认文件名；相对路径基于 MYSQL_EXPORT_DIR；未带扩展名时补上格式对应的扩展名。
+
+    Raises:
+        ValueError: 路径在导出目录之外且未设置 MYSQL_EXPORT_ALLOW_ANY_PATH
+    """
+    path = file_path.strip() or default_name
+    if not os.path.splitext(path)[1]:
+        path += EXPORT_FORMATS[export_format]
+    path = confine_path(path, EXPORT_CONFIG['dir'], EXPORT_CONFIG['allow_any_path'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _text_value(value: Any) -> Any:
+    """CSV/NDJSON 中的值转换：二进制写为base64，时间差写为 HH:MM:SS"""
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, datetime.timedelta):
+        total = int(value.total_seconds())
+        sign = '-' if total < 0 else ''
+        hours, remainder = divmod(abs(total), 3600)
+        return f"{sign}{hours:02d}:{remainder // 60:02d}:{remainder % 60:02d}"
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    """NDJSON 中无法直接编码的类型"""
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return str(_text_value(value))
+
+
+class CSVExportWriter:
+    """CSV 写入器"""
+
+    def __init__(self, handle, columns: Sequence[str], description: Sequence[tuple]):
+        self._writer = csv.writer(handle, lineterminator='\n')
+        self._writer.writerow(columns)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._writer.writerows(['' if value is None else _text_value(value) for value in row] for row in rows)
+
+    def close(self) -> None:
+        pass
+
+
+class NDJSONExportWriter:
+    """NDJSON 写入器，每行一个JSON对象"""
+
+    def __init__(self, handle, columns: Sequence[str], description: Sequence[tuple]):
+        self._handle = handle
+        self._columns = list(columns)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._handle.write(''.join(
+            json.dumps(dict(zip(self._columns, (_text_value(value) for value in row))),
+                       ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+            for row in rows
+        ))
+
+    def close(self) -> None:
+        pass
+
+
+def _arrow_type(type_code: int, precision: Optional[int], scale: Optional[int], sample: Any):
+    """根据MySQL字段类型确定Parquet列类型，字符串类字段根据首个非NULL值区分文本和二进制"""
+    if type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24,
+                     FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR):
+        return pa.int64()
+    if type_code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE):
+        return pa.float64()
+    if type_code in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL) and precision:
+        # description 中的长度包含小数点（有符号时还包含符号位），去掉小数点后不会低估位数
+        digits = precision - (1 if scale else 0)
+        if digits <= 38:
+            return pa.decimal128(max(digits, scale or 0, 1), scale or 0)
+    if type_code in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE):
+        return pa.date32()
+    if type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return pa.timestamp('us')
+    if type_code == FIELD_TYPE.TIME:
+        return pa.duration('us')
+    if isinstance(sample, (bytes, bytearray)):
+        return pa.binary()
+    return pa.string()
+
+
+class ParquetExportWriter:
+    """Parquet 写入器，每批数据写为一个行组"""
+
+    def __init__(self, handle, columns: Sequence[str], description: Sequence[tuple]):
+        self._handle = handle
+        self._columns = list(columns)
+        self._description = description
+        self._writer = None
+        self._schema_arrow = None
+
+    def _schema(self, rows: Sequence[Sequence[Any]]):
+        fields = []
+        for position, (name, desc) in enumerate(zip(self._columns, self._description)):
+            sample = next((row[position] for row in rows if row[position] is not None), None)
+            fields.append(pa.field(name, _arrow_type(desc[1], desc[4], desc[5], sample)))
+        return pa.schema(fields)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        if self._writer is None:
+            self._schema_arrow = self._schema(rows)
+            self._writer = pq.ParquetWriter(self._handle, self._schema_arrow, compression='snappy')
+        schema = self._schema_arrow
+        arrays = []
+        for position, field in enumerate(schema):
+            values = [row[position] for row in rows]
+            if pa.types.is_string(field.type):
+                values = [None if value is None else str(_text_value(value)) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def close(self) -> None:
+        if self._writer is None:
+            # 空结果也写出只有表结构的文件
+            self._writer = pq.ParquetWriter(self._handle, self._schema([]), compression='snappy')
+        self._writer.close()
+
+
+_WRITERS = {"csv": CSVExportWriter, "ndjson": NDJSONExportWriter, "parquet": ParquetExportWriter}
+
+
+def stream_to_file(cursor, path: str, export_format: str, chunk_rows: int = 0) -> Tuple[int, int]:
+    """
+    将已执行查询的服务端游标结果逐批写入文件
+
+    先写入同目录下的 .part 临时文件，全部写完后再重命名，失败时删除临时文件，不会留下不完整的导出文件。
+
+    Args:
+        cursor: 已执行查询的 SSCursor
+        path: 目标文件路径
+        export_format: csv | ndjson | parquet
+        chunk_rows: 每批读取的行数，默认使用 MYSQL_EXPORT_CHUNK_ROWS
+
+    Returns:
+        Tuple[int, int]: (行数, 文件字节数)
+    """
+    chunk_rows = chunk_rows or EXPORT_CONFIG['chunk_rows']
+    description = cursor.description
+    columns = [desc[0] for desc in description]
+    temp_path = path + ".part"
+    row_count = 0
+    try:
+        if export_format == "parquet":
+            handle = open(temp_path, 'wb')
+        else:
+            handle = open(temp_path, 'w', encoding='utf-8', newline='')
+        with handle:
+            writer = _WRITERS[export_format](handle, columns, description)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    writer.write(rows)
+                    row_count += len(rows)
+            finally:
+                writer.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return row_count, os.path.getsize(path)
+
+
+def format_file_size(size: float) -> str:
+    """将字节数格式化为可读大小"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
@@ -0,0 +1,318 @@
+"""
+本地文件批量导入
+
+import_file 工具将 CSV 或 NDJSON 文件导入到表中，是 export_table 的逆操作：
+- 按 DESCRIBE 得到的表结构推断文件字段与表字段的对应关系，并在写入前抽样校验类型
+- CSV 文件优先使用 LOAD DATA LOCAL INFILE，由服务端一次性解析加载
+- 服务器或客户端未开启 local_infile、NDJSON 文件或 upsert 模式时，退化为并行的分批多行 INSERT
+
+与 export_table 的约定保持一致：CSV 中的空字符串表示 NULL，二进制字段使用base64编码。
+导入参数可通过环境变量配置：MYSQL_IMPORT_DIR（导入目录，默认与 MYSQL_EXPORT_DIR 相同，只能读取该目录中的文件）、
+MYSQL_IMPORT_ALLOW_ANY_PATH（为true时允许读取导入目录之外的文件）、MYSQL_IMPORT_BATCH_ROWS、MYSQL_IMPORT_WORKERS、
+MYSQL_IMPORT_TIMEOUT（秒，0表示不限制）、MYSQL_IMPORT_LOAD_DATA（是否尝试 LOAD DATA）
+"""
+
+import base64
+import csv
+import decimal
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from table_export import EXPORT_CONFIG, confine_path
+
+# 加载环境变量
+load_dotenv()
+
+# 导入默认配置 - 从环境变量获取
+IMPORT_CONFIG = {
+    'dir': os.getenv('MYSQL_IMPORT_DIR', '') or EXPORT_CONFIG['dir'],
+    'allow_any_path': os.getenv('MYSQL_IMPORT_ALLOW_ANY_PATH', 'false').lower() in ('1', 'true', 'yes'),
+    'batch_rows': int(os.getenv('MYSQL_IMPORT_BATCH_ROWS', '1000')),
+    'workers': int(os.getenv('MYSQL_IMPORT_WORKERS', '4')),
+    'timeout': float(os.getenv('MYSQL_IMPORT_TIMEOUT', '600')),
+    'load_data': os.getenv('MYSQL_IMPORT_LOAD_DATA', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+# 支持的导入格式 -> 文件扩展名
+IMPORT_FORMATS = {"csv": (".csv",), "ndjson": (".ndjson", ".jsonl", ".json")}
+
+# 写入前抽样校验的行数
+SAMPLE_VALIDATION_ROWS = 1000
+
+# 表示 LOAD DATA LOCAL 不可用的错误码：服务端禁止、客户端禁止、被拒绝
+LOCAL_INFILE_DISABLED_ERRORS = {1148, 2068, 3948, 3950}
+
+_INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year')
+_DECIMAL_TYPES = ('decimal', 'numeric', 'float', 'double', 'real')
+_BINARY_TYPES = ('binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob')
+_TEXT_TYPES = ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext', 'enum', 'set')
+
+
+class LoadDataUnavailable(Exception):
+    """当前环境无法使用 LOAD DATA LOCAL INFILE"""
+
+
+class ColumnSpec:
+    """表字段的导入规则，由 DESCRIBE 结果生成"""
+
+    __slots__ = ('name', 'base_type', 'nullable', 'has_default', 'auto_increment')
+
+    def __init__(self, name: str, column_type: str, nullable: bool, default: Any, extra: str):
+        match = re.match(r'[a-z]+', column_type.lower())
+        self.name = name
+        self.base_type = match.group(0) if match else column_type.lower()
+        self.nullable = nullable
+        self.auto_increment = 'auto_increment' in (extra or '').lower()
+        # DEFAULT_GENERATED 表示表达式默认值（如 CURRENT_TIMESTAMP）
+        self.has_default = default is not None or 'default_generated' in (extra or '').lower()
+
+    @property
+    def required(self) -> bool:
+        """插入时必须提供值的字段"""
+        return not (self.nullable or self.has_default or self.auto_increment)
+
+    @property
+    def binary(self) -> bool:
+        return self.base_type in _BINARY_TYPES
+
+
+def build_column_specs(describe_rows: Sequence[Sequence[Any]]) -> Dict[str, ColumnSpec]:
+    """根据 DESCRIBE 结果（Field, Type, Null, Key, Default, Extra）生成字段规则"""
+    return {row[0]: ColumnSpec(row[0], row[1], row[2] == 'YES', row[4], row[5]) for row in describe_rows}
+
+
+def detect_import_format(path: str, file_format: str = "") -> Optional[str]:
+    """根据参数或文件扩展名确定导入格式，无法确定时返回None"""
+    if file_format:
+        return file_format if file_format in IMPORT_FORMATS else None
+    extension = os.path.splitext(path)[1].lower()
+    for name, extensions in IMPORT_FORMATS.items():
+        if extension in extensions:
+            return name
+    return None
+
+
+def resolve_import_path(file_path: str) -> str:
+    """
+    确定导入文件的绝对路径，相对路径基于 MYSQL_IMPORT_DIR
+
+    文件内容会通过 LOAD DATA LOCAL INFILE 发送给服务端，因此只允许读取导入目录中的文件，
+    避免 /etc/passwd、.env 等任意本地文件被读取。
+
+    Raises:
+        ValueError: 路径在导入目录之外且未设置 MYSQL_IMPORT_ALLOW_ANY_PATH
+    """
+    return confine_path(file_path.strip(), IMPORT_CONFIG['dir'], IMPORT_CONFIG['allow_any_path'])
+
+
+def count_data_lines(path: str, file_format: str) -> int:
+    """按二进制块统计数据行数（CSV 不含表头），用于进度报告；字段内的换行会使结果略偏大"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(0, lines - 1) if file_format == "csv" else lines
+
+
+def detect_line_terminator(path: str) -> str:
+    """检测CSV文件的换行符"""
+    with open(path, 'rb') as handle:
+        head = handle.read(1 << 16)
+    return '\r\n' if b'\r\n' in head else '\n'
+
+
+def iter_records(path: str, file_format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    逐行读取文件，产出 (行号, 记录)
+
+    CSV 需要表头，值均为字符串；NDJSON 每行一个JSON对象，空行跳过。
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as handle:
+        if file_format == "csv":
+            reader = csv.DictReader(handle)
+            if not reader.fieldnames:
+                return
+            for record in reader:
+                if None in record:
+                    raise ValueError(f"第 {reader.line_num} 行的字段数多于表头")
+                yield reader.line_num, record
+            return
+
+        for line_no, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第 {line_no} 行不是有效的JSON: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"第 {line_no} 行必须是JSON对象")
+            yield line_no, record
+
+
+def read_file_columns(path: str, file_format: str, sample_rows: int = SAMPLE_VALIDATION_ROWS) -> List[str]:
+    """读取文件中的字段：CSV 取表头，NDJSON 取前若干行键的并集"""
+    if file_format == "csv":
+        with open(path, 'r', encoding='utf-8-sig', newline='') as handle:
+            return next(csv.reader(handle), [])
+
+    columns: Dict[str, None] = {}
+    for count, (_, record) in enumerate(iter_records(path, file_format)):
+        if count >= sample_rows:
+            break
+        columns.update(dict.fromkeys(record))
+    return list(columns)
+
+
+def check_column_mapping(file_columns: Sequence[str], specs: Dict[str, ColumnSpec]) -> List[str]:
+    """检查文件字段与表字段的对应关系，返回问题列表"""
+    problems = []
+    if not file_columns:
+        problems.append("文件中没有字段（CSV需要表头行）")
+    duplicates = sorted({col for col in file_columns if list(file_columns).count(col) > 1})
+    if duplicates:
+        problems.append(f"文件中字段重复: {', '.join(duplicates)}")
+    unknown = [col for col in file_columns if col not in specs]
+    if unknown:
+        problems.append(f"表中不存在的字段: {', '.join(unknown)}")
+    missing = [name for name, spec in specs.items() if spec.required and name not in file_columns]
+    if missing:
+        problems.append(f"缺少必填字段（NOT NULL 且没有默认值）: {', '.join(missing)}")
+    return problems
+
+
+def convert_value(spec: ColumnSpec, value: Any, from_csv: bool) -> Any:
+    """
+    按字段类型转换并校验单个值
+
+    Raises:
+        ValueError: 值与字段类型不符
+    """
+    if from_csv and value == '':
+        # CSV 无法区分NULL和空字符串，与导出一致：可为NULL的字段按NULL处理
+        if spec.nullable or spec.auto_increment:
+            return None
+        if spec.base_type in _TEXT_TYPES:
+            return ''
+        raise ValueError("空值不能写入非空字段")
+    if value is None:
+        if not (spec.nullable or spec.auto_increment):
+            raise ValueError("NULL 不能写入非空字段")
+        return None
+
+    if spec.base_type in _INTEGER_TYPES or spec.base_type == 'bit':
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"'{value}' 不是整数")
+        try:
+            return int(str(value).strip()) if not isinstance(value, (int, float)) else int(value)
+        except ValueError:
+            raise ValueError(f"'{value}' 不是整数")
+    if spec.base_type in _DECIMAL_TYPES:
+        try:
+            decimal.Decimal(str(value).strip())
+        except decimal.InvalidOperation:
+            raise ValueError(f"'{value}' 不是数字")
+        return value if isinstance(value, (int, float)) else str(value).strip()
+    if spec.binary:
+        try:
+            return base64.b64decode(str(value), validate=True)
+        except ValueError:
+            raise ValueError("二进制字段需要base64编码的值")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def convert_record(specs: Dict[str, ColumnSpec], line_no: int, record: Dict[str, Any],
+                   from_csv: bool) -> Dict[str, Any]:
+    """
+    转换一行记录，NOT NULL 且有默认值的字段在CSV中为空时省略，由数据库填充默认值
+
+    Raises:
+        ValueError: 带行号和字段名的错误
+    """
+    row = {}
+    for column, value in record.items():
+        spec = specs.get(column)
+        if spec is None:
+            raise ValueError(f"第 {line_no} 行: 表中不存在字段 '{column}'")
+        if from_csv and value == '' and not spec.nullable and spec.has_default:
+            continue
+        try:
+            row[column] = convert_value(spec, value, from_csv)
+        except ValueError as e:
+            raise ValueError(f"第 {line_no} 行字段 '{column}': {e}")
+    return row
+
+
+def validate_sample(specs: Dict[str, ColumnSpec], path: str, file_format: str,
+                    sample_rows: int = SAMPLE_VALIDATION_ROWS, max_errors: int = 5) -> List[str]:
+    """写入前抽样校验文件开头的若干行，返回错误列表"""
+    errors = []
+    try:
+        for count, (line_no, record) in enumerate(iter_records(path, file_format)):
+            if count >= sample_rows or len(errors) >= max_errors:
+                break
+            try:
+                convert_record(specs, line_no, record, file_format == "csv")
+            except ValueError as e:
+                errors.append(str(e))
+    except ValueError as e:
+        errors.append(str(e))
+    return errors
+
+
+def iter_batches(specs: Dict[str, ColumnSpec], path: str, file_format: str,
+                 batch_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    """逐批产出转换后的记录，内存中最多保留一个批次"""
+    batch = []
+    for line_no, record in iter_records(path, file_format):
+        batch.append(convert_record(specs, line_no, record, file_format == "csv"))
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_load_data_sql(table_name: str, file_columns: Sequence[str], specs: Dict[str, ColumnSpec],
+                        mode: str, line_terminator: str) -> str:
+    """
+    构建 LOAD DATA LOCAL INFILE 语句，文件路径通过 %s 参数传入
+
+    每个字段先读入用户变量，再按与分批插入相同的规则转换：空字符串转为NULL或默认值，二进制字段base64解码。
+    """
+    variables = []
+    assignments = []
+    for i, column in enumerate(file_columns):
+        spec = specs[column]
+        variable = f"@c{i}"
+        variables.append(variable)
+        expression = variable
+        if spec.binary:
+            expression = f"FROM_BASE64({variable})"
+        if spec.nullable or spec.auto_increment:
+            expression = f"IF({variable} = '', NULL, {expression})"
+        elif spec.has_default:
+            expression = f"IF({variable} = '', DEFAULT(`{column}`), {expression})"
+        assignments.append(f"`{column}` = {expression}")
+
+    keyword = " IGNORE" if mode == "ignore" else ""
+    terminator = '\\r\\n' if line_terminator == '\r\n' else '\\n'
+    return (f"LOAD DATA LOCAL INFILE %s{keyword} INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '{terminator}' IGNORE 1 LINES "
+            f"({', '.join(variables)}) SET {', '.join(assignments)}")
@@ -0,0 +1,345 @@
+"""
+查询负载摘要分析
+
+表设计分析只看静态结构，无法知道哪些查询真正消耗了时间。本模块读取实际的查询负载：
+- performance_schema.events_statements_summary_by_digest：服务器按语句摘要累计的执行次数、耗时、
+  扫描行数、返回行数、临时表和排序等指标
+- 本地慢查询日志文件：按去掉字面量后的语句指纹聚合，指标与摘要表保持一致
+
+在此基础上按总耗时、扫描/返回行数比或临时表使用排序，从语句中提取涉及的表以及
+WHERE / JOIN ON / ORDER BY 中的字段，按负载耗时加权生成候选索引，交给表设计分析使用。
+
+本模块只依赖标准库，便于单独测试。
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# performance_schema 中的计时单位为皮秒
+_PICOSECONDS = 1e12
+
+# 读取指定数据库的语句摘要，按总耗时排序
+DIGEST_QUERY = (
+    "SELECT DIGEST, DIGEST_TEXT, COUNT_STAR, SUM_TIMER_WAIT, MAX_TIMER_WAIT, SUM_LOCK_TIME, "
+    "SUM_ROWS_EXAMINED, SUM_ROWS_SENT, SUM_ROWS_AFFECTED, SUM_CREATED_TMP_TABLES, "
+    "SUM_CREATED_TMP_DISK_TABLES, SUM_SORT_ROWS, SUM_NO_INDEX_USED, SUM_NO_GOOD_INDEX_USED "
+    "FROM performance_schema.events_statements_summary_by_digest "
+    "WHERE SCHEMA_NAME = %s AND DIGEST_TEXT IS NOT NULL "
+    "ORDER BY SUM_TIMER_WAIT DESC LIMIT %s"
+)
+
+# 支持的排序方式 -> (说明, 排序键)
+DIGEST_ORDERS = {
+    'latency': ("总耗时", lambda d: d['total_latency']),
+    'examined': ("扫描行数", lambda d: d['rows_examined']),
+    'ratio': ("扫描/返回行数比", lambda d: examined_ratio(d)),
+    'tmp': ("临时表使用", lambda d: (d['tmp_disk_tables'], d['tmp_tables'])),
+}
+
+# 每次执行扫描行数超过该值且扫描/返回比超过 EXAMINED_RATIO_WARNING 时视为低效
+EXAMINED_PER_EXEC_WARNING = 1000
+EXAMINED_RATIO_WARNING = 100
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"(?<![\w`.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w`])", re.IGNORECASE)
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\(.*\)(?:\s*,\s*\(.*\))*", re.IGNORECASE | re.DOTALL)
+
+_IDENTIFIER = r"`?([A-Za-z_][\w$]*)`?"
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:`?[A-Za-z_][\w$]*`?\s*\.\s*)?" + _IDENTIFIER +
+    r"(?:\s+(?:AS\s+)?(?!(?:WHERE|ON|USING|SET|JOIN|INNER|LEFT|RIGHT|CROSS|STRAIGHT_JOIN|NATURAL|GROUP|ORDER|"
+    r"LIMIT|HAVING|VALUES|SELECT|FOR|UNION|FORCE|USE|IGNORE|PARTITION|LOCK)\b)" + _IDENTIFIER + r")?",
+    re.IGNORECASE
+)
+_PREDICATE = re.compile(
+    r"(?:" + _IDENTIFIER + r"\s*\.\s*)?" + r"`?([A-Za-z_][\w$]*)`?\s*"
+    r"(<=>|>=|<=|<>|!=|=|>|<|\bNOT\s+IN\b|\bIN\b|\bNOT\s+BETWEEN\b|\bBETWEEN\b|\bNOT\s+LIKE\b|\bLIKE\b|\bIS\b)",
+    re.IGNORECASE
+)
+_CLAUSE_END = r"(?=\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|FOR\s+UPDATE|UNION|WINDOW)\b|\)\s*$|$)"
+_WHERE_CLAUSE = re.compile(r"\bWHERE\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_ON_CLAUSE = re.compile(
+    r"\bON\b(.*?)(?=\b(?:(?:INNER|LEFT|RIGHT|CROSS|OUTER|STRAIGHT_JOIN|NATURAL)\b|JOIN\b|WHERE\b|GROUP\s+BY|"
+    r"ORDER\s+BY|LIMIT\b|HAVING\b)|$)",
+    re.IGNORECASE | re.DOTALL
+)
+_ORDER_CLAUSE = re.compile(r"\bORDER\s+BY\b(.*?)(?=\bLIMIT\b|\bFOR\s+UPDATE\b|$)", re.IGNORECASE | re.DOTALL)
+_KEYWORDS = {'and', 'or', 'not', 'xor', 'where', 'on', 'null', 'exists', 'case', 'when', 'then', 'else'}
+
+_SLOW_LOG_FIELD = re.compile(r"(\w+):\s+(\S+)")
+
+
+def _new_digest(digest: str, text: str) -> Dict[str, Any]:
+    return {
+        'digest': digest, 'text': text, 'count': 0, 'total_latency': 0.0, 'max_latency': 0.0,
+        'lock_time': 0.0, 'rows_examined': 0, 'rows_sent': 0, 'rows_affected': 0, 'tmp_tables': 0,
+        'tmp_disk_tables': 0, 'sort_rows': 0, 'no_index_used': 0, 'no_good_index_used': 0,
+    }
+
+
+def load_statement_digests(connection, database_name: str, limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    读取 performance_schema 中指定数据库的语句摘要
+
+    Raises:
+        pymysql.Error: performance_schema 未开启或没有权限
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DIGEST_QUERY, (database_name, limit))
+        rows = cursor.fetchall()
+
+    digests = []
+    for row in rows:
+        digest = _new_digest(row[0] or '', row[1])
+        digest.update(
+            count=int(row[2] or 0),
+            total_latency=int(row[3] or 0) / _PICOSECONDS,
+            max_latency=int(row[4] or 0) / _PICOSECONDS,
+            lock_time=int(row[5] or 0) / _PICOSECONDS,
+            rows_examined=int(row[6] or 0),
+            rows_sent=int(row[7] or 0),
+            rows_affected=int(row[8] or 0),
+            tmp_tables=int(row[9] or 0),
+            tmp_disk_tables=int(row[10] or 0),
+            sort_rows=int(row[11] or 0),
+            no_index_used=int(row[12] or 0),
+            no_good_index_used=int(row[13] or 0),
+        )
+        digests.append(digest)
+    return digests
+
+
+def fingerprint_sql(sql: str) -> str:
+    """将语句中的字面量替换为 ?，IN 列表和 VALUES 列表折叠，得到与摘要文本类似的语句指纹"""
+    text = _STRING_LITERAL.sub('?', sql.strip().rstrip(';'))
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('IN (...)', text)
+    text = _VALUES_LIST.sub('VALUES (...)', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def parse_slow_log(lines: Iterable[str], database_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    解析 MySQL 慢查询日志，按语句指纹聚合
+
+    支持标准格式（# Query_time / Rows_sent / Rows_examined）以及 Percona Server 的扩展字段
+    （Rows_affected、Tmp_tables、Tmp_disk_tables、Full_scan）。指定数据库时只保留该库的语句，
+    未记录 use 语句的条目保留。
+
+    Returns:
+        List[Dict]: 与 load_statement_digests 结构相同的摘要列表
+    """
+    aggregated: Dict[str, Dict[str, Any]] = {}
+    current_db: Optional[str] = None
+    fields: Dict[str, str] = {}
+    statement: List[str] = []
+
+    def flush() -> None:
+        sql = " ".join(statement).strip()
+        statement.clear()
+        if not sql or 'Query_time' not in fields:
+            fields.clear()
+            return
+        if database_name is None or current_db in (None, database_name):
+            if not sql.lower().startswith(('administrator command', 'set timestamp', 'use ')):
+                fingerprint = fingerprint_sql(sql)
+                digest = aggregated.setdefault(fingerprint, _new_digest('', fingerprint))
+                latency = float(fields['Query_time'])
+                digest['count'] += 1
+                digest['total_latency'] += latency
+                digest['max_latency'] = max(digest['max_latency'], latency)
+                digest['lock_time'] += float(fields.get('Lock_time', 0))
+                digest['rows_examined'] += int(fields.get('Rows_examined', 0))
+                digest['rows_sent'] += int(fields.get('Rows_sent', 0))
+                digest['rows_affected'] += int(fields.get('Rows_affected', 0))
+                digest['tmp_tables'] += int(fields.get('Tmp_tables', 0))
+                digest['tmp_disk_tables'] += int(fields.get('Tmp_disk_tables', 0))
+                if fields.get('Full_scan', '').lower() == 'yes':
+                    digest['no_index_used'] += 1
+        fields.clear()
+
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith('#'):
+            if line.startswith(('# Time:', '# User@Host:')) and statement:
+                flush()
+            for key, value in _SLOW_LOG_FIELD.findall(line):
+                fields[key] = value
+            continue
+        stripped = line.strip()
+        lowered = stripped.lower()
+        if not stripped or lowered.startswith(('set timestamp=', 'tcp port:', 'time ')) or ', version:' in lowered:
+            continue
+        if lowered.startswith('use ') and lowered.endswith(';') and not statement:
+            current_db = stripped[4:-1].strip().strip('`')
+            continue
+        statement.append(stripped)
+    flush()
+    return list(aggregated.values())
+
+
+def examined_ratio(digest: Dict[str, Any]) -> float:
+    """扫描行数与返回（或修改）行数之比"""
+    return digest['rows_examined'] / max(1, digest['rows_sent'] + digest['rows_affected'])
+
+
+def rank_digests(digests: Sequence[Dict[str, Any]], order_by: str = 'latency',
+                 top_n: int = 10) -> List[Dict[str, Any]]:
+    """按指定方式排序并截取前N条"""
+    key = DIGEST_ORDERS[order_by][1]
+    return sorted(digests, key=key, reverse=True)[:top_n]
+
+
+def digest_findings(digest: Dict[str, Any]) -> List[str]:
+    """根据摘要指标识别低效模式"""
+    findings = []
+    count = max(1, digest['count'])
+    ratio = examined_ratio(digest)
+    if digest['rows_examined'] / count >= EXAMINED_PER_EXEC_WARNING and ratio >= EXAMINED_RATIO_WARNING:
+        findings.append(f"⚠️ 扫描行数是返回行数的 {ratio:.0f} 倍（平均每次扫描 {digest['rows_examined'] // count} 行）")
+    if digest['no_index_used']:
+        findings.append(f"❌ {digest['no_index_used']} 次执行未使用索引")
+    elif digest['no_good_index_used']:
+        findings.append(f"⚠️ {digest['no_good_index_used']} 次执行没有找到合适的索引")
+    if digest['tmp_disk_tables']:
+        findings.append(f"❌ 创建磁盘临时表 {digest['tmp_disk_tables']} 次")
+    elif digest['tmp_tables']:
+        findings.append(f"⚠️ 创建内存临时表 {digest['tmp_tables']} 次")
+    if digest['sort_rows'] and digest['sort_rows'] >= digest['rows_sent'] * 10:
+        findings.append(f"💡 排序 {digest['sort_rows']} 行，远多于返回行数，考虑让索引覆盖 ORDER BY")
+    return findings
+
+
+def extract_tables(sql: str) -> Dict[str, str]:
+    """
+    提取语句中引用的表
+
+    Returns:
+        Dict[str, str]: 别名或表名 -> 表名
+    """
+    references: Dict[str, str] = {}
+    for match in _TABLE_REFERENCE.finditer(sql):
+        table, alias = match.group(1), match.group(2)
+        if table.lower() in ('select', 'dual'):
+            continue
+        references[table] = table
+        if alias:
+            references[alias] = table
+    return references
+
+
+def extract_predicates(sql: str) -> List[Tuple[Optional[str], str, str]]:
+    """
+    提取 WHERE、JOIN ON 中的条件字段和 ORDER BY 字段
+
+    Returns:
+        List[Tuple]: (限定名或None, 字段名, 类别 eq / range / order)
+    """
+    predicates = []
+    clauses = [m.group(1) for m in _WHERE_CLAUSE.finditer(sql)] + [m.group(1) for m in _ON_CLAUSE.finditer(sql)]
+    for clause in clauses:
+        for match in _PREDICATE.finditer(clause):
+            qualifier, column, op = match.group(1), match.group(2), match.group(3).upper()
+            if column.lower() in _KEYWORDS:
+                continue
+            kind = 'eq' if op in ('=', '<=>', 'IN', 'IS') else 'range'
+            predicates.append((qualifier, column, kind))
+    for match in _ORDER_CLAUSE.finditer(sql):
+        for item in match.group(1).split(','):
+            column = re.match(r"\s*(?:" + _IDENTIFIER + r"\s*\.\s*)?`?([A-Za-z_][\w$]*)`?\s*(?:ASC|DESC)?\s*$",
+                              item, re.IGNORECASE)
+            if column:
+                predicates.append((column.group(1), column.group(2), 'order'))
+    return predicates
+
+
+def _resolve_predicates(sql: str, table_columns: Dict[str, Sequence[str]]) -> Dict[str, Dict[str, List[str]]]:
+    """将条件字段归属到具体的表：有限定名时按别名解析，否则归属到唯一包含该字段的表"""
+    references = extract_tables(sql)
+    tables = [table for table in dict.fromkeys(references.values()) if table in table_columns]
+    resolved: Dict[str, Dict[str, List[str]]] = {}
+    for qualifier, column, kind in extract_predicates(sql):
+        if qualifier is not None:
+            owner = references.get(qualifier)
+            owners = [owner] if owner in tables else []
+        else:
+            owners = [table for table in tables if column in table_columns[table]]
+        if len(owners) != 1 or column not in table_columns[owners[0]]:
+            continue
+        groups = resolved.setdefault(owners[0], {'eq': [], 'range': [], 'order': []})
+        if column not in groups[kind]:
+            groups[kind].append(column)
+    return resolved
+
+
+def _index_covers(index_columns: Sequence[str], candidate: Sequence[str]) -> bool:
+    """已有索引的前导字段是否已经覆盖候选索引（等值字段顺序可以不同）"""
+    if len(index_columns) < len(candidate):
+        return False
+    return set(index_columns[:len(candidate)]) == set(candidate) and index_columns[len(candidate) - 1] == candidate[-1]
+
+
+def workload_index_candidates(digests: Sequence[Dict[str, Any]], table_columns: Dict[str, Sequence[str]],
+                              table_indexes: Dict[str, List[List[str]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    根据负载中的条件字段生成候选索引，按支撑这些查询的总耗时排序
+
+    候选索引为：等值字段（最多3个）在前，其后一个范围字段；没有范围字段时追加一个排序字段。
+    已有索引的前导字段已覆盖时不再推荐。
+
+    Args:
+        digests: 摘要列表
+        table_columns: 表名 -> 字段列表，只为数据库中存在的表生成候选
+        table_indexes: 表名 -> 每个已有索引的字段列表
+
+    Returns:
+        Dict[str, List[Dict]]: 表名 -> [{'table', 'columns', 'latency', 'count', 'digests'}]
+    """
+    candidates: Dict[str, Dict[Tuple[str, ...], Dict[str, Any]]] = {}
+    for digest in digests:
+        if not digest.get('text'):
+            continue
+        for table, groups in _resolve_predicates(digest['text'], table_columns).items():
+            tail = groups['range'][:1] or [col for col in groups['order'] if col not in groups['eq']][:1]
+            columns = tuple(groups['eq'][:3] + tail)
+            if not columns:
+                continue
+            if any(_index_covers(index, columns) for index in table_indexes.get(table, [])):
+                continue
+            entry = candidates.setdefault(table, {}).setdefault(
+                columns, {'table': table, 'columns': list(columns), 'latency': 0.0, 'count': 0, 'digests': 0})
+            entry['latency'] += digest['total_latency']
+            entry['count'] += digest['count']
+            entry['digests'] += 1
+    return {table: sorted(entries.values(), key=lambda item: -item['latency'])
+            for table, entries in candidates.items()}
+
+
+def workload_by_table(digests: Sequence[Dict[str, Any]], tables: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """按表汇总负载：涉及该表的语句数、执行次数、总耗时和扫描行数"""
+    known = set(tables)
+    summary: Dict[str, Dict[str, Any]] = {}
+    for digest in digests:
+        for table in set(extract_tables(digest.get('text') or '').values()) & known:
+            item = summary.setdefault(table, {'digests': 0, 'count': 0, 'latency': 0.0, 'rows_examined': 0})
+            item['digests'] += 1
+            item['count'] += digest['count']
+            item['latency'] += digest['total_latency']
+            item['rows_examined'] += digest['rows_examined']
+    return summary
+
+
+def format_latency(seconds: float) -> str:
+    """将秒数格式化为可读的耗时"""
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 0.001:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds * 1e6:.0f}µs"
+
+
+def candidate_index_sql(table_name: str, columns: Sequence[str]) -> str:
+    """生成候选索引的 CREATE INDEX 语句"""
+    index_name = ("idx_" + "_".join(columns))[:64]
+    return f"CREATE INDEX `{index_name}` ON `{table_name}` ({', '.join(f'`{col}`' for col in columns)});"
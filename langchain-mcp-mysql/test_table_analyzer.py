@@ -9,11 +9,13 @@ import asyncio
 import sys
 import os
 from dotenv import load_dotenv
-from langchain_mcp_adapters.client import MultiServerMCPClient
 
-# 加载环境变量
+# 加载环境变量，需要在导入 mcp_connections 之前完成
 load_dotenv()
 
+from langchain_mcp_adapters.client import MultiServerMCPClient  # noqa: E402
+from mcp_connections import server_connections  # noqa: E402
+
 async def test_table_analyzer():
     """测试表设计分析器功能"""
     
@@ -21,13 +23,9 @@ async def test_table_analyzer():
     
     try:
         # 初始化MCP客户端 - 仅表设计分析服务器
-        client = MultiServerMCPClient({
-            "table_analyzer": {
-                "command": "python3",
-                "args": ["./mcp_servers/table_design_analyzer.py"],
-                "transport": "stdio",
-            }
-        })
+        connections, connection_mode = server_connections(["table_analyzer"])
+        client = MultiServerMCPClient(connections)
+        print(f"🔌 连接方式: {connection_mode}")
 
         tools = await client.get_tools()
         print(f"✅ 成功连接到表设计分析服务器，可用工具: {len(tools)}")
@@ -0,0 +1,107 @@
+"""
+工具调用路由规则
+
+MySQL客户端的工具调用路由规则：操作动词、表名/库名、SQL语句以及数据库概念问答等。
+分类器和路由器的实现位于仓库根目录的 mcp_client_common/tool_router.py，本模块只定义本项目的规则表，
+新增工具后在 KEYWORD_RULES 和 EXEMPLARS 中补充规则和示例即可。
+"""
+
+import os
+import sys
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mcp_client_common.tool_router import ToolRouter, build_router, format_decision  # noqa: E402,F401
+
+# 正则规则: (模式, 是否需要工具, 权重)
+KEYWORD_RULES: List[Tuple[str, bool, float]] = [
+    # 明确的数据库操作
+    (r"(创建|新建|建一个|建个|建立)(一个|一张|个)?.{0,12}(数据库|库|表)", True, 0.9),
+    (r"(插入|添加|新增|录入|写入)(一条|几条|一些|一个|数据|记录|员工|用户|订单)", True, 0.9),
+    (r"批量(插入|导入|写入|更新|删除|添加)", True, 0.9),
+    (r"(删除|删掉|清空|移除)(.{0,20})(数据|记录|行|表|库|索引)", True, 0.8),
+    (r"(更新|修改|改成|改为|调整|设置为).{0,30}(数据|记录|字段|值|工资|薪资|状态|价格|为)", True, 0.7),
+    (r"把.{1,20}(改为|改成|更新为|设为|设置为)", True, 0.8),
+    (r"(查一下|查查|查找|查出|查看|看看|看一下|列出|显示|统计一下|找出|找一下|搜索)", True, 0.7),
+    (r"查询", True, 0.5),
+    (r"有(哪些|多少|几个|几张|几条)(数据库|库|表|字段|索引|数据|记录|行|员工|用户|订单)", True, 0.8),
+    (r"(表结构|建表语句|字段信息|索引信息|执行计划|连接池(状态|指标|统计)|缓存命中)", True, 0.7),
+    (r"(多大|多少行|数据量|占用.{0,4}空间)", True, 0.6),
+    (r"(冗余|重复|未使用|没用)的?索引", True, 0.7),
+    (r"(导出|导入|备份)(.{0,10})(表|数据|文件|csv|ndjson|parquet)", True, 0.9),
+    (r"(分析|检查|评估|审计|诊断|优化)(一下)?.{0,10}(表|库)", True, 0.8),
+    (r"(加|添加|创建|删除|删掉)(一个)?.{0,10}索引", True, 0.7),
+    (r"(改|修改|变更|调整)(一下)?.{0,10}(表结构|字段类型|列类型|字段长度)", True, 0.7),
+    # 出现具体的库名、表名（英文标识符紧邻 表/库）
+    (r"[A-Za-z_][\w.]*\s*(表|库|数据库)(里|中|的|有|上)", True, 0.8),
+    (r"(表|库|数据库)\s*[`'\"]?[A-Za-z_]\w*", True, 0.6),
+    (r"^\s*(select|insert|update|delete|show|describe|desc|explain|create|alter|drop)\s+\S", True, 0.8),
+    # 一般对话和知识问答
+    (r"^\s*(你好|您好|嗨|哈喽|hi|hello|hey|早上好|晚上好|谢谢|多谢|感谢|再见|拜拜|好的|ok)\W*$", False, 1.0),
+    (r"(你是谁|你能做什么|你会什么|介绍一下你自己)", False, 0.9),
+    (r"(写一首|写一篇|写个故事|讲个笑话|翻译一下)", False, 0.9),
+    (r"(是什么|什么是|什么叫|啥是|含义|定义|概念|原理|区别|差异|不同|优缺点|好处|坏处|对比)", False, 0.8),
+    (r"(为什么|为何|怎么理解|如何理解|解释一下|讲一下|讲讲|介绍一下|科普)", False, 0.7),
+    (r"(如何|怎么|怎样|应该).{0,12}(写|设计|优化|选择|使用|配置|避免|实现)", False, 0.6),
+    (r"写(一个|一条|个)?.{0,20}(sql|语句)", False, 0.7),
+    (r"(还是).{0,12}(好|合适|更好)|(比较合适|合适吗|好不好)", False, 0.6),
+    (r"(语法|写法|示例|例子|最佳实践|建议|经验|注意事项|面试)", False, 0.5),
+    (r"(一般|通常|常见|推荐)(的|来说)?", False, 0.3),
+]
+
+# 上一轮使用了工具时，这些简短的追问沿用工具模式
+FOLLOW_UP_PATTERN = r"^\s*(继续|再来|再查|再看|接着|然后呢|下一页|还有呢|换成|改成|那|同样|刚才|上面)"
+
+# 相似度分类器的带标签示例: (问题, 是否需要工具)
+EXEMPLARS: List[Tuple[str, bool]] = [
+    ("帮我创建一个名为shop的数据库", True),
+    ("在company库里建一张员工表", True),
+    ("显示所有数据库", True),
+    ("company数据库里有哪些表", True),
+    ("查看employees表的结构", True),
+    ("看一下orders表的索引", True),
+    ("给员工表插入一条记录，姓名张三，年龄28", True),
+    ("把id为5的员工工资改成8000", True),
+    ("删除年龄大于60的用户", True),
+    ("查询技术部所有员工", True),
+    ("统计每个部门的人数", True),
+    ("users表一共有多少行数据", True),
+    ("显示products表的建表语句", True),
+    ("分析一下orders表的设计是否合理", True),
+    ("检查一下整个数据库的表设计", True),
+    ("把customers表导出成csv", True),
+    ("把data.csv导入到订单表", True),
+    ("这条SQL会不会全表扫描，帮我分析执行计划", True),
+    ("给email字段加一个唯一索引", True),
+    ("看看连接池的状态", True),
+    ("找出重复的索引", True),
+    ("按主键分页查询日志表", True),
+    ("给用户表增加一个手机号字段", True),
+    ("哪些查询最慢，分析一下负载", True),
+    ("你好", False),
+    ("谢谢你的帮助", False),
+    ("什么是数据库索引", False),
+    ("InnoDB和MyISAM有什么区别", False),
+    ("解释一下事务的ACID特性", False),
+    ("如何设计一个好的表结构", False),
+    ("LEFT JOIN和INNER JOIN的区别是什么", False),
+    ("为什么要用自增主键", False),
+    ("怎么写一个分组统计的SQL", False),
+    ("MySQL的隔离级别有哪些", False),
+    ("数据库设计有什么最佳实践", False),
+    ("varchar和char应该怎么选择", False),
+    ("什么情况下索引会失效", False),
+    ("你能做什么", False),
+    ("给我讲讲MySQL的主从复制原理", False),
+    ("三范式是什么意思", False),
+    ("SQL注入怎么防范", False),
+    ("分库分表一般什么时候需要", False),
+]
+
+
+def create_router(llm_judge: Optional[Callable[[str], Awaitable[bool]]] = None,
+                  mode: Optional[str] = None, threshold: Optional[float] = None) -> ToolRouter:
+    """按本项目的规则和示例创建路由器，未指定的参数使用环境变量配置"""
+    return build_router(KEYWORD_RULES, EXEMPLARS, FOLLOW_UP_PATTERN, llm_judge=llm_judge,
+                        mode=mode, threshold=threshold)
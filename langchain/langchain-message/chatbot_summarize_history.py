@@ -1,11 +1,12 @@
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnablePassthrough
+#引入增量摘要的聊天历史
+from summarizing_history import SummarizingChatMessageHistory
 
 chat = ChatOpenAI(model="gpt-4")
-temp_chat_history = ChatMessageHistory()
+#摘要在后台进行，可以使用更便宜的模型；为了演示，阈值设置得很小
+temp_chat_history = SummarizingChatMessageHistory(ChatOpenAI(model="gpt-4o-mini"), max_tokens=40, keep_messages=2)
 temp_chat_history.add_user_message("我叫Jack，你好")
 temp_chat_history.add_ai_message("你好")
 temp_chat_history.add_user_message("我今天心情挺开心")
@@ -25,42 +26,28 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 chain = prompt | chat
-chain_with_message_history = RunnableWithMessageHistory(
+#读取历史时直接使用"摘要 + 最近消息"，回答前不再同步调用大模型做摘要；
+#回答写入历史后，超过阈值时只把上次摘要之后的较早消息在后台合并进摘要
+chain_with_summarization = RunnableWithMessageHistory(
     chain,
     lambda session_id: temp_chat_history,
     input_messages_key="input",
     history_messages_key="chat_history",
 )
 
-
-def summarize_messages(chain_input):
-    stored_messages = temp_chat_history.messages
-    if len(stored_messages) == 0:
-        return False
-    summarization_prompt = ChatPromptTemplate.from_messages(
-        [
-            MessagesPlaceholder(variable_name="chat_history"),
-            (
-                "user",
-                "将上述聊天消息浓缩成一条摘要消息。尽可能包含多个具体细节。",
-            ),
-        ]
-    )
-    summarization_chain = summarization_prompt | chat
-    summary_message = summarization_chain.invoke({"chat_history": stored_messages})
-    temp_chat_history.clear()
-    temp_chat_history.add_message(summary_message)
-    return True
-
-
-chain_with_summarization = (
-        RunnablePassthrough.assign(messages_summarized=summarize_messages)
-        | chain_with_message_history
+response = chain_with_summarization.invoke(
+    {"input": "名字，下午在干嘛，心情"},
+    {"configurable": {"session_id": "unused"}},
 )
+print(response.content)
 
+# 下一轮直接使用已有摘要，不等待后台摘要
 response = chain_with_summarization.invoke(
-    {"input": "名字，下午在干嘛，心情"},
+    {"input": "我刚才说我叫什么？"},
     {"configurable": {"session_id": "unused"}},
 )
 print(response.content)
+
+#演示时等待后台摘要完成，查看摘要和最近消息
+temp_chat_history.wait()
 print(temp_chat_history.messages)
@@ -0,0 +1,143 @@
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字和全角标点，每个字符约1个token
+WIDE_CHAR_PATTERN = re.compile("[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """本地估算消息的token数：中日韩字符按1个，其他字符按4个字符1个，另加4个token的消息开销"""
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    wide = len(WIDE_CHAR_PATTERN.findall(text))
+    return 4 + wide + (len(text) - wide + 3) // 4
+
+
+#把已有摘要和新消息合并成新摘要的提示词
+summarization_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "你负责维护一段对话的摘要。请把已有摘要和新的对话消息合并成一条新的摘要，"
+            "保留用户的名字、偏好、做过的事情等具体细节，只输出摘要内容。",
+        ),
+        ("user", "已有摘要：\n{summary}\n\n新的对话消息：\n{messages}"),
+    ]
+)
+
+
+class SummarizingChatMessageHistory(BaseChatMessageHistory):
+    """
+    增量摘要的聊天历史
+
+    历史由"摘要 + 最近的消息"组成，读取 messages 时直接返回，不调用大模型。
+    新消息的token数超过 max_tokens 时，在后台线程中只把上次摘要之后的较早消息合并进摘要，
+    最近的 keep_messages 条消息保持原样；由于 RunnableWithMessageHistory 在回答生成后才写入消息，
+    摘要总是在回复返回之后进行，下一轮直接使用已有的摘要和最近消息，不需要等待大模型。
+
+    Args:
+        llm: 用于生成摘要的模型，可以使用比对话模型更便宜的模型
+        max_tokens: 摘要之后新增消息的token数超过该值时触发摘要
+        keep_messages: 摘要时保持原样的最近消息条数，至少为1
+        token_counter: 估算单条消息token数的函数，默认使用本地估算
+    """
+
+    def __init__(self, llm: BaseChatModel, max_tokens: int = 1000, keep_messages: int = 4,
+                 token_counter: Callable[[BaseMessage], int] = estimate_tokens):
+        if keep_messages < 1:
+            raise ValueError(f"keep_messages 至少为1，当前为 {keep_messages}")
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_messages = keep_messages
+        self.token_counter = token_counter
+        self.summary = ""
+        # 上次摘要之后的消息及各自的token数，累计值随增删同步更新，不需要重新计算全部历史
+        self._recent: List[BaseMessage] = []
+        self._recent_tokens: List[int] = []
+        self.recent_tokens = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarize")
+        self._pending: Optional[Future] = None
+        # clear() 时递增，丢弃清空前开始的摘要结果
+        self._generation = 0
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self._lock:
+            if not self.summary:
+                return list(self._recent)
+            return [SystemMessage(content=f"之前对话的摘要：{self.summary}")] + self._recent
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            for message in messages:
+                tokens = self.token_counter(message)
+                self._recent.append(message)
+                self._recent_tokens.append(tokens)
+                self.recent_tokens += tokens
+            self._schedule_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary = ""
+            self._recent.clear()
+            self._recent_tokens.clear()
+            self.recent_tokens = 0
+            self._generation += 1
+
+    def _schedule_locked(self) -> None:
+        """新消息超过阈值且没有正在进行的摘要时，提交后台摘要任务"""
+        if self.recent_tokens <= self.max_tokens or (self._pending is not None and not self._pending.done()):
+            return
+        count = len(self._recent) - self.keep_messages
+        # 从人类消息处切分，摘要后的最近消息总是以完整的一轮对话开头
+        while count > 0 and not isinstance(self._recent[count], HumanMessage):
+            count -= 1
+        if count <= 0:
+            return
+        self._pending = self._executor.submit(
+            self._summarize, self.summary, list(self._recent[:count]), self._generation)
+
+    def _summarize(self, summary: str, messages: List[BaseMessage], generation: int) -> None:
+        try:
+            response = (summarization_prompt | self.llm).invoke(
+                {"summary": summary or "（无）", "messages": get_buffer_string(messages)})
+        except Exception:
+            # 后台任务的异常没有人读取，记录日志后保留原有摘要和消息，下次新增消息时重试
+            logger.exception("生成对话摘要失败，保留原有摘要")
+            with self._lock:
+                if generation == self._generation:
+                    self._pending = None
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            # 摘要期间新增的消息在 _recent 末尾，只移除已经合并进摘要的部分
+            self.summary = str(response.content)
+            self.recent_tokens -= sum(self._recent_tokens[:len(messages)])
+            del self._recent[:len(messages)]
+            del self._recent_tokens[:len(messages)]
+            # 摘要期间新增的消息可能已经再次超过阈值
+            self._pending = None
+            self._schedule_locked()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """等待正在进行的摘要完成，摘要失败时只记录日志，不抛出异常"""
+        while True:
+            with self._lock:
+                pending = self._pending
+            if pending is None:
+                return
+            pending.result(timeout)
+            with self._lock:
+                if self._pending is pending:
+                    return
@@ -0,0 +1,11 @@
+"""
+MCP客户端共用模块
+
+chain_analysis 和 langchain-mcp-mysql 两个客户端共用的实现：
+- tool_router: 工具调用路由器（分类器和路由器，规则表由各客户端定义）
+- router_benchmark: 工具调用路由基准测试
+- parallel_tools: 工具调用并行执行
+- token_memory: 按token预算限制的对话记忆
+
+客户端脚本在各自目录中运行，通过把仓库根目录加入 sys.path 导入本包。
+"""
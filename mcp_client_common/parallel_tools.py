@@ -0,0 +1,149 @@
+"""
+工具调用并行执行
+
+大模型在一步中发起多个相互独立的工具调用时（如同时查看三张表的结构），代理以 version="v1" 构建，
+同一条AI消息中的全部工具调用由一个 ToolNode 通过 asyncio.gather 并发执行。本模块为每个工具加上：
+- 按MCP服务器划分的并发上限：同一服务器同时执行的调用数不超过上限，其余调用排队等待
+- 单次调用超时：超时的调用返回错误提示，不影响同一步中的其他调用
+- 调用时间线：记录每个调用的排队、开始和结束时间，以文本时间线展示各调用的重叠情况
+
+并发参数可通过环境变量配置：MCP_TOOL_CONCURRENCY（每个服务器的并发上限）、
+MCP_TOOL_TIMEOUT（单次调用超时秒数，0表示不限制）
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+# 并行执行配置 - 从环境变量获取
+PARALLEL_CONFIG = {
+    'concurrency': int(os.getenv('MCP_TOOL_CONCURRENCY', '4')),
+    'timeout': float(os.getenv('MCP_TOOL_TIMEOUT', '120')),
+}
+
+# 时间线每行的最大宽度（字符）
+TIMELINE_WIDTH = 40
+
+
+class ToolCallSpan(NamedTuple):
+    """一次工具调用的时间记录，时间为相对于 time.perf_counter 的秒数"""
+    server: str
+    tool: str
+    queued: float
+    started: float
+    finished: float
+    status: str
+
+
+class ToolCallTrace:
+    """记录工具调用时间，按步骤输出时间线"""
+
+    def __init__(self):
+        self._spans: List[ToolCallSpan] = []
+        self._lock = threading.Lock()
+
+    def record(self, span: ToolCallSpan) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def pop_step(self) -> List[ToolCallSpan]:
+        """取出上次调用以来记录的全部调用，按开始排队的时间排序"""
+        with self._lock:
+            spans, self._spans = self._spans, []
+        return sorted(spans, key=lambda span: span.queued)
+
+
+def format_timeline(spans: List[ToolCallSpan]) -> str:
+    """
+    将一步中的工具调用格式化为文本时间线
+
+    "·" 表示等待服务器的并发名额，"█" 表示执行中；同一列同时出现多个 "█" 即为并行执行。
+    """
+    if not spans:
+        return ""
+    origin = min(span.queued for span in spans)
+    wall = max(span.finished for span in spans) - origin
+    serial = sum(span.finished - span.started for span in spans)
+    scale = TIMELINE_WIDTH / wall if wall > 0 else 0.0
+    label_width = max(len(f"{span.server}.{span.tool}") for span in spans)
+
+    lines = [f"⏱️ 工具调用时间线: {len(spans)} 个调用，总耗时 {wall:.2f}s，"
+             f"逐个执行合计 {serial:.2f}s" + (f"，并行节省 {serial - wall:.2f}s" if serial > wall else "")]
+    for span in spans:
+        wait_start = int((span.queued - origin) * scale)
+        run_start = max(wait_start, int((span.started - origin) * scale))
+        run_end = max(run_start + 1, int(round((span.finished - origin) * scale)))
+        bar = " " * wait_start + "·" * (run_start - wait_start) + "█" * (run_end - run_start)
+        status = "" if span.status == "ok" else f" {span.status}"
+        lines.append(f"  {f'{span.server}.{span.tool}':<{label_width}} |{bar:<{TIMELINE_WIDTH}}| "
+                     f"{span.started - origin:5.2f}s → {span.finished - origin:5.2f}s{status}")
+    return "\n".join(lines)
+
+
+class ParallelToolExecutor:
+    """
+    为MCP工具加上按服务器的并发上限、调用超时和时间线记录
+
+    Args:
+        concurrency: 每个服务器的并发上限，可以是统一的整数或 {服务器: 上限}
+        timeout: 单次调用超时（秒），0表示不限制
+    """
+
+    def __init__(self, concurrency: Any = None, timeout: Optional[float] = None):
+        self.concurrency = PARALLEL_CONFIG['concurrency'] if concurrency is None else concurrency
+        self.timeout = PARALLEL_CONFIG['timeout'] if timeout is None else timeout
+        self.trace = ToolCallTrace()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _limit(self, server: str) -> int:
+        if isinstance(self.concurrency, dict):
+            return max(1, self.concurrency.get(server, PARALLEL_CONFIG['concurrency']))
+        return max(1, self.concurrency)
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        # 在首次调用时创建，确保信号量属于代理运行所在的事件循环
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self._limit(server))
+        return self._semaphores[server]
+
+    def wrap_tool(self, server: str, tool: BaseTool) -> BaseTool:
+        """包装单个工具：名称、描述和参数结构保持不变"""
+
+        async def call(**kwargs: Any) -> Any:
+            queued = time.perf_counter()
+            async with self._semaphore(server):
+                started = time.perf_counter()
+                status = "ok"
+                try:
+                    if self.timeout > 0:
+                        return await asyncio.wait_for(tool.ainvoke(kwargs), self.timeout)
+                    return await tool.ainvoke(kwargs)
+                except asyncio.TimeoutError:
+                    status = "超时"
+                    return f"❌ 工具 {tool.name} 调用超时（超过 {self.timeout:g} 秒），请缩小操作范围后重试"
+                except Exception:
+                    status = "失败"
+                    raise
+                finally:
+                    self.trace.record(ToolCallSpan(server, tool.name, queued, started, time.perf_counter(), status))
+
+        return StructuredTool.from_function(
+            coroutine=call,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+        )
+
+    def wrap(self, tools_by_server: Dict[str, List[BaseTool]]) -> List[BaseTool]:
+        """包装全部服务器的工具"""
+        return [self.wrap_tool(server, tool) for server, tools in tools_by_server.items() for tool in tools]
+
+
+async def load_tools_by_server(client: Any, server_names: List[str]) -> Dict[str, List[BaseTool]]:
+    """并发加载各服务器的工具列表，记录每个工具所属的服务器"""
+    results = await asyncio.gather(*(client.get_tools(server_name=name) for name in server_names))
+    return dict(zip(server_names, results))
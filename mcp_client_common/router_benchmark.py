@@ -0,0 +1,122 @@
+"""
+工具调用路由基准测试
+
+在带标签的问题集上评估本地路由器（关键词 + 相似度分类器）的准确率、本地判断覆盖率和单次判断耗时。
+问题集与客户端 tool_router.EXEMPLARS 中的示例不能重复，避免相似度分类器直接命中训练示例。
+默认不请求大模型；指定 --llm 时对本地置信度不足的问题调用客户端的大模型判断，
+统计回退后的整体准确率和大模型判断耗时。
+
+各客户端的 benchmark_tool_router.py 只定义自己的问题集，调用本模块的 main 运行。
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import ModuleType
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from mcp_client_common.tool_router import ROUTER_CONFIG, KeywordClassifier, SimilarityClassifier
+
+# 返回大模型判断函数的加载函数，只在指定 --llm 时调用，避免导入客户端的模型配置
+LLMJudgeLoader = Callable[[], Callable[[str], Awaitable[bool]]]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def evaluate_classifier(name: str, classifier, queries: List[Tuple[str, bool]], threshold: float) -> None:
+    """单独评估一个分类器：整体准确率、达到阈值的覆盖率和覆盖部分的准确率"""
+    correct = covered = covered_correct = 0
+    for text, label in queries:
+        decision = classifier.classify(text)
+        correct += decision.need_tools == label
+        if decision.confidence >= threshold:
+            covered += 1
+            covered_correct += decision.need_tools == label
+    total = len(queries)
+    print(f"  {name:<12} 准确率 {correct / total:6.1%}  覆盖率 {covered / total:6.1%}  "
+          f"覆盖部分准确率 {covered_correct / covered if covered else 0:6.1%}")
+
+
+async def run(queries: List[Tuple[str, bool]], rules: ModuleType, threshold: float,
+              load_llm_judge: Optional[LLMJudgeLoader], show_errors: bool) -> None:
+    """
+    运行基准测试
+
+    Args:
+        queries: 带标签的问题集: (问题, 是否需要工具)
+        rules: 客户端的 tool_router 模块，提供 KEYWORD_RULES、EXEMPLARS 和 create_router
+        load_llm_judge: 指定时对置信度不足的问题调用大模型判断
+    """
+    overlap = {text for text, _ in rules.EXEMPLARS} & {text for text, _ in queries}
+    if overlap:
+        raise SystemExit(f"❌ 问题集与路由示例重复: {', '.join(sorted(overlap))}")
+
+    router = rules.create_router(mode="local", threshold=threshold)
+    timings = []
+    results = []
+    for text, label in queries:
+        start = time.perf_counter()
+        decision = router.classify_local(text)
+        timings.append((time.perf_counter() - start) * 1e6)
+        results.append((text, label, decision))
+
+    total = len(results)
+    positives = sum(1 for _, label, _ in results if label)
+    confident = [(t, l, d) for t, l, d in results if d.confidence >= threshold]
+    correct = sum(d.need_tools == l for _, l, d in results)
+    confident_correct = sum(d.need_tools == l for _, l, d in confident)
+    true_positive = sum(1 for _, l, d in results if l and d.need_tools)
+    predicted_positive = sum(1 for _, _, d in results if d.need_tools)
+
+    print(f"📊 工具调用路由基准测试 ({total} 个问题，需要工具 {positives} 个，阈值 {threshold})")
+    print("=" * 72)
+    print(f"🎯 本地判断准确率: {correct / total:.1%} ({correct}/{total})")
+    print(f"   需要工具 - 精确率 {true_positive / predicted_positive if predicted_positive else 0:.1%}, "
+          f"召回率 {true_positive / positives if positives else 0:.1%}")
+    print(f"✅ 本地直接判断覆盖率: {len(confident) / total:.1%}，其中准确率 "
+          f"{confident_correct / len(confident) if confident else 0:.1%}")
+    print(f"🔁 需要回退大模型: {total - len(confident)} 个")
+    print(f"⏱️ 本地判断耗时: 平均 {statistics.mean(timings):.1f}µs, p50 {percentile(timings, 0.5):.1f}µs, "
+          f"p99 {percentile(timings, 0.99):.1f}µs")
+    print("\n📋 单个分类器:")
+    evaluate_classifier("关键词", KeywordClassifier(rules.KEYWORD_RULES), queries, threshold)
+    evaluate_classifier("相似度", SimilarityClassifier(rules.EXEMPLARS), queries, threshold)
+
+    if show_errors:
+        print("\n❌ 判断错误或置信度不足的问题:")
+        for text, label, decision in results:
+            if decision.need_tools != label or decision.confidence < threshold:
+                mark = "✗" if decision.need_tools != label else "?"
+                print(f"  {mark} [{'YES' if label else 'NO '}] {text}  ->  "
+                      f"{'YES' if decision.need_tools else 'NO'} {decision.confidence:.2f} "
+                      f"{decision.source} ({decision.reason})")
+
+    if load_llm_judge is not None:
+        judge_with_llm = load_llm_judge()
+        llm_timings = []
+        final_correct = confident_correct
+        for text, label, decision in results:
+            if decision.confidence >= threshold:
+                continue
+            start = time.perf_counter()
+            need_tools = await judge_with_llm(text)
+            llm_timings.append(time.perf_counter() - start)
+            final_correct += need_tools == label
+        print(f"\n🤖 回退大模型后整体准确率: {final_correct / total:.1%}")
+        if llm_timings:
+            print(f"⏱️ 大模型判断耗时: 平均 {statistics.mean(llm_timings):.2f}s，"
+                  f"本地判断为其 1/{statistics.mean(llm_timings) * 1e6 / statistics.mean(timings):.0f}")
+
+
+def main(queries: List[Tuple[str, bool]], rules: ModuleType, load_llm_judge: LLMJudgeLoader) -> None:
+    """解析命令行参数并运行基准测试"""
+    parser = argparse.ArgumentParser(description="工具调用路由基准测试")
+    parser.add_argument("--threshold", type=float, default=ROUTER_CONFIG['threshold'], help="本地判断的置信度阈值")
+    parser.add_argument("--llm", action="store_true", help="对置信度不足的问题调用大模型判断")
+    parser.add_argument("--show-errors", action="store_true", help="列出判断错误或置信度不足的问题")
+    args = parser.parse_args()
+    asyncio.run(run(queries, rules, args.threshold, load_llm_judge if args.llm else None, args.show_errors))
@@ -0,0 +1,166 @@
+"""
+按token预算限制的对话记忆
+
+ConversationBufferWindowMemory 按轮数限制窗口，一次 query_data 的大结果就可能撑满上下文；
+而且 chat_memory.messages 保存的是全部历史，每轮复制时窗口并不生效。本模块的 TokenBudgetMemory：
+- 按整轮保存对话：用户问题、工具调用、工具结果和最终回答，下一轮仍能看到之前的工具结果
+- 使用本地估算代替分词器：中日韩字符按1个token、其他字符按4个字符1个token计算
+- 每条消息只在加入时估算一次，记忆维护各轮和总量的token计数，任何一轮都不需要重新计算全部历史
+- 超出预算时先省略较早的大块工具输出（保留开头部分），仍然超出再丢弃最早的整轮对话，
+  始终保留最近一轮；整轮丢弃保证工具调用与工具结果成对出现
+
+记忆参数可通过环境变量配置：MEMORY_MAX_TOKENS（历史消息的token预算）、
+MEMORY_TOOL_OUTPUT_TOKENS（工具输出超过该值时可被省略，省略后保留的开头部分大小）
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+# 对话记忆配置 - 从环境变量获取
+MEMORY_CONFIG = {
+    'max_tokens': int(os.getenv('MEMORY_MAX_TOKENS', '6000')),
+    'tool_output_tokens': int(os.getenv('MEMORY_TOOL_OUTPUT_TOKENS', '200')),
+}
+
+# 每条消息的角色、分隔符等固定开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 中日韩文字和全角标点，通常每个字符约1个token
+WIDE_CHAR_PATTERN = re.compile("[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """快速估算文本的token数：中日韩字符按1个token，其他字符按4个字符1个token"""
+    if not text:
+        return 0
+    wide = len(WIDE_CHAR_PATTERN.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """截取文本开头，使估算的token数不超过 max_tokens"""
+    budget = max_tokens * 4
+    for index, char in enumerate(text):
+        budget -= 4 if WIDE_CHAR_PATTERN.match(char) else 1
+        if budget < 0:
+            return text[:index]
+    return text
+
+
+def message_text(message: BaseMessage) -> str:
+    """消息内容的文本形式，多段内容只取文本部分"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part if isinstance(part, str) else str(part.get("text", "")) for part in content)
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """估算一条消息的token数，包括AI消息中工具调用的名称和参数"""
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message_text(message))
+    if isinstance(message, AIMessage):
+        for tool_call in message.tool_calls:
+            tokens += estimate_tokens(tool_call['name'])
+            tokens += estimate_tokens(json.dumps(tool_call['args'], ensure_ascii=False))
+    return tokens
+
+
+class _Turn:
+    """一轮对话及其token计数"""
+
+    __slots__ = ('messages', 'token_counts', 'tokens')
+
+    def __init__(self, messages: List[BaseMessage]):
+        self.messages = list(messages)
+        self.token_counts = [count_message_tokens(message) for message in self.messages]
+        self.tokens = sum(self.token_counts)
+
+
+class TokenBudgetMemory:
+    """
+    按token预算限制的对话记忆
+
+    Args:
+        max_tokens: 历史消息的token预算
+        tool_output_tokens: 工具输出超过该值时可被省略，省略后保留的开头部分大小
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, tool_output_tokens: Optional[int] = None):
+        self.max_tokens = MEMORY_CONFIG['max_tokens'] if max_tokens is None else max_tokens
+        self.tool_output_tokens = MEMORY_CONFIG['tool_output_tokens'] if tool_output_tokens is None else tool_output_tokens
+        self.turns: List[_Turn] = []
+        self.total_tokens = 0
+        self._stats = {'elided_outputs': 0, 'elided_tokens': 0, 'dropped_turns': 0, 'dropped_tokens': 0}
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """全部历史消息（新列表，调用方可以直接追加本轮的问题）"""
+        return [message for turn in self.turns for message in turn.messages]
+
+    def add_turn(self, messages: List[BaseMessage]) -> None:
+        """保存一轮对话，只估算本轮新增的消息，然后按预算压缩历史"""
+        turn = _Turn(messages)
+        self.turns.append(turn)
+        self.total_tokens += turn.tokens
+        self._enforce_budget()
+
+    def clear(self) -> None:
+        self.turns.clear()
+        self.total_tokens = 0
+
+    def _elide_tool_output(self, turn: _Turn, index: int) -> bool:
+        """将一条大块工具输出替换为开头部分和省略说明，返回是否省略"""
+        message = turn.messages[index]
+        if not isinstance(message, ToolMessage) or turn.token_counts[index] <= self.tool_output_tokens * 2:
+            return False
+        original = turn.token_counts[index]
+        head = truncate_to_tokens(message_text(message), self.tool_output_tokens)
+        elided = message.model_copy(update={
+            'content': f"{head}\n…[工具输出过长，已省略，原约 {original} tokens]"})
+        turn.messages[index] = elided
+        turn.token_counts[index] = count_message_tokens(elided)
+        saved = original - turn.token_counts[index]
+        turn.tokens -= saved
+        self.total_tokens -= saved
+        self._stats['elided_outputs'] += 1
+        self._stats['elided_tokens'] += saved
+        return True
+
+    def _enforce_budget(self) -> None:
+        if self.total_tokens <= self.max_tokens:
+            return
+        # 第一步：从最早的对话开始省略大块工具输出
+        for turn in self.turns:
+            for index in range(len(turn.messages)):
+                if self._elide_tool_output(turn, index) and self.total_tokens <= self.max_tokens:
+                    return
+        # 第二步：丢弃最早的整轮对话，保留最近一轮
+        while self.total_tokens > self.max_tokens and len(self.turns) > 1:
+            turn = self.turns.pop(0)
+            self.total_tokens -= turn.tokens
+            self._stats['dropped_turns'] += 1
+            self._stats['dropped_tokens'] += turn.tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'turns': len(self.turns),
+            'messages': sum(len(turn.messages) for turn in self.turns),
+            'tokens': self.total_tokens,
+            'max_tokens': self.max_tokens,
+            **self._stats,
+        }
+
+
+def format_memory_stats(stats: Dict[str, Any]) -> str:
+    """记忆占用的单行说明"""
+    text = (f"记忆: {stats['turns']} 轮 / {stats['messages']} 条消息，"
+            f"约 {stats['tokens']} tokens (预算 {stats['max_tokens']})")
+    if stats['elided_outputs']:
+        text += f"，已省略 {stats['elided_outputs']} 个工具输出"
+    if stats['dropped_turns']:
+        text += f"，已丢弃最早的 {stats['dropped_turns']} 轮"
+    return text
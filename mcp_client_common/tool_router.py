@@ -0,0 +1,234 @@
+"""
+工具调用路由器
+
+客户端在每轮对话前需要判断用户问题是否需要调用工具。原来的做法是额外请求一次大模型回答 YES/NO，
+每条消息多出 0.5～2 秒。本模块在本地完成大部分判断：
+- 关键词分类器：正则规则匹配需要工具的操作以及问候、概念问答等，带权重打分
+- 相似度分类器：用字符 n-gram 的 TF-IDF 向量表示问题，与带标签的示例问题计算余弦相似度，按最近邻投票
+- 两个分类器的置信度都低于阈值时，才回退到大模型判断（llm_judge）
+
+分类器可插拔：ToolRouter 接受任意实现了 classify(text) -> RouteDecision 的对象。
+本模块只包含与项目无关的分类器和路由器，各客户端在自己的 tool_router.py 中定义规则表
+（KEYWORD_RULES、FOLLOW_UP_PATTERN、EXEMPLARS），再通过 build_router 创建路由器。
+相似度分类器的向量化函数也可替换为真正的嵌入模型（embed 参数），默认实现只依赖标准库，耗时在微秒级。
+
+路由参数可通过环境变量配置：TOOL_ROUTER_MODE（hybrid: 本地判断+低置信度回退大模型，local: 只用本地判断，
+llm: 只用大模型判断）、TOOL_ROUTER_THRESHOLD（本地判断的置信度阈值）
+"""
+
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# 路由配置 - 从环境变量获取
+ROUTER_CONFIG = {
+    'mode': os.getenv('TOOL_ROUTER_MODE', 'hybrid').lower(),
+    'threshold': float(os.getenv('TOOL_ROUTER_THRESHOLD', '0.6')),
+}
+
+ROUTER_MODES = ("hybrid", "local", "llm")
+
+
+class RouteDecision(NamedTuple):
+    """路由结果"""
+    need_tools: bool
+    confidence: float
+    source: str
+    reason: str = ""
+
+
+# ---------------------------------------------------------------------------
+# 分类器
+# ---------------------------------------------------------------------------
+
+def _decision(yes: float, no: float, source: str, reason: str) -> RouteDecision:
+    """
+    按两侧得分生成路由结果
+
+    置信度同时考虑两侧得分的差距（相互矛盾时降低）和证据强度（得分都很低时降低）。
+    """
+    top = max(yes, no)
+    if top <= 0:
+        return RouteDecision(False, 0.0, source, "没有匹配的证据")
+    confidence = (abs(yes - no) / top) * min(1.0, top)
+    return RouteDecision(yes > no, round(confidence, 3), source, reason)
+
+
+class KeywordClassifier:
+    """正则关键词分类器：匹配的规则权重分别累加到两侧，只取每侧最高的两条，避免同义规则重复计分"""
+
+    def __init__(self, rules: Sequence[Tuple[str, bool, float]]):
+        self.rules = [(re.compile(pattern, re.IGNORECASE), label, weight) for pattern, label, weight in rules]
+
+    def classify(self, text: str) -> RouteDecision:
+        hits: Dict[bool, List[Tuple[float, str]]] = {True: [], False: []}
+        for pattern, label, weight in self.rules:
+            match = pattern.search(text)
+            if match:
+                hits[label].append((weight, match.group(0).strip()))
+        scores = {}
+        for label, matched in hits.items():
+            matched.sort(reverse=True)
+            top = [weight for weight, _ in matched[:2]]
+            # 第二条规则只按一半计分
+            scores[label] = (top[0] + 0.5 * top[1]) if len(top) > 1 else (top[0] if top else 0.0)
+        reason = ", ".join(f"{'+' if label else '-'}{word}" for label in (True, False)
+                           for _, word in hits[label][:2])
+        return _decision(scores[True], scores[False], "keyword", reason)
+
+
+def char_ngrams(text: str) -> List[str]:
+    """将文本切分为特征：中文按单字和相邻两字，英文和数字按单词"""
+    text = text.lower()
+    features = re.findall(r"[a-z_][a-z0-9_]*|\d+", text)
+    for run in re.findall(r"[一-鿿]+", text):
+        features.extend(run)
+        features.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return features
+
+
+class SimilarityClassifier:
+    """
+    相似度分类器：TF-IDF 向量的余弦相似度 + 最近邻加权投票
+
+    Args:
+        exemplars: 带标签的示例问题
+        k: 参与投票的最近邻数量
+        embed: 可选的向量化函数，返回 {特征: 权重} 稀疏向量；默认使用字符 n-gram 的 TF-IDF
+    """
+
+    def __init__(self, exemplars: Sequence[Tuple[str, bool]], k: int = 5,
+                 embed: Optional[Callable[[str], Dict[str, float]]] = None):
+        self.k = k
+        document_frequency = Counter()
+        for text, _ in exemplars:
+            document_frequency.update(set(char_ngrams(text)))
+        total = len(exemplars)
+        self.idf = {feature: math.log((1 + total) / (1 + count)) + 1.0
+                    for feature, count in document_frequency.items()}
+        self.embed = embed or self._tfidf
+        self.vectors = [(self.embed(text), label) for text, label in exemplars]
+
+    def _tfidf(self, text: str) -> Dict[str, float]:
+        counts = Counter(char_ngrams(text))
+        # 示例中没有出现过的特征无法用于比较，直接忽略
+        vector = {feature: count * self.idf[feature] for feature, count in counts.items() if feature in self.idf}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {feature: value / norm for feature, value in vector.items()} if norm else {}
+
+    def classify(self, text: str) -> RouteDecision:
+        vector = self.embed(text)
+        if not vector:
+            return RouteDecision(False, 0.0, "similarity", "没有与示例相同的特征")
+        similarities = []
+        for exemplar, label in self.vectors:
+            # 稀疏向量点积，遍历较短的一侧
+            small, large = (vector, exemplar) if len(vector) < len(exemplar) else (exemplar, vector)
+            similarities.append((sum(value * large.get(feature, 0.0) for feature, value in small.items()), label))
+        similarities.sort(reverse=True)
+        neighbours = similarities[:self.k]
+        yes = sum(sim for sim, label in neighbours if label)
+        no = sum(sim for sim, label in neighbours if not label)
+        total = yes + no
+        if total <= 0:
+            return RouteDecision(False, 0.0, "similarity", "与所有示例都不相似")
+        # 最相似的示例相似度低于0.5时按比例降低置信度
+        confidence = abs(yes - no) / total * min(1.0, neighbours[0][0] / 0.5)
+        return RouteDecision(yes > no, round(confidence, 3), "similarity",
+                             f"最相似示例 {neighbours[0][0]:.2f}")
+
+
+# ---------------------------------------------------------------------------
+# 路由器
+# ---------------------------------------------------------------------------
+
+class ToolRouter:
+    """
+    组合本地分类器判断是否需要调用工具，置信度不足时回退到大模型
+
+    Args:
+        classifiers: 按顺序尝试的本地分类器，任一达到阈值即返回
+        llm_judge: 可选的大模型判断函数，async (text) -> bool
+        threshold: 本地判断的置信度阈值
+        mode: hybrid、local 或 llm
+        follow_up_pattern: 上一轮使用了工具时沿用工具模式的追问模式
+    """
+
+    def __init__(self, classifiers: Sequence, llm_judge: Optional[Callable[[str], Awaitable[bool]]] = None,
+                 threshold: float = 0.6, mode: str = "hybrid", follow_up_pattern: str = ""):
+        if mode not in ROUTER_MODES:
+            raise ValueError(f"不支持的路由模式 '{mode}'，可选值: {', '.join(ROUTER_MODES)}")
+        self.classifiers = list(classifiers)
+        self.llm_judge = llm_judge
+        self.threshold = threshold
+        # 没有大模型判断函数时只能使用本地判断
+        self.mode = mode if llm_judge is not None else "local"
+        self.follow_up = re.compile(follow_up_pattern, re.IGNORECASE) if follow_up_pattern else None
+        self._stats = Counter()
+        self._local_time = 0.0
+
+    def classify_local(self, text: str, previous_used_tools: bool = False) -> RouteDecision:
+        """只使用本地分类器判断，返回置信度最高的结果（可能低于阈值）"""
+        start = time.perf_counter()
+        try:
+            if previous_used_tools and self.follow_up is not None and self.follow_up.search(text):
+                return RouteDecision(True, 0.9, "follow-up", "上一轮使用了工具的追问")
+            decisions = []
+            for classifier in self.classifiers:
+                decision = classifier.classify(text)
+                if decision.confidence >= self.threshold:
+                    return decision
+                decisions.append(decision)
+            return self._combine(decisions)
+        finally:
+            self._local_time += time.perf_counter() - start
+
+    def _combine(self, decisions: List[RouteDecision]) -> RouteDecision:
+        """各分类器都未达到阈值时合并结果：结论一致时置信度叠加，矛盾时相互抵消"""
+        yes = sum(d.confidence for d in decisions if d.need_tools)
+        no = sum(d.confidence for d in decisions if not d.need_tools)
+        reason = "; ".join(f"{d.source}={'YES' if d.need_tools else 'NO'}({d.confidence:.2f})" for d in decisions)
+        return RouteDecision(yes > no, round(min(1.0, abs(yes - no)), 3), "combined", reason)
+
+    async def route(self, text: str, previous_used_tools: bool = False) -> RouteDecision:
+        """判断是否需要调用工具，本地置信度不足且配置了大模型判断时回退"""
+        self._stats['requests'] += 1
+        if self.mode != "llm":
+            decision = self.classify_local(text, previous_used_tools)
+            if self.mode == "local" or decision.confidence >= self.threshold:
+                self._stats[decision.source] += 1
+                return decision
+        need_tools = await self.llm_judge(text)
+        self._stats['llm'] += 1
+        return RouteDecision(need_tools, 1.0, "llm", "本地判断置信度不足" if self.mode == "hybrid" else "")
+
+    def stats(self) -> Dict[str, float]:
+        """返回各来源的判断次数和本地判断的平均耗时"""
+        stats = dict(self._stats)
+        local = stats.get('requests', 0) if self.mode != "llm" else 0
+        stats['local_avg_us'] = self._local_time / local * 1e6 if local else 0.0
+        return stats
+
+
+def build_router(keyword_rules: Sequence[Tuple[str, bool, float]], exemplars: Sequence[Tuple[str, bool]],
+                 follow_up_pattern: str = "", llm_judge: Optional[Callable[[str], Awaitable[bool]]] = None,
+                 mode: Optional[str] = None, threshold: Optional[float] = None) -> ToolRouter:
+    """按客户端的规则表和示例创建路由器，未指定的参数使用环境变量配置"""
+    return ToolRouter(
+        [KeywordClassifier(keyword_rules), SimilarityClassifier(exemplars)],
+        llm_judge=llm_judge,
+        threshold=ROUTER_CONFIG['threshold'] if threshold is None else threshold,
+        mode=mode or ROUTER_CONFIG['mode'],
+        follow_up_pattern=follow_up_pattern,
+    )
+
+
+def format_decision(decision: RouteDecision) -> str:
+    """将路由结果格式化为一行提示"""
+    sources = {'keyword': "关键词", 'similarity': "相似度", 'combined': "综合", 'follow-up': "追问", 'llm': "大模型"}
+    return (f"{'🔧 需要工具' if decision.need_tools else '💭 无需工具'} "
+            f"(判断方式: {sources.get(decision.source, decision.source)}, 置信度 {decision.confidence:.2f}"
+            f"{', ' + decision.reason if decision.reason else ''})")